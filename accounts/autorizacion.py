@@ -0,0 +1,66 @@
+# accounts/autorizacion.py
+"""
+Grupos y permisos del usuario resueltos una vez por sesión.
+
+staff_required llama a cargar(): la primera vez (o si cambió la versión) se
+resuelven grupos y permisos (2-3 queries) y se guardan en la sesión; después
+solo se lee la sesión (que ya se cargó para autenticar) y el número de versión
+en cache. Con eso se precargan las caches de ModelBackend, así que
+permission_required / user.has_perm / {{ perms }} no van a la base.
+
+Invalidación (ver signals.py): cualquier cambio de pertenencia a grupos o de
+permisos incrementa la versión global. Como la cache default puede no ser
+compartida entre procesos, además se re-resuelve cada AUTORIZACION_TTL
+segundos.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+CLAVE_SESION = "_autorizacion"
+CLAVE_VERSION = "autorizacion:version"
+TTL = 300
+
+
+def version():
+    return cache.get(CLAVE_VERSION, 0)
+
+
+def invalidar():
+    """Fuerza a re-resolver la autorización de todas las sesiones."""
+    try:
+        cache.incr(CLAVE_VERSION)
+    except ValueError:
+        cache.set(CLAVE_VERSION, 1, None)
+
+
+def resolver(user):
+    grupos = sorted(user.groups.values_list("name", flat=True))
+    # Un superusuario activo pasa todos los has_perm sin mirar la lista
+    permisos = [] if user.is_superuser else sorted(user.get_all_permissions())
+    return {"g": grupos, "p": permisos}
+
+
+def cargar(request):
+    """Devuelve {"g": [grupos], "p": [permisos]} y precarga request.user."""
+    user = request.user
+    v = version()
+    ttl = getattr(settings, "AUTORIZACION_TTL", TTL)
+    datos = request.session.get(CLAVE_SESION)
+    if not datos or datos["uid"] != user.pk or datos["v"] != v or time.time() - datos["t"] > ttl:
+        datos = {"uid": user.pk, "v": v, "t": time.time(), **resolver(user)}
+        request.session[CLAVE_SESION] = datos
+
+    user._grupos = frozenset(datos["g"])
+    if not user.is_superuser:
+        # Las mismas caches que arma ModelBackend.get_all_permissions()
+        user._perm_cache = set(datos["p"])
+    return datos
+
+
+def en_grupo(user, names):
+    grupos = getattr(user, "_grupos", None)
+    if grupos is None:
+        return user.groups.filter(name__in=names).exists()
+    return not grupos.isdisjoint(names)
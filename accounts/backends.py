@@ -0,0 +1,29 @@
+# accounts/backends.py
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models import Q
+
+UserModel = get_user_model()
+
+
+class DNIoUsuarioBackend(ModelBackend):
+    """
+    Autentica con DNI o nombre de usuario en una sola query (antes: buscar
+    por DNI, después por username y después authenticate() otra vez).
+    Si un DNI coincide con el username de otro usuario, gana el DNI.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if not username or password is None:
+            return None
+        candidatos = list(UserModel._default_manager.filter(Q(dni=username) | Q(username=username))[:2])
+        user = next((u for u in candidatos if u.dni == username), candidatos[0] if candidatos else None)
+        if user is None:
+            # Mismo costo que con un usuario existente (ver ModelBackend)
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
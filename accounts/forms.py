@@ -1,10 +1,9 @@
 from django import forms
 from django.contrib.auth import authenticate
-from django.core.exceptions import ObjectDoesNotExist, ValidationError
-from django.forms import inlineformset_factory
+from django.core.exceptions import ValidationError
+from django.forms import BaseInlineFormSet, inlineformset_factory
 
-from .models import User
-from propiedades.models import Propiedad, PropiedadImagen
+from propiedades.models import Propiedad, PropiedadImagen, preparar_imagenes
 
 
 # =========================
@@ -40,19 +39,8 @@ class LoginDNIForm(forms.Form):
         if not ident or not pwd:
             raise forms.ValidationError(self.error_messages["invalid"])
 
-        user = None
-        try:
-            user = User.objects.get(dni=ident)
-        except ObjectDoesNotExist:
-            try:
-                user = User.objects.get(username=ident)
-            except ObjectDoesNotExist:
-                pass
-
-        if not user:
-            raise forms.ValidationError(self.error_messages["invalid"])
-
-        user_auth = authenticate(username=user.username, password=pwd)
+        # DNI o usuario en una sola query (accounts.backends.DNIoUsuarioBackend)
+        user_auth = authenticate(username=ident, password=pwd)
         if not user_auth:
             raise forms.ValidationError(self.error_messages["invalid"])
         if not user_auth.is_active:
@@ -159,10 +147,23 @@ class PropiedadForm(forms.ModelForm):
         return data
 
 
+class GaleriaFormSet(BaseInlineFormSet):
+    def save(self, commit=True):
+        # Convierte y sube todas las imágenes nuevas en paralelo; después
+        # cada save() solo registra la fila (ver preparar_imagenes)
+        if commit:
+            preparar_imagenes(
+                [f.instance for f in self.forms if f.has_changed() and not self._should_delete_form(f)],
+                "imagen",
+            )
+        return super().save(commit)
+
+
 # Formset de galería: 1 input inicial y el resto se agrega dinámicamente por JS
 PropiedadImagenFormSet = inlineformset_factory(
     Propiedad,
     PropiedadImagen,
+    formset=GaleriaFormSet,
     fields=["imagen"],
     widgets={"imagen": forms.FileInput(attrs={"accept": "image/*", "class": "form-input"})},
     extra=1,
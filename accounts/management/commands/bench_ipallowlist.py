@@ -0,0 +1,86 @@
+import ipaddress
+import random
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from django_inmobiliaria.ipmatch import IPMatcher
+
+
+def redes_aleatorias(n, semilla=0):
+    """`n` CIDRs al azar, 3/4 IPv4 (/16../32) y 1/4 IPv6 (/32../64)."""
+    rnd = random.Random(semilla)
+    redes = []
+    for i in range(n):
+        if i % 4:
+            prefijo = rnd.randint(16, 32)
+            red = ipaddress.IPv4Network((rnd.getrandbits(32), prefijo), strict=False)
+        else:
+            prefijo = rnd.randint(32, 64)
+            red = ipaddress.IPv6Network((rnd.getrandbits(128), prefijo), strict=False)
+        redes.append(str(red))
+    return redes
+
+
+def ips_aleatorias(n, distintas, semilla=1):
+    """`n` consultas sobre `distintas` IPs (el tráfico real repite clientes)."""
+    rnd = random.Random(semilla)
+    pool = [str(ipaddress.IPv4Address(rnd.getrandbits(32))) for _ in range(distintas)]
+    return [rnd.choice(pool) for _ in range(n)]
+
+
+def lineal(redes):
+    """Lo que hacía IPAllowlistMiddleware: parsear y recorrer todas las redes."""
+    parseadas = [ipaddress.ip_network(r, strict=False) for r in redes]
+
+    def contiene(ip):
+        try:
+            ip_obj = ipaddress.ip_address(ip)
+        except ValueError:
+            return False
+        return any(ip_obj in net for net in parseadas)
+    return contiene
+
+
+def medir(n_redes, consultas, distintas):
+    """
+    µs por consulta con el scan lineal, el matcher sin LRU y con LRU, para
+    una allowlist de `n_redes` CIDRs. Verifica que los tres coincidan.
+    """
+    redes = redes_aleatorias(n_redes)
+    ips = ips_aleatorias(consultas, distintas)
+    variantes = {
+        "lineal": lineal(redes),
+        "bisect": IPMatcher(redes, lru=0).__contains__,
+        "bisect+lru": IPMatcher(redes).__contains__,
+    }
+    tiempos, resultados = {}, {}
+    for nombre, contiene in variantes.items():
+        t0 = perf_counter()
+        resultados[nombre] = [contiene(ip) for ip in ips]
+        tiempos[nombre] = (perf_counter() - t0) / consultas * 1e6
+    if len({tuple(r) for r in resultados.values()}) != 1:
+        raise AssertionError("las variantes no coinciden")
+    return tiempos
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el chequeo de IPAllowlistMiddleware (scan lineal) contra el "
+        "matcher compilado de ipmatch.py para allowlists de distinto tamaño."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--redes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+        parser.add_argument("--consultas", type=int, default=20000)
+        parser.add_argument("--distintas", type=int, default=500, help="IPs distintas entre las consultas")
+
+    def handle(self, *args, **o):
+        cab = f"{'redes':>8}{'lineal µs':>12}{'bisect µs':>12}{'+lru µs':>12}"
+        self.stdout.write(cab)
+        self.stdout.write("-" * len(cab))
+        for n in o["redes"]:
+            # el scan lineal con 10k redes tarda: menos consultas, mismo promedio
+            consultas = o["consultas"] if n <= 1000 else max(1000, o["consultas"] // 10)
+            t = medir(n, consultas, o["distintas"])
+            self.stdout.write(f"{n:>8}{t['lineal']:>12.2f}{t['bisect']:>12.2f}{t['bisect+lru']:>12.2f}")
@@ -0,0 +1,85 @@
+from importlib import import_module
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from django_inmobiliaria.middleware import SesionDeslizanteMiddleware
+
+
+def simular(requests, intervalo, deslizante):
+    """
+    Una sesión activa pidiendo `requests` páginas cada `intervalo` segundos
+    (reloj simulado). Devuelve (escrituras, queries de sesión, segundos reales).
+    Escritura = respuesta que reescribió la sesión (y reenvió la cookie).
+    """
+    def vista(request):
+        request.session.get("_auth_user_id")  # como cualquier vista con login
+        return HttpResponse("ok")
+
+    with override_settings(SESSION_SAVE_EVERY_REQUEST=not deslizante):
+        store = import_module(settings.SESSION_ENGINE).SessionStore()
+        store["_auth_user_id"] = "1"
+        store.save()
+        cookie = store.session_key
+
+        interna = vista
+        if deslizante:
+            interna = SesionDeslizanteMiddleware(vista)
+            reloj = [interna.reloj()]
+            interna.reloj = lambda: reloj[0]
+        cadena = SessionMiddleware(interna)
+
+        factory = RequestFactory()
+        escrituras = 0
+        t0 = perf_counter()
+        with CaptureQueriesContext(connection) as ctx:
+            for _ in range(requests):
+                request = factory.get("/")
+                request.COOKIES[settings.SESSION_COOKIE_NAME] = cookie
+                response = cadena(request)
+                if settings.SESSION_COOKIE_NAME in response.cookies:
+                    escrituras += 1
+                    cookie = response.cookies[settings.SESSION_COOKIE_NAME].value
+                if deslizante:
+                    reloj[0] += intervalo
+        segundos = perf_counter() - t0
+    queries = sum("django_session" in q["sql"] for q in ctx.captured_queries)
+    return escrituras, queries, segundos
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara escrituras de sesión con SESSION_SAVE_EVERY_REQUEST contra "
+        "SesionDeslizanteMiddleware para una sesión activa (no deja datos)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=1000)
+        parser.add_argument("--intervalo", type=float, default=5, help="Segundos simulados entre requests")
+
+    def handle(self, *args, **o):
+        self.stdout.write(self.style.NOTICE(
+            f"{settings.SESSION_ENGINE} · {o['requests']} requests cada {o['intervalo']:g}s · "
+            f"edad {settings.SESSION_COOKIE_AGE}s · renovar si quedan < "
+            f"{getattr(settings, 'SESSION_RENOVAR_SI_QUEDAN', '-')}s"
+        ))
+        filas = []
+        with transaction.atomic():
+            for nombre, deslizante in (("cada request", False), ("deslizante", True)):
+                filas.append((nombre, *simular(o["requests"], o["intervalo"], deslizante)))
+            transaction.set_rollback(True)
+
+        cab = f"{'estrategia':<14}{'escrituras':>12}{'queries':>10}{'ms':>10}"
+        self.stdout.write(cab)
+        self.stdout.write("-" * len(cab))
+        for nombre, escrituras, queries, segundos in filas:
+            self.stdout.write(f"{nombre:<14}{escrituras:>12}{queries:>10}{segundos * 1000:>10.1f}")
+        antes, despues = filas[0][1], filas[1][1]
+        if antes:
+            self.stdout.write(self.style.SUCCESS(f"{100 * (antes - despues) / antes:.1f}% menos escrituras"))
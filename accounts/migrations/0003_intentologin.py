@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:41
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_remove_user_foto_perfil_alter_user_dni'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IntentoLogin',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ip', models.CharField(max_length=45)),
+                ('identificador', models.CharField(max_length=32)),
+                ('creado', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['identificador', 'creado'], name='accounts_in_identif_024122_idx'), models.Index(fields=['creado'], name='accounts_in_creado_946ae1_idx')],
+            },
+        ),
+    ]
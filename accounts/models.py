@@ -1,9 +1,69 @@
 # accounts/models.py
+import random
+from datetime import timedelta
+
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models import Count, Q
+from django.utils import timezone
 
 class User(AbstractUser):
     dni = models.CharField(max_length=15, unique=True, blank=True, null=True)
 
     def __str__(self):
         return self.username or f"User {self.pk}"
+
+
+class IntentoLogin(models.Model):
+    """
+    Intentos fallidos de login para el rate-limit de login_view. Vive en la
+    base (no en la cache local de cada worker) para que el límite sea el mismo
+    con N procesos: ventana deslizante de LOGIN_VENTANA_SEGUNDOS, como mucho
+    LOGIN_INTENTOS_MAX por IP+identificador y LOGIN_INTENTOS_MAX_USUARIO por
+    identificador desde cualquier IP. Este último solo frena a las IPs que ya
+    fallaron: si no, cualquiera podía dejar afuera a un usuario errando su
+    clave a propósito desde otra IP.
+    """
+    ip = models.CharField(max_length=45)
+    identificador = models.CharField(max_length=32)
+    creado = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["identificador", "creado"]),
+            models.Index(fields=["creado"]),
+        ]
+
+    @classmethod
+    def _ventana(cls):
+        return timezone.now() - timedelta(seconds=getattr(settings, "LOGIN_VENTANA_SEGUNDOS", 15 * 60))
+
+    @classmethod
+    def permitir(cls, ip, identificador):
+        """
+        Dice si el intento entra en los límites; se llama antes de validar la
+        contraseña. El intento se registra antes de contar (N requests
+        simultáneos no pueden pasar todos con el mismo conteo viejo) y queda
+        como fallido hasta que limpiar() lo borre; uno rechazado no cuenta.
+        """
+        ip, identificador = ip[:45], identificador.lower()[:32]
+        intento = cls.objects.create(ip=ip, identificador=identificador)
+        desde = cls._ventana()
+        if random.random() < 0.01:
+            cls.objects.filter(creado__lt=desde).delete()
+        n = cls.objects.filter(identificador=identificador, creado__gte=desde).aggregate(
+            total=Count("id"), ip=Count("id", filter=Q(ip=ip)),
+        )
+        fallidos_ip = n["ip"] - 1  # sin contar este
+        permitido = n["ip"] <= getattr(settings, "LOGIN_INTENTOS_MAX", 5) and (
+            not fallidos_ip or n["total"] <= getattr(settings, "LOGIN_INTENTOS_MAX_USUARIO", 20)
+        )
+        if not permitido:
+            intento.delete()
+        return permitido
+
+    @classmethod
+    def limpiar(cls, ip, identificador):
+        """Login correcto: se olvidan los intentos de esa IP para ese identificador."""
+        cls.objects.filter(ip=ip[:45], identificador=identificador.lower()[:32]).delete()
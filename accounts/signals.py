@@ -1,20 +1,41 @@
 # accounts/signals.py
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import Group
 from django.conf import settings
 from django.apps import apps
 
+from . import autorizacion
+
 UserModel = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
 
 
 AUTO_ADD_ENABLED = getattr(settings, "AUTO_ADD_STAFF_TO_CARGADORES", True)
-DEFAULT_GROUP_NAME = "AdministradorCliente"  
+DEFAULT_GROUP_NAME = "AdministradorCliente"
+
 
 @receiver(post_save, sender=UserModel)
-def add_staff_to_group(sender, instance, created, **kwargs):
-    if not AUTO_ADD_ENABLED:
+def add_staff_to_group(sender, instance, created, update_fields=None, **kwargs):
+    if not AUTO_ADD_ENABLED or not instance.is_staff:
         return
-    if instance.is_staff:
-        grupo, _ = Group.objects.get_or_create(name=DEFAULT_GROUP_NAME)
-        instance.groups.add(grupo)
+    # save(update_fields=["last_login"]) y similares no cambian is_staff
+    if not created and update_fields is not None and "is_staff" not in update_fields:
+        return
+    grupo, _ = Group.objects.get_or_create(name=DEFAULT_GROUP_NAME)
+    instance.groups.add(grupo)
+
+
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Group)
+def grupo_cambiado(sender, **kwargs):
+    # Un rename cambia lo que ve require_any_group
+    autorizacion.invalidar()
+
+
+@receiver(m2m_changed, sender=UserModel.groups.through)
+@receiver(m2m_changed, sender=UserModel.user_permissions.through)
+@receiver(m2m_changed, sender=Group.permissions.through)
+def autorizacion_cambiada(sender, action, pk_set, **kwargs):
+    # post_add con pk_set vacío: ya estaban todos, no cambió nada
+    if action == "post_clear" or (action in ("post_add", "post_remove") and pk_set):
+        autorizacion.invalidar()
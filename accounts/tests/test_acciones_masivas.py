@@ -0,0 +1,83 @@
+# accounts/tests/test_acciones_masivas.py
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from propiedades.models import Propiedad, propiedades_actualizadas
+from propiedades.tests.factories import crear_propiedad
+from .test_panel import ensure_cargadores_group
+
+User = get_user_model()
+
+
+@override_settings(
+    STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    }
+)
+class AccionesMasivasTests(TestCase):
+    url = reverse("panel_propiedades_estado")
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="cargador", dni="33333333", password="Clave123*", is_staff=True,
+        )
+        self.user.groups.add(ensure_cargadores_group())
+        self.client.force_login(self.user)
+        self.quilmes = [crear_propiedad(f"Casa {i}") for i in range(5)]
+        self.bernal = [crear_propiedad(f"Depto {i}", localidad="Bernal") for i in range(3)]
+        self.recibidos = []
+        propiedades_actualizadas.connect(self._recibir)
+        self.addCleanup(propiedades_actualizadas.disconnect, self._recibir)
+
+    def _recibir(self, sender, ids, campos, **kwargs):
+        self.recibidos.append(sorted(ids))
+
+    def _estados(self):
+        return dict(Propiedad.objects.values_list("pk", "estado"))
+
+    def test_seleccion_un_update_y_una_senal(self):
+        elegidas = [p.pk for p in self.quilmes[:3]]
+        Propiedad.objects.filter(pk__in=elegidas).update(actualizado=self.quilmes[0].actualizado - timedelta(days=1))
+
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as ctx:
+            r = self.client.post(self.url, {"accion": "pausar", "ids": elegidas})
+        self.assertEqual(r.status_code, 302)
+        # Sobre la tabla de propiedades: el SELECT de ids y un único UPDATE
+        sql = [q["sql"] for q in ctx.captured_queries if "propiedades_propiedad" in q["sql"]]
+        self.assertEqual(len(sql), 2, sql)
+        self.assertTrue(sql[1].startswith("UPDATE"))
+
+        estados = self._estados()
+        self.assertEqual({pk for pk, e in estados.items() if e == "pausada"}, set(elegidas))
+        self.assertEqual(self.recibidos, [sorted(elegidas)])
+        # `actualizado` avanza: el feed de cambios y los sitemaps lo ven
+        for p in Propiedad.objects.filter(pk__in=elegidas):
+            self.assertGreater(p.actualizado, self.quilmes[0].actualizado)
+
+    def test_filtro_y_cantidad_reportada(self):
+        self.quilmes[0].estado = "finalizada"
+        self.quilmes[0].save()
+        r = self.client.post(self.url, {"accion": "finalizar", "alcance": "filtro", "localidad": "quilmes"},
+                             follow=True)
+        # La que ya estaba finalizada no cuenta
+        self.assertContains(r, "4 propiedad(es) finalizada(s).")
+        self.assertEqual(r.redirect_chain[-1][0], reverse("panel_propiedades_list") + "?localidad=quilmes")
+        estados = self._estados()
+        self.assertTrue(all(estados[p.pk] == "finalizada" for p in self.quilmes))
+        self.assertTrue(all(estados[p.pk] == "activa" for p in self.bernal))
+
+    def test_sin_seleccion_o_accion_invalida_no_toca_nada(self):
+        r = self.client.post(self.url, {"accion": "pausar"}, follow=True)
+        self.assertContains(r, "No seleccionaste ninguna propiedad.")
+        r = self.client.post(self.url, {"accion": "borrar", "ids": [self.bernal[0].pk]}, follow=True)
+        self.assertContains(r, "Acción inválida.")
+        self.assertEqual(set(self._estados().values()), {"activa"})
+
+    def test_solo_post(self):
+        self.assertEqual(self.client.get(self.url).status_code, 405)
@@ -55,3 +55,67 @@ class LoginTests(TestCase):
         })
         self.assertEqual(resp.status_code, 200)  # se queda en login
         self.assertContains(resp, "No tenés permisos de acceso al panel", status_code=200)
+
+
+@override_settings(
+    STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    }
+)
+class LoginBackendYLimiteTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(
+            username="operador1", dni="12345678", password="Dpsn2025*", is_staff=True,
+        )
+        # Un username igual al DNI de otro: el DNI tiene prioridad
+        User.objects.create_user(username="12345678", dni="555", password="Otra2025*", is_staff=True)
+        self.login_url = reverse("login")
+
+    def test_backend_dni_o_usuario_en_una_query(self):
+        from django.contrib.auth import authenticate
+        with self.assertNumQueries(1):
+            self.assertEqual(authenticate(username="12345678", password="Dpsn2025*"), self.staff)
+        with self.assertNumQueries(1):
+            self.assertEqual(authenticate(username="operador1", password="Dpsn2025*"), self.staff)
+        self.assertIsNone(authenticate(username="nadie", password="Dpsn2025*"))
+
+    @override_settings(LOGIN_INTENTOS_MAX=3)
+    def test_limite_corta_antes_de_validar_la_clave(self):
+        from unittest import mock
+        for _ in range(3):
+            r = self.client.post(self.login_url, {"usuario_o_dni": "operador1", "password": "mal"})
+            self.assertContains(r, "Credenciales inválidas")
+        # Bloqueado aun con la clave correcta, y sin llegar a check_password
+        with mock.patch.object(User, "check_password") as check:
+            r = self.client.post(self.login_url, {"usuario_o_dni": "operador1", "password": "Dpsn2025*"})
+        self.assertContains(r, "Demasiados intentos")
+        check.assert_not_called()
+        # Otro identificador desde la misma IP no está bloqueado
+        r = self.client.post(self.login_url, {"usuario_o_dni": "12345678", "password": "Dpsn2025*"})
+        self.assertEqual(r.status_code, 302)
+
+    @override_settings(LOGIN_INTENTOS_MAX_USUARIO=2)
+    def test_limite_por_identificador_desde_cualquier_ip(self):
+        for ip in ("10.0.0.1", "10.0.0.2"):
+            self.client.post(self.login_url, {"usuario_o_dni": "operador1", "password": "mal"}, REMOTE_ADDR=ip)
+        r = self.client.post(self.login_url, {"usuario_o_dni": "operador1", "password": "Dpsn2025*"},
+                             REMOTE_ADDR="10.0.0.1")
+        self.assertContains(r, "Demasiados intentos")
+        # Una IP sin fallos entra igual: errar a propósito no deja afuera al usuario
+        r = self.client.post(self.login_url, {"usuario_o_dni": "operador1", "password": "Dpsn2025*"},
+                             REMOTE_ADDR="10.0.0.3")
+        self.assertEqual(r.status_code, 302)
+
+    @override_settings(LOGIN_INTENTOS_MAX=2)
+    def test_intentos_rechazados_no_alargan_el_bloqueo(self):
+        from accounts.models import IntentoLogin
+        for _ in range(5):
+            self.client.post(self.login_url, {"usuario_o_dni": "operador1", "password": "mal"})
+        self.assertEqual(IntentoLogin.objects.filter(identificador="operador1").count(), 2)
+
+    def test_login_ok_limpia_intentos(self):
+        from accounts.models import IntentoLogin
+        self.client.post(self.login_url, {"usuario_o_dni": "operador1", "password": "mal"})
+        self.client.post(self.login_url, {"usuario_o_dni": "operador1", "password": "Dpsn2025*"})
+        self.assertFalse(IntentoLogin.objects.filter(identificador="operador1").exists())
@@ -0,0 +1,62 @@
+# accounts/tests/test_autorizacion.py
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+User = get_user_model()
+
+
+def queries_de_auth(ctx):
+    return [q["sql"] for q in ctx.captured_queries if "auth_group" in q["sql"] or "auth_permission" in q["sql"]]
+
+
+@override_settings(
+    STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    }
+)
+class AutorizacionCacheadaTests(TestCase):
+    url = reverse("panel_propiedades_list")
+
+    def setUp(self):
+        # El signal lo agrega a AdministradorCliente por ser staff
+        self.user = User.objects.create_user(username="staff", dni="1", password="x", is_staff=True)
+        self.grupo = Group.objects.get(name="AdministradorCliente")
+        self.view = Permission.objects.get(codename="view_propiedad")
+        self.grupo.permissions.add(self.view)
+        self.client.force_login(self.user)
+
+    def test_se_resuelve_una_vez_por_sesion(self):
+        with CaptureQueriesContext(connection) as primero:
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertTrue(queries_de_auth(primero))
+
+        with CaptureQueriesContext(connection) as segundo:
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertEqual(queries_de_auth(segundo), [])
+
+    def test_quitar_permiso_del_grupo_invalida(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.grupo.permissions.remove(self.view)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_sacar_del_grupo_invalida(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.user.groups.remove(self.grupo)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    @override_settings(AUTORIZACION_TTL=0)
+    def test_ttl_vencido_re_resuelve(self):
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.url)
+        self.assertTrue(queries_de_auth(ctx))
+
+    def test_save_parcial_no_toca_grupos(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.user.save(update_fields=["last_login"])
+        self.assertEqual(queries_de_auth(ctx), [])
@@ -0,0 +1,88 @@
+# accounts/tests/test_ipallowlist.py
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+from accounts.management.commands.bench_ipallowlist import lineal, medir, redes_aleatorias
+from django_inmobiliaria.ipmatch import IPMatcher, ip_cliente
+from django_inmobiliaria.middleware import IPAllowlistMiddleware
+
+CF = "173.245.48.10"  # dentro de los rangos de Cloudflare por defecto
+
+
+class IPMatcherTests(SimpleTestCase):
+    def test_redes_ips_y_familias(self):
+        with self.assertLogs("django_inmobiliaria.ipmatch", "WARNING"):
+            m = IPMatcher(["10.0.0.0/24", "186.57.154.224", "2802:8010::/32", "basura", "10.0.1.0/24"])
+        self.assertEqual(len(m), 3)  # las dos /24 se fusionan y "basura" se ignora
+        for ip in ("10.0.0.0", "10.0.1.255", "186.57.154.224", "2802:8010:6131::1", "::ffff:10.0.0.7"):
+            self.assertIn(ip, m)
+        for ip in ("10.0.2.0", "186.57.154.225", "2802:8011::1", "", "no-es-ip", "9.255.255.255"):
+            self.assertNotIn(ip, m)
+
+    def test_rangos_contiguos_no_alineados(self):
+        m = IPMatcher(["10.0.1.0/24", "10.0.2.0/23"])
+        self.assertEqual(len(m), 1)
+        self.assertIn("10.0.3.255", m)
+        self.assertNotIn("10.0.4.0", m)
+
+    def test_coincide_con_el_scan_lineal(self):
+        redes = redes_aleatorias(300)
+        m, referencia = IPMatcher(redes), lineal(redes)
+        for red in redes[:50]:
+            base = red.split("/")[0]
+            self.assertEqual(base in m, referencia(base))
+        self.assertEqual(set(medir(20, 100, 10)), {"lineal", "bisect", "bisect+lru"})
+
+
+class IPClienteTests(SimpleTestCase):
+    def test_sin_proxy_se_ignoran_los_headers(self):
+        meta = {"REMOTE_ADDR": "200.1.1.1", "HTTP_X_FORWARDED_FOR": "186.57.154.224",
+                "HTTP_CF_CONNECTING_IP": "186.57.154.224"}
+        self.assertEqual(ip_cliente(meta), "200.1.1.1")
+
+    def test_cadena_de_proxies_propios(self):
+        # el cliente metió un hop falso a la izquierda; el balanceador agregó el real
+        meta = {"REMOTE_ADDR": "10.0.0.5", "HTTP_X_FORWARDED_FOR": "186.57.154.224, 200.1.1.1, 192.168.1.2"}
+        self.assertEqual(ip_cliente(meta), "200.1.1.1")
+        self.assertEqual(ip_cliente({"REMOTE_ADDR": "127.0.0.1"}), "127.0.0.1")
+
+    def test_cloudflare(self):
+        self.assertEqual(ip_cliente({"REMOTE_ADDR": CF, "HTTP_CF_CONNECTING_IP": "200.1.1.1"}), "200.1.1.1")
+        detras_del_balanceador = {"REMOTE_ADDR": "10.0.0.5", "HTTP_X_FORWARDED_FOR": f"200.1.1.1, {CF}",
+                                  "HTTP_CF_CONNECTING_IP": "200.1.1.1"}
+        self.assertEqual(ip_cliente(detras_del_balanceador), "200.1.1.1")
+        with override_settings(CLOUDFLARE_IPS="198.51.100.0/24"):
+            self.assertEqual(ip_cliente({"REMOTE_ADDR": CF, "HTTP_CF_CONNECTING_IP": "200.1.1.1"}), CF)
+
+    @override_settings(TRUSTED_PROXIES="")
+    def test_sin_proxies_de_confianza(self):
+        self.assertEqual(ip_cliente({"REMOTE_ADDR": "10.0.0.5", "HTTP_X_FORWARDED_FOR": "200.1.1.1"}), "10.0.0.5")
+
+
+class AllowlistMiddlewareTests(SimpleTestCase):
+    def test_archivo_y_xff_falso(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".txt") as fh:
+            fh.write("# oficina\n186.57.154.0/24\n\n2802:8010::/32  # vpn\n")
+            fh.flush()
+            with override_settings(IP_ALLOWLIST_ENABLED=True, ALLOWED_IPS="1.2.3.4", ALLOWED_IPS_FILE=fh.name):
+                mw = IPAllowlistMiddleware(lambda request: "ok")
+                self.assertTrue(mw._is_allowed("186.57.154.9"))
+                self.assertTrue(mw._is_allowed("1.2.3.4"))
+                self.assertTrue(mw._is_allowed("2802:8010::1"))
+
+                url = IPAllowlistMiddleware.PROTECTED_PREFIXES[0]
+                r = self.client.get(url, REMOTE_ADDR="200.1.1.1", HTTP_X_FORWARDED_FOR="186.57.154.9")
+                self.assertEqual(r.status_code, 403)
+                r = self.client.get(url, REMOTE_ADDR="10.0.0.5", HTTP_X_FORWARDED_FOR="186.57.154.9")
+                self.assertNotEqual(r.status_code, 403)
+
+    def test_archivo_inexistente_no_rompe(self):
+        with override_settings(IP_ALLOWLIST_ENABLED=True, ALLOWED_IPS="1.2.3.4",
+                               ALLOWED_IPS_FILE="/no/existe/allowlist.txt"):
+            with self.assertLogs("django_inmobiliaria.ipmatch", "ERROR"):
+                mw = IPAllowlistMiddleware(lambda request: "ok")
+                self.assertTrue(mw._is_allowed("1.2.3.4"))
+            self.assertFalse(mw._is_allowed("186.57.154.9"))
+            url = IPAllowlistMiddleware.PROTECTED_PREFIXES[0]
+            self.assertEqual(self.client.get(url, REMOTE_ADDR="200.1.1.1").status_code, 403)
@@ -132,3 +132,28 @@ class PanelPermissionsTests(TestCase):
         self.client.force_login(self.staff_cargador)
         resp = self.client.get(self.edit_url)
         self.assertEqual(resp.status_code, 200)
+
+    def test_list_busqueda(self):
+        otra = Propiedad.objects.create(
+            codigo="ABCD1234", titulo="Casa en Bernal", descripcion="jardín",
+            precio_usd=90000, tipo="casa", tipo_operacion="venta",
+            superficie_total=120, superficie_cubierta=100, estado="activa",
+            direccion="Av. Siempreviva 742", localidad="Bernal",
+            provincia="Buenos Aires", pais="Argentina",
+        )
+        self.client.force_login(self.staff_cargador)
+
+        def codigos(**params):
+            resp = self.client.get(self.list_url, params)
+            self.assertEqual(resp.status_code, 200)
+            return {p.codigo for p in resp.context["page_obj"]}
+
+        # Código exacto (case-insensitive) → índice único
+        self.assertEqual(codigos(q="abcd1234"), {"ABCD1234"})
+        # Términos normalizados: sin acentos ni mayúsculas, todos deben estar
+        self.assertEqual(codigos(q="JARDIN bernal"), {"ABCD1234"})
+        self.assertEqual(codigos(q="jardin quilmes"), set())
+        # Código parcial: va por search_index
+        self.assertEqual(codigos(q="test0"), {"TEST001"})
+        self.assertEqual(codigos(localidad="QUILMES"), {"TEST001"})
+        self.assertEqual(codigos(), {"TEST001", otra.codigo})
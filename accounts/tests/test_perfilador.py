@@ -0,0 +1,59 @@
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from django_inmobiliaria import perfilador
+
+User = get_user_model()
+
+
+class PerfiladorTests(TestCase):
+    def setUp(self):
+        carpeta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, carpeta, ignore_errors=True)
+        ajustes = override_settings(
+            PERFILES_DIR=carpeta,
+            ALLOWED_IPS="10.1.2.3",
+            STORAGES={
+                "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+                "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+            },
+        )
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.staff = User.objects.create_user(
+            username="staff", dni="12345678", password="Clave123*", is_staff=True,
+        )
+        self.url = reverse("buscar_propiedades")
+        self.token = perfilador.generar_token("staff")
+
+    def test_staff_con_token_guarda_perfil_y_lo_ve_en_el_panel(self):
+        self.client.force_login(self.staff)
+        r = self.client.get(self.url, {"q": "casa", "_perfil": self.token})
+        perfil_id = r["X-Perfil-Id"]
+
+        [meta] = perfilador.listar()
+        self.assertEqual(meta["id"], perfil_id)
+        self.assertEqual((meta["path"], meta["query"], meta["usuario"]), (self.url, "q=casa", "staff"))
+
+        panel = self.client.get(reverse("panel_perfiles"))
+        self.assertContains(panel, perfil_id)
+        detalle = self.client.get(reverse("panel_perfil_detalle", args=[perfil_id]))
+        self.assertContains(detalle, "function calls")
+        self.assertEqual(self.client.get(reverse("panel_perfil_detalle", args=["..x"])).status_code, 404)
+
+    def test_header_desde_ip_permitida(self):
+        r = self.client.get(self.url, HTTP_X_PERFIL=self.token, REMOTE_ADDR="10.1.2.3")
+        self.assertIn("X-Perfil-Id", r)
+
+    def test_noop_para_anonimos_y_tokens_invalidos(self):
+        r = self.client.get(self.url, {"_perfil": self.token})
+        self.assertNotIn("X-Perfil-Id", r)
+
+        self.client.force_login(self.staff)
+        r = self.client.get(self.url, {"_perfil": self.token + "x"})
+        self.assertNotIn("X-Perfil-Id", r)
+        self.assertEqual(perfilador.listar(), [])
@@ -0,0 +1,52 @@
+# accounts/tests/test_sesiones.py
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.contrib.sessions.models import Session
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from accounts.management.commands.bench_sesiones import simular
+from django_inmobiliaria.middleware import SesionDeslizanteMiddleware
+
+
+@override_settings(SESSION_ENGINE="django.contrib.sessions.backends.db",
+                   SESSION_COOKIE_AGE=600, SESSION_RENOVAR_SI_QUEDAN=480)
+class SesionDeslizanteTests(TestCase):
+    def test_escribe_solo_al_cruzar_el_umbral(self):
+        # 1 request cada 10 s durante 10 minutos: una escritura cada 2 minutos
+        escrituras, _, _ = simular(60, 10, deslizante=True)
+        self.assertEqual(escrituras, 5)
+        escrituras, _, _ = simular(60, 10, deslizante=False)
+        self.assertEqual(escrituras, 60)
+
+    def test_la_expiracion_se_desliza(self):
+        reloj = [1_000_000.0]
+        mw = SesionDeslizanteMiddleware(lambda r: HttpResponse("ok"))
+        mw.reloj = lambda: reloj[0]
+        cadena = SessionMiddleware(mw)
+
+        store = Session.get_session_store_class()()
+        store["dato"] = 1
+        store.save()
+
+        def pedir():
+            request = RequestFactory().get("/")
+            request.COOKIES["sessionid"] = store.session_key
+            return cadena(request)
+
+        r = pedir()  # sesión sin marca (p.ej. previa al deploy): se escribe
+        self.assertIn("sessionid", r.cookies)
+        vence = Session.objects.get(pk=store.session_key).expire_date
+        reloj[0] += 60
+        self.assertNotIn("sessionid", pedir().cookies)
+        reloj[0] += 61
+        r = pedir()
+        self.assertIn("sessionid", r.cookies)
+        self.assertGreater(Session.objects.get(pk=store.session_key).expire_date, vence)
+
+    def test_cookie_invalida_no_crea_sesion(self):
+        cadena = SessionMiddleware(SesionDeslizanteMiddleware(lambda r: HttpResponse("ok")))
+        request = RequestFactory().get("/")
+        request.COOKIES["sessionid"] = "x" * 32
+        r = cadena(request)
+        self.assertEqual(r.cookies["sessionid"].value, "")  # Django la borra
+        self.assertFalse(Session.objects.exists())
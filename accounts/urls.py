@@ -6,11 +6,15 @@ urlpatterns = [
     path("logout/", v.logout_view, name="logout"),
 
     path("panel/", v.panel_home, name="panel_home"),
+    path("panel/perfiles/", v.panel_perfiles, name="panel_perfiles"),
+    path("panel/perfiles/<str:perfil_id>/", v.panel_perfil_detalle, name="panel_perfil_detalle"),
+    path("panel/perfiles/<str:perfil_id>/descargar/", v.panel_perfil_descargar, name="panel_perfil_descargar"),
 
     path("panel/propiedades/", v.panel_propiedades_list, name="panel_propiedades_list"),
     path("panel/propiedades/nueva/", v.panel_propiedad_crear, name="panel_propiedad_crear"),
     path("panel/propiedades/<int:pk>/editar/", v.panel_propiedad_editar, name="panel_propiedad_editar"),
 
+    path("panel/propiedades/estado/", v.panel_propiedades_estado, name="panel_propiedades_estado"),
     path("panel/propiedades/<int:pk>/pausar/", v.panel_propiedad_pausar, name="panel_propiedad_pausar"),
     path("panel/propiedades/<int:pk>/activar/", v.panel_propiedad_activar, name="panel_propiedad_activar"),
     path("panel/propiedades/<int:pk>/finalizar/", v.panel_propiedad_finalizar, name="panel_propiedad_finalizar"),
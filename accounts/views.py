@@ -1,4 +1,8 @@
 # accounts/views.py
+import re
+from functools import wraps
+from urllib.parse import urlencode
+
 from django.contrib import messages
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import (
@@ -6,15 +10,20 @@ from django.contrib.auth.decorators import (
     user_passes_test,
     permission_required,
 )
-from django.core.cache import cache
 from django.core.paginator import Paginator
 from django.db import transaction, IntegrityError
-from django.db.models import Q
+from django.http import FileResponse, Http404
 from django.shortcuts import render, redirect, get_object_or_404
+from django.views.decorators.http import require_POST
 from django.core.exceptions import PermissionDenied
 
 from .forms import LoginDNIForm, PropiedadForm, PropiedadImagenFormSet
-from propiedades.models import Propiedad
+from .models import IntentoLogin
+from propiedades.models import EstadisticaPanel, Propiedad
+from propiedades.utils import normalizar_texto
+from django_inmobiliaria import perfilador
+from django_inmobiliaria import ipmatch
+from . import autorizacion
 
 from django.urls import reverse
 
@@ -26,15 +35,23 @@ GROUP_NAME = "AdministradorCliente"
 
 
 def staff_required(view):
-    """Requiere usuario autenticado y is_staff=True."""
-    return login_required(user_passes_test(lambda u: u.is_staff, login_url="login")(view))
+    """
+    Requiere usuario autenticado y is_staff=True. Deja cargados grupos y
+    permisos desde la sesión (autorizacion.py): los chequeos que siguen no
+    hacen queries.
+    """
+    @wraps(view)
+    def _autorizado(request, *args, **kwargs):
+        autorizacion.cargar(request)
+        return view(request, *args, **kwargs)
+    return login_required(user_passes_test(lambda u: u.is_staff, login_url="login")(_autorizado))
 
 
 def require_any_group(user, names):
     """Exige pertenecer a al menos uno de los grupos dados."""
     if not user.is_authenticated:
         raise PermissionDenied
-    if not user.groups.filter(name__in=names).exists():
+    if not autorizacion.en_grupo(user, names):
         raise PermissionDenied
 
 
@@ -45,27 +62,28 @@ def login_view(request):
     """
     Login para STAFF.
     - Usuario/DNI + contraseña.
-    - Rate-limit: 5 intentos/15min por IP+identificador.
+    - Rate-limit compartido entre workers (IntentoLogin): 5 fallidos/15min
+      por IP+identificador y 20 por identificador (este solo para las IPs
+      que ya fallaron). Se corta antes de validar la contraseña.
     - Si valida -> redirige a listado de propiedades.
     """
     form = LoginDNIForm(request.POST or None)
     if request.method == "POST":
         ident = (request.POST.get("usuario_o_dni") or "").strip()
-        ip = request.META.get("REMOTE_ADDR", "")
-        key = f"login_attempts:{ip}:{ident}"
-        attempts = cache.get(key, 0)
+        ip = ipmatch.ip_cliente(request.META)
 
-        if attempts >= 5:
+        if not IntentoLogin.permitir(ip, ident):
             messages.error(request, "Demasiados intentos. Probá en 15 minutos.")
+            # Sin bindear: si el template muestra errores no valida (ni hashea)
+            form = LoginDNIForm(initial={"usuario_o_dni": ident})
         else:
             if form.is_valid():
                 user = form.cleaned_data["user"]
                 login(request, user)
-                cache.delete(key)
+                IntentoLogin.limpiar(ip, ident)
                 nxt = request.GET.get("next")
                 return redirect(nxt or "panel_propiedades_list")
             else:
-                cache.set(key, attempts + 1, 15 * 60)
                 messages.error(request, "Credenciales inválidas.")
 
     return render(request, "accounts/login.html", {"form": form})
@@ -78,12 +96,122 @@ def logout_view(request):
     return redirect(next_url)
 
 
+# =========================
+# Búsqueda del panel
+# =========================
+CODIGO_RE = re.compile(r"^[A-Za-z]{4}\d{4}$")
+COLUMNAS_LISTADO_PANEL = (
+    "id", "codigo", "titulo", "tipo", "tipo_operacion",
+    "localidad", "provincia", "estado", "destacada", "creado",
+)
+
+
+# accion -> (estado, texto para los mensajes)
+ACCIONES_ESTADO = {
+    "pausar": ("pausada", "pausada(s)"),
+    "activar": ("activa", "activada(s)"),
+    "finalizar": ("finalizada", "finalizada(s)"),
+}
+
+
+def filtros_panel(params):
+    return {k: (params.get(k) or "").strip() for k in ("q", "estado", "localidad")}
+
+
+def filtrar_panel(qs, filtros):
+    """Los filtros del listado; los comparte la acción masiva `alcance=filtro`."""
+    if filtros["q"]:
+        qs = filtrar_busqueda_panel(qs, filtros["q"])
+    if filtros["estado"]:
+        qs = qs.filter(estado=filtros["estado"])
+    if filtros["localidad"]:
+        qs = qs.filter(localidad_norm__contains=normalizar_texto(filtros["localidad"]))
+    return qs
+
+
+def filtrar_busqueda_panel(qs, q):
+    """
+    Un código (ABCD1234) va directo al índice único de `codigo`. El resto se
+    busca término a término en `search_index` (normalizado, incluye el
+    código): LIKE '%término%', que en Postgres usa el índice trigram
+    (migración 0006).
+    """
+    if CODIGO_RE.match(q):
+        return qs.filter(codigo=q.upper())
+    for termino in normalizar_texto(q).split():
+        qs = qs.filter(search_index__contains=termino)
+    return qs
+
+
 # =========================
 # Panel (home)
 # =========================
+SECCIONES_RESUMEN = [
+    # dimensión, título, etiquetas, filtro del listado
+    ("estado", "Por estado", dict(Propiedad.ESTADO_PUBLICACION), "estado"),
+    ("tipo", "Por tipo", dict(Propiedad.TIPO_PROPIEDAD_CHOICES), None),
+    ("tipo_operacion", "Por operación", dict(Propiedad.TIPO_OPERACION_CHOICES), None),
+    ("localidad", "Localidades con más propiedades", {}, "localidad"),
+]
+
+
 @staff_required
 def panel_home(request):
-    return render(request, "accounts/panel/home_panel.html")
+    # Contadores precalculados (EstadisticaPanel) y lo último tocado: dos
+    # queries chicas, sin GROUP BY sobre propiedades
+    resumen = EstadisticaPanel.resumen()
+    secciones = []
+    for dimension, titulo, etiquetas, filtro in SECCIONES_RESUMEN:
+        filas = [
+            {
+                "etiqueta": etiquetas.get(valor, valor),
+                "cantidad": cantidad,
+                "url": f"{reverse('panel_propiedades_list')}?{urlencode({filtro: valor})}" if filtro else "",
+            }
+            for valor, cantidad in resumen[dimension]
+        ]
+        secciones.append({"titulo": titulo, "filas": filas})
+    total = sum(cantidad for _, cantidad in resumen["estado"])
+    recientes = (Propiedad.objects.only("codigo", "titulo", "estado", "actualizado")
+                 .order_by("-actualizado", "-id")[:8])
+    return render(request, "accounts/panel/home_panel.html", {
+        "secciones": secciones, "total": total, "recientes": recientes,
+    })
+
+
+# =========================
+# Perfiles (cProfile a pedido)
+# =========================
+@staff_required
+def panel_perfiles(request):
+    token = perfilador.generar_token(request.user.get_username())
+    ctx = {
+        "perfiles": perfilador.listar(),
+        "token": token,
+        "parametro": perfilador.PARAMETRO,
+        "header": perfilador.HEADER,
+        "ejemplo": request.build_absolute_uri(reverse("buscar_propiedades")) + f"?q=casa&{perfilador.PARAMETRO}={token}",
+    }
+    return render(request, "accounts/panel/perfiles.html", ctx)
+
+
+@staff_required
+def panel_perfil_detalle(request, perfil_id):
+    orden = request.GET.get("orden") or "cumulative"
+    texto = perfilador.resumen(perfil_id, orden)
+    if texto is None:
+        raise Http404("Perfil inexistente")
+    meta = next((p for p in perfilador.listar() if p["id"] == perfil_id), {"id": perfil_id})
+    ctx = {"perfil": meta, "texto": texto, "orden": orden, "ordenes": perfilador.ORDENES}
+    return render(request, "accounts/panel/perfil_detalle.html", ctx)
+
+
+@staff_required
+def panel_perfil_descargar(request, perfil_id):
+    ruta = perfilador.ruta_prof(perfil_id)
+    if ruta is None:
+        raise Http404("Perfil inexistente")
+    return FileResponse(open(ruta, "rb"), as_attachment=True, filename=ruta.name)
 
 
 # =========================
@@ -92,37 +220,53 @@ def panel_home(request):
 @staff_required
 @permission_required("propiedades.view_propiedad", raise_exception=True)
 def panel_propiedades_list(request):
-    # Gate por grupo + permiso explícito
+    # Gate por grupo (el permiso lo chequea el decorador)
     require_any_group(request.user, (GROUP_NAME,))
-    if not request.user.has_perm("propiedades.view_propiedad"):
-        raise PermissionDenied
 
-    qs = Propiedad.objects.all().order_by("-creado")
-
-    q = request.GET.get("q") or ""
-    estado = request.GET.get("estado") or ""
-    localidad = request.GET.get("localidad") or ""
-
-    if q:
-        qs = qs.filter(
-            Q(titulo__icontains=q)
-            | Q(descripcion__icontains=q)
-            | Q(direccion__icontains=q)
-            | Q(localidad__icontains=q)
-            | Q(provincia__icontains=q)
-            | Q(pais__icontains=q)
-            | Q(codigo__icontains=q)
-        )
-    if estado:
-        qs = qs.filter(estado=estado)
-    if localidad:
-        qs = qs.filter(localidad__icontains=localidad)
+    filtros = filtros_panel(request.GET)
+    # Solo las columnas que muestra la tabla
+    qs = filtrar_panel(Propiedad.objects.only(*COLUMNAS_LISTADO_PANEL), filtros).order_by("-creado")
 
     page_obj = Paginator(qs, 20).get_page(request.GET.get("page"))
-    ctx = {"page_obj": page_obj, "q": q, "estado": estado, "localidad": localidad}
+    ctx = {"page_obj": page_obj, **filtros}
     return render(request, "accounts/panel/propiedades_list.html", ctx)
 
 
+@staff_required
+@permission_required("propiedades.change_propiedad", raise_exception=True)
+@require_POST
+def panel_propiedades_estado(request):
+    """
+    Acción masiva del listado: pausar/activar/finalizar las propiedades
+    tildadas (`ids`) o todas las que cumplen el filtro actual
+    (`alcance=filtro`), con Propiedad.cambiar_estado (UPDATE, no save()).
+    """
+    require_any_group(request.user, (GROUP_NAME,))
+    filtros = filtros_panel(request.POST)
+    volver = reverse("panel_propiedades_list")
+    if any(filtros.values()):
+        volver += "?" + urlencode({k: v for k, v in filtros.items() if v})
+
+    accion = request.POST.get("accion")
+    if accion not in ACCIONES_ESTADO:
+        messages.error(request, "Acción inválida.")
+        return redirect(volver)
+
+    if request.POST.get("alcance") == "filtro":
+        qs = filtrar_panel(Propiedad.objects.all(), filtros)
+    else:
+        ids = [i for i in request.POST.getlist("ids") if i.isdigit()]
+        if not ids:
+            messages.warning(request, "No seleccionaste ninguna propiedad.")
+            return redirect(volver)
+        qs = Propiedad.objects.filter(pk__in=ids)
+
+    estado, etiqueta = ACCIONES_ESTADO[accion]
+    n = len(Propiedad.cambiar_estado(qs, estado))
+    messages.success(request, f"{n} propiedad(es) {etiqueta}.")
+    return redirect(volver)
+
+
 def _validar_max_imagenes(formset, instancia_propiedad, max_total=20):
     existentes_no_borradas = 0
     for f in formset.forms:
@@ -145,8 +289,6 @@ def _validar_max_imagenes(formset, instancia_propiedad, max_total=20):
 @transaction.atomic
 def panel_propiedad_crear(request):
     require_any_group(request.user, (GROUP_NAME,))
-    if not request.user.has_perm("propiedades.add_propiedad"):
-        raise PermissionDenied
 
     prop = Propiedad()
     if request.method == "POST":
@@ -182,8 +324,6 @@ def panel_propiedad_crear(request):
 @transaction.atomic
 def panel_propiedad_editar(request, pk):
     require_any_group(request.user, (GROUP_NAME,))
-    if not request.user.has_perm("propiedades.change_propiedad"):
-        raise PermissionDenied
 
     prop = get_object_or_404(Propiedad, pk=pk)
     if request.method == "POST":
@@ -218,11 +358,8 @@ def panel_propiedad_editar(request, pk):
 @permission_required("propiedades.change_propiedad", raise_exception=True)
 def panel_propiedad_pausar(request, pk):
     require_any_group(request.user, (GROUP_NAME,))
-    if not request.user.has_perm("propiedades.change_propiedad"):
-        raise PermissionDenied
-    prop = get_object_or_404(Propiedad, pk=pk)
-    prop.estado = "pausada"
-    prop.save(update_fields=["estado"])
+    prop = get_object_or_404(Propiedad.objects.only("codigo"), pk=pk)
+    Propiedad.cambiar_estado(Propiedad.objects.filter(pk=pk), "pausada")
     messages.info(request, f"{prop.codigo} pausada.")
     return redirect("panel_propiedades_list")
 
@@ -231,11 +368,8 @@ def panel_propiedad_pausar(request, pk):
 @permission_required("propiedades.change_propiedad", raise_exception=True)
 def panel_propiedad_activar(request, pk):
     require_any_group(request.user, (GROUP_NAME,))
-    if not request.user.has_perm("propiedades.change_propiedad"):
-        raise PermissionDenied
-    prop = get_object_or_404(Propiedad, pk=pk)
-    prop.estado = "activa"
-    prop.save(update_fields=["estado"])
+    prop = get_object_or_404(Propiedad.objects.only("codigo"), pk=pk)
+    Propiedad.cambiar_estado(Propiedad.objects.filter(pk=pk), "activa")
     messages.success(request, f"{prop.codigo} activada.")
     return redirect("panel_propiedades_list")
 
@@ -244,10 +378,7 @@ def panel_propiedad_activar(request, pk):
 @permission_required("propiedades.change_propiedad", raise_exception=True)
 def panel_propiedad_finalizar(request, pk):
     require_any_group(request.user, (GROUP_NAME,))
-    if not request.user.has_perm("propiedades.change_propiedad"):
-        raise PermissionDenied
-    prop = get_object_or_404(Propiedad, pk=pk)
-    prop.estado = "finalizada"
-    prop.save(update_fields=["estado"])
+    prop = get_object_or_404(Propiedad.objects.only("codigo"), pk=pk)
+    Propiedad.cambiar_estado(Propiedad.objects.filter(pk=pk), "finalizada")
     messages.warning(request, f"{prop.codigo} finalizada.")
     return redirect("panel_propiedades_list")
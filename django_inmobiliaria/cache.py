@@ -0,0 +1,371 @@
+# django_inmobiliaria/cache.py
+"""
+Cache de dos niveles (CACHE_BACKEND=dos_niveles en settings): una L1 en
+memoria del proceso delante de una L2 compartida por todos los workers
+(Redis o base).
+
+Invalidación por clave: toda escritura que puede dejar vieja una copia en
+otra L1 (set, delete, incr...) va a la L2 y deja asentada la clave en un
+registro de cambios compartido: un contador (incr atómico en la L2) y una
+entrada por cambio. Cada proceso relee el contador como mucho cada
+L1_CHEQUEO segundos y borra de su L1 solo las claves que cambiaron; si se
+atrasó más que el registro (o hubo un clear()), vacía su L1 entera. En el
+worker que escribe el cambio se ve al instante; en los demás, en a lo sumo
+L1_CHEQUEO segundos. Además ninguna entrada vive en L1 más de L1_TIMEOUT
+segundos.
+
+El contador necesita incr() atómico: la L2 tiene que ser RedisCache o
+DatabaseCacheAtomica (FileBasedCache y DatabaseCache hacen get + set, y dos
+escrituras simultáneas podrían dejar el mismo número).
+
+Las misses no se guardan en L1, así que un add() exitoso no asienta nada.
+
+También: cached_compute(), para cálculos caros sin estampida al vencer.
+"""
+import base64
+import hashlib
+import logging
+import os
+import pickle
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows (solo desarrollo)
+    fcntl = None
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections, router, transaction
+from django.utils.module_loading import import_string
+
+SECUENCIA = "__l1_secuencia__"
+CAMBIO = "__l1_cambio__:{}"
+TODO = "*"              # cambio que invalida toda la L1 (clear)
+MAX_CAMBIOS = 1000      # más atraso que esto: se vacía la L1 en vez de leer el registro
+_FALTA = object()
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseCacheAtomica(DatabaseCache):
+    """DatabaseCache con incr() atómico (el heredado de BaseCache es get + set)."""
+
+    def incr(self, key, delta=1, version=None):
+        db = router.db_for_write(self.cache_model_class)
+        conexion = connections[db]
+        with transaction.atomic(using=db):
+            if conexion.features.has_select_for_update:
+                # Bloquea la fila: los incr concurrentes esperan en vez de pisarse
+                tabla = conexion.ops.quote_name(self._table)
+                with conexion.cursor() as cursor:
+                    cursor.execute(
+                        f"SELECT cache_key FROM {tabla} WHERE cache_key = %s FOR UPDATE",
+                        [self.make_and_validate_key(key, version)],
+                    )
+            return super().incr(key, delta, version)
+
+
+class DosNivelesCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        opciones = params.get("OPTIONS", {})
+        conf = {"TIMEOUT": params.get("TIMEOUT", 300), **opciones["L2"]}
+        self.l2 = import_string(conf["BACKEND"])(conf.get("LOCATION", ""), conf)
+        if not isinstance(self.l2, (RedisCache, DatabaseCacheAtomica)):
+            raise ImproperlyConfigured(
+                f"dos_niveles necesita una L2 con incr() atómico (redis o db), no {conf['BACKEND']}"
+            )
+        # LocMemCache comparte el almacenamiento por nombre: una L1 por proceso
+        # (todos los threads), separada por LOCATION.
+        self.l1 = LocMemCache(f"l1-{location}", {
+            "TIMEOUT": opciones.get("L1_TIMEOUT", 5),
+            "OPTIONS": {"MAX_ENTRIES": opciones.get("L1_MAX_ENTRIES", 1000)},
+        })
+        self.chequeo = opciones.get("L1_CHEQUEO", 1.0)
+        # Cada cambio tiene que sobrevivir al atraso posible de un lector; más
+        # viejo que L1_TIMEOUT ya no importa (la copia en L1 venció sola)
+        self.vida_cambios = max(60, 2 * self.chequeo, 2 * self.l1.default_timeout)
+        self._secuencia = None
+        self._proximo_chequeo = 0.0
+
+    # ----------------- Registro de cambios -----------------
+    def _sincronizar(self):
+        ahora = time.monotonic()
+        if ahora < self._proximo_chequeo:
+            return
+        secuencia = self.l2.get(SECUENCIA, 0)
+        if secuencia != self._secuencia:
+            self._aplicar_cambios(self._secuencia, secuencia)
+            self._secuencia = secuencia
+        self._proximo_chequeo = ahora + self.chequeo
+
+    def _aplicar_cambios(self, desde, hasta):
+        if desde is None or not desde < hasta <= desde + MAX_CAMBIOS:
+            self.l1.clear()  # primera lectura, clear() en el medio o demasiado atraso
+            return
+        cambios = self.l2.get_many([CAMBIO.format(n) for n in range(desde + 1, hasta + 1)])
+        if len(cambios) < hasta - desde or any(c == TODO for c in cambios.values()):
+            self.l1.clear()  # alguno venció o todavía no se escribió
+            return
+        for claves in cambios.values():
+            for key, version in claves:
+                self.l1.delete(key, version)
+
+    def _registrar(self, claves):
+        """Asienta que cambiaron `claves` [(key, version), ...] (o TODO)."""
+        self.l2.add(SECUENCIA, 0, None)
+        try:
+            secuencia = self.l2.incr(SECUENCIA)
+        except ValueError:  # la borró un clear() en el medio
+            self.l2.set(SECUENCIA, 1, None)
+            secuencia = 1
+        self.l2.set(CAMBIO.format(secuencia), claves, self.vida_cambios)
+        # Si nadie más escribió desde la última lectura, ya estamos al día
+        if self._secuencia is not None and secuencia == self._secuencia + 1:
+            self._secuencia = secuencia
+
+    # ----------------- Lectura -----------------
+    def get(self, key, default=None, version=None):
+        self._sincronizar()
+        valor = self.l1.get(key, _FALTA, version)
+        if valor is not _FALTA:
+            return valor
+        valor = self.l2.get(key, _FALTA, version)
+        if valor is _FALTA:
+            return default
+        self.l1.set(key, valor, version=version)
+        return valor
+
+    def get_many(self, keys, version=None):
+        self._sincronizar()
+        keys = list(keys)
+        encontrados = self.l1.get_many(keys, version)
+        faltan = [k for k in keys if k not in encontrados]
+        if faltan:
+            desde_l2 = self.l2.get_many(faltan, version)
+            if desde_l2:
+                self.l1.set_many(desde_l2, version=version)
+            encontrados.update(desde_l2)
+        return encontrados
+
+    def has_key(self, key, version=None):
+        return self.get(key, _FALTA, version) is not _FALTA
+
+    # ----------------- Escritura -----------------
+    def _timeout_l1(self, timeout):
+        # En L1 nunca más que L1_TIMEOUT ni más que en L2
+        if timeout is DEFAULT_TIMEOUT or timeout is None:
+            return DEFAULT_TIMEOUT
+        return min(timeout, self.l1.default_timeout)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l2.set(key, value, timeout, version)
+        self._registrar([(key, version)])
+        self.l1.set(key, value, self._timeout_l1(timeout), version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        agregado = self.l2.add(key, value, timeout, version)
+        if agregado:
+            self.l1.set(key, value, self._timeout_l1(timeout), version)
+        return agregado
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        fallidas = self.l2.set_many(data, timeout, version)
+        self._registrar([(k, version) for k in data])
+        self.l1.set_many({k: v for k, v in data.items() if k not in fallidas}, self._timeout_l1(timeout), version)
+        return fallidas
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.l2.touch(key, timeout, version)
+
+    def delete(self, key, version=None):
+        borrado = self.l2.delete(key, version)
+        self.l1.delete(key, version)
+        self._registrar([(key, version)])
+        return borrado
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.l2.delete_many(keys, version)
+        self.l1.delete_many(keys, version)
+        self._registrar([(k, version) for k in keys])
+
+    def incr(self, key, delta=1, version=None):
+        valor = self.l2.incr(key, delta, version)
+        self.l1.delete(key, version)
+        self._registrar([(key, version)])
+        return valor
+
+    def decr(self, key, delta=1, version=None):
+        return self.incr(key, -delta, version)
+
+    def clear(self):
+        self.l2.clear()
+        self.l1.clear()
+        self._registrar(TODO)
+
+    def close(self, **kwargs):
+        self.l2.close(**kwargs)
+
+
+# ----------------- Cálculos caros -----------------
+CANDADO_TTL = 5 * 60   # vida máxima del candado de un recálculo (no la espera)
+CANDADO_FRANJAS = 4096  # archivos de candado posibles con FileBasedCache
+
+
+def _candado(key):
+    return f"{key}:calculando"
+
+
+def _carpeta_candados():
+    # FileBasedCache.add() es has_key() + set(): no sirve de candado entre workers
+    backend = caches["default"]
+    if fcntl is None or not isinstance(backend, FileBasedCache):
+        return None
+    return backend._dir
+
+
+def _tomar_candado(key, ttl):
+    """
+    Candado de un solo dueño para recalcular `key`; None si lo tiene otro.
+
+    - FileBasedCache: flock sobre un archivo de la carpeta de la cache (uno
+      por franja de claves, para no dejar un archivo por clave). Lo libera el
+      kernel si el proceso muere, así que no necesita TTL.
+    - El resto: cache.add() de un token propio que vence a los `ttl` segundos.
+    """
+    carpeta = _carpeta_candados()
+    if carpeta:
+        franja = int(hashlib.sha1(key.encode()).hexdigest(), 16) % CANDADO_FRANJAS
+        os.makedirs(carpeta, exist_ok=True)
+        fd = os.open(os.path.join(carpeta, f"candado-{franja:03x}.lock"), os.O_CREAT | os.O_RDWR, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return None
+        return ("archivo", fd)
+    token = uuid.uuid4().hex
+    if cache.add(_candado(key), token, ttl):
+        return ("cache", token)
+    return None
+
+
+# Borra KEYS[1] solo si todavía vale ARGV[1], en un solo paso del server
+BORRAR_SI_ES_LUA = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def _borrar_si_es(backend, key, valor):
+    """
+    Borra `key` solo si sigue valiendo `valor`, como una sola operación:
+    script Lua en Redis, DELETE ... WHERE value = ... en la base. Devuelve
+    False si el backend no tiene cómo (locmem, memcached...).
+    """
+    if isinstance(backend, DosNivelesCache):
+        # add() lo dejó en la L1 de este proceso y en ninguna otra
+        backend.l1.delete(key)
+        return _borrar_si_es(backend.l2, key, valor)
+    if isinstance(backend, RedisCache):
+        clave = backend.make_and_validate_key(key)
+        cliente = backend._cache.get_client(clave, write=True)
+        cliente.eval(BORRAR_SI_ES_LUA, 1, clave, backend._cache._serializer.dumps(valor))
+        return True
+    if isinstance(backend, DatabaseCache):
+        db = router.db_for_write(backend.cache_model_class)
+        conexion = connections[db]
+        # Mismo formato con el que DatabaseCache guarda el valor
+        guardado = base64.b64encode(pickle.dumps(valor, backend.pickle_protocol)).decode("latin1")
+        with conexion.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {conexion.ops.quote_name(backend._table)} WHERE cache_key = %s AND value = %s",
+                [backend.make_and_validate_key(key), guardado],
+            )
+        return True
+    return False
+
+
+def _soltar_candado(key, candado):
+    """
+    Suelta el candado solo si sigue siendo nuestro: si venció y lo tomó otro
+    worker, es suyo. Con Redis y la base se compara y borra en un paso; con
+    el resto es get() + delete(), y si el candado vence justo entre los dos
+    se borra el del otro: a lo sumo un tercer worker recalcula en paralelo.
+    """
+    tipo, valor = candado
+    if tipo == "archivo":
+        fcntl.flock(valor, fcntl.LOCK_UN)
+        os.close(valor)
+    elif not _borrar_si_es(caches["default"], _candado(key), valor) and cache.get(_candado(key)) == valor:
+        cache.delete(_candado(key))
+
+
+def invalidar_grupo(grupo):
+    """
+    Marca como vencido todo lo calculado con `grupo` (ver cached_compute):
+    no se borra, así se sigue sirviendo mientras un solo proceso recalcula.
+    """
+    clave = f"grupo:{grupo}"
+    cache.add(clave, 0, None)
+    try:
+        cache.incr(clave)
+    except ValueError:
+        cache.set(clave, 1, None)
+
+
+def cached_compute(key, fn, ttl, stale_ttl=0, grupo=None, espera=10.0, candado_ttl=CANDADO_TTL):
+    """
+    fn() cacheado en `key` por `ttl` segundos, sin estampida al vencer:
+
+    - Fresco: se devuelve.
+    - Vencido (pasó `ttl`, o se invalidó su `grupo`) pero con menos de
+      `stale_ttl` segundos de más: un solo proceso recalcula (ver
+      _tomar_candado; el candado dura a lo sumo `candado_ttl`) y los demás
+      sirven lo viejo mientras tanto. Si el recálculo falla, también se
+      sirve lo viejo.
+    - Sin nada: calcula quien toma el candado y el resto espera hasta
+      `espera` segundos a que aparezca el valor (después calcula igual).
+
+    Con CACHE_BACKEND=locmem el candado es por proceso.
+    """
+    clave_grupo = f"grupo:{grupo}" if grupo else None
+    leido = cache.get_many([key, clave_grupo] if grupo else [key])
+    generacion = leido.get(clave_grupo, 0) if grupo else 0
+    entrada = leido.get(key)  # (valor, fresco_hasta, generacion)
+    if entrada is not None and time.time() < entrada[1] and entrada[2] == generacion:
+        return entrada[0]
+
+    candado = _tomar_candado(key, candado_ttl)
+    if candado:
+        try:
+            valor = fn()
+            cache.set(key, (valor, time.time() + ttl, generacion), ttl + stale_ttl)
+            return valor
+        except Exception:
+            if entrada is None:
+                raise
+            logger.exception("cached_compute(%s): falló el recálculo, se sirve el valor anterior", key)
+            return entrada[0]
+        finally:
+            _soltar_candado(key, candado)
+
+    if entrada is not None:
+        return entrada[0]  # otro proceso está recalculando
+    limite = time.monotonic() + espera
+    while time.monotonic() < limite:
+        time.sleep(0.05)
+        entrada = cache.get(key)
+        if entrada is not None:
+            return entrada[0]
+    return fn()
@@ -0,0 +1,198 @@
+# django_inmobiliaria/instrumentacion.py
+"""
+Métricas por request: queries y tiempo de DB, hits/misses de cache y tiempo
+de render de templates (ver InstrumentacionMiddleware).
+
+Lo recolectado vive en un ContextVar: fuera de un request instrumentado los
+envoltorios son un `get()` y nada más. Nada se parchea a nivel de clase:
+- DB: connection.execute_wrapper() mientras dura el request (y mientras se
+  genera el cuerpo de una respuesta en streaming).
+- Cache: CacheInstrumentada, la cache configurada con get/get_many medidos.
+- Templates: DjangoTemplatesInstrumentados, el backend DjangoTemplates que
+  mide cada render (solo el más externo; los {% include %} ya están adentro).
+Los dos últimos los pone settings con envolver_caches()/envolver_templates()
+solo si INSTRUMENTACION_ENABLED o METRICAS_ENABLED.
+"""
+import functools
+from contextlib import ExitStack
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from time import perf_counter
+
+from django.core.cache.backends.base import BaseCache
+from django.db import connections
+from django.template.backends.django import DjangoTemplates
+from django.utils.module_loading import import_string
+
+_actual = ContextVar("instrumentacion", default=None)
+_FALTA = object()
+
+
+@dataclass
+class Metricas:
+    inicio: float = field(default_factory=perf_counter)
+    queries: int = 0
+    db_ms: float = 0.0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    cache_ms: float = 0.0
+    tpl_ms: float = 0.0
+    _tpl_nivel: int = 0
+
+    @property
+    def total_ms(self):
+        return (perf_counter() - self.inicio) * 1000
+
+    def server_timing(self):
+        return ", ".join([
+            f'db;dur={self.db_ms:.1f};desc="{self.queries} queries"',
+            f'cache;dur={self.cache_ms:.1f};desc="{self.cache_hits} hit / {self.cache_misses} miss"',
+            f"tpl;dur={self.tpl_ms:.1f}",
+            f"total;dur={self.total_ms:.1f}",
+        ])
+
+    def como_dict(self):
+        return {
+            "ms": round(self.total_ms, 1),
+            "queries": self.queries,
+            "db_ms": round(self.db_ms, 1),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "tpl_ms": round(self.tpl_ms, 1),
+        }
+
+
+def actuales():
+    """Las métricas del request en curso (o None)."""
+    return _actual.get()
+
+
+def iniciar():
+    m = Metricas()
+    return m, _actual.set(m)
+
+
+def reanudar(m):
+    """Vuelve a activar `m` (p.ej. al generar el cuerpo de un streaming)."""
+    return _actual.set(m)
+
+
+def terminar(token):
+    _actual.reset(token)
+
+
+def medir_db():
+    """execute_wrapper en todas las conexiones; usar como context manager."""
+    stack = ExitStack()
+    for conn in connections.all():
+        stack.enter_context(conn.execute_wrapper(wrapper_db))
+    return stack
+
+
+def wrapper_db(execute, sql, params, many, context):
+    m = _actual.get()
+    if m is None:
+        return execute(sql, params, many, context)
+    t0 = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        m.queries += 1
+        m.db_ms += (perf_counter() - t0) * 1000
+
+
+# ----------------- Cache -----------------
+@functools.lru_cache(maxsize=None)
+def _clase_instrumentada(clase):
+    """Subclase de `clase` con get/get_many medidos (una por backend)."""
+    def get(self, key, default=None, version=None):
+        m = _actual.get()
+        if m is None:
+            return clase.get(self, key, default, version)
+        t0 = perf_counter()
+        valor = clase.get(self, key, _FALTA, version)
+        m.cache_ms += (perf_counter() - t0) * 1000
+        if valor is _FALTA:
+            m.cache_misses += 1
+            return default
+        m.cache_hits += 1
+        return valor
+
+    def get_many(self, keys, version=None):
+        m = _actual.get()
+        if m is None:
+            return clase.get_many(self, keys, version)
+        keys = list(keys)
+        t0 = perf_counter()
+        valores = clase.get_many(self, keys, version)
+        m.cache_ms += (perf_counter() - t0) * 1000
+        m.cache_hits += len(valores)
+        m.cache_misses += len(keys) - len(valores)
+        return valores
+
+    metodos = {"get": get}
+    # El get_many genérico llama a get(): ya se cuenta ahí
+    if clase.get_many is not BaseCache.get_many:
+        metodos["get_many"] = get_many
+    return type(f"{clase.__name__}Instrumentada", (clase,), metodos)
+
+
+class CacheInstrumentada:
+    """
+    BACKEND que arma la cache de OPTIONS["CACHE"] con get/get_many medidos.
+    Devuelve una instancia de una subclase del backend real: isinstance()
+    sigue valiendo (createcachetable, FileBasedCache en cache.py...).
+    """
+
+    def __new__(cls, location, params):
+        conf = dict(params["OPTIONS"]["CACHE"])
+        clase = _clase_instrumentada(import_string(conf.pop("BACKEND")))
+        return clase(conf.pop("LOCATION", ""), conf)
+
+
+# ----------------- Templates -----------------
+class _TemplateMedido:
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, nombre):
+        if nombre == "template":
+            raise AttributeError(nombre)
+        return getattr(self.template, nombre)
+
+    def render(self, context=None, request=None):
+        m = _actual.get()
+        if m is None:
+            return self.template.render(context, request)
+        m._tpl_nivel += 1
+        t0 = perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            m._tpl_nivel -= 1
+            if m._tpl_nivel == 0:
+                m.tpl_ms += (perf_counter() - t0) * 1000
+
+
+class DjangoTemplatesInstrumentados(DjangoTemplates):
+    def from_string(self, template_code):
+        return _TemplateMedido(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _TemplateMedido(super().get_template(template_name))
+
+
+# ----------------- Settings -----------------
+def envolver_caches(caches):
+    return {
+        alias: {"BACKEND": "django_inmobiliaria.instrumentacion.CacheInstrumentada", "OPTIONS": {"CACHE": conf}}
+        for alias, conf in caches.items()
+    }
+
+
+def envolver_templates(templates):
+    return [
+        {**t, "BACKEND": "django_inmobiliaria.instrumentacion.DjangoTemplatesInstrumentados"}
+        if t["BACKEND"] == "django.template.backends.django.DjangoTemplates" else t
+        for t in templates
+    ]
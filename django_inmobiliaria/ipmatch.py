@@ -0,0 +1,140 @@
+# django_inmobiliaria/ipmatch.py
+"""
+Matcher de IPs compilado y resolución de la IP real del cliente.
+
+IPMatcher: las redes (IPv4/IPv6, miles si hace falta) se fusionan en rangos
+enteros disjuntos y ordenados, uno por familia; cada consulta es un bisect
+(O(log n)) y las últimas decisiones quedan en un LRU, así que una IP que
+vuelve no se parsea de nuevo.
+
+ip_cliente(): recorre X-Forwarded-For de derecha a izquierda salteando los
+proxies propios (TRUSTED_PROXIES); la primera IP que no es de confianza es el
+cliente. Si esa IP es de Cloudflare (CLOUDFLARE_IPS), vale CF-Connecting-IP.
+Los headers que no vienen de un proxy de confianza se ignoran: antes se
+creía al primer hop de X-Forwarded-For, que lo escribe el propio cliente.
+
+Las listas salen de settings (ALLOWED_IPS, ALLOWED_IPS_FILE, TRUSTED_PROXIES,
+CLOUDFLARE_IPS) y se compilan una vez por proceso; el archivo se relee
+solo al reiniciar.
+"""
+import ipaddress
+import logging
+from bisect import bisect_right
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# https://www.cloudflare.com/ips/ (revisar cada tanto; CLOUDFLARE_IPS los reemplaza)
+CLOUDFLARE_RANGOS = (
+    "173.245.48.0/20", "103.21.244.0/22", "103.22.200.0/22", "103.31.4.0/22",
+    "141.101.64.0/18", "108.162.192.0/18", "190.93.240.0/20", "188.114.96.0/20",
+    "197.234.240.0/22", "198.41.128.0/17", "162.158.0.0/15", "104.16.0.0/13",
+    "104.24.0.0/14", "172.64.0.0/13", "131.0.72.0/22",
+    "2400:cb00::/32", "2606:4700::/32", "2803:f800::/32", "2405:b500::/32",
+    "2405:8100::/32", "2a06:98c0::/29", "2c0f:f248::/32",
+)
+
+# Loopback y redes privadas: el balanceador / proxy de la plataforma
+PROXIES_POR_DEFECTO = (
+    "127.0.0.0/8", "10.0.0.0/8", "172.16.0.0/12", "192.168.0.0/16", "::1/128", "fc00::/7",
+)
+
+LRU_DECISIONES = 4096
+
+
+def leer_redes(texto):
+    """CIDRs o IPs separadas por comas, espacios o líneas; '#' comenta hasta el fin de línea."""
+    for linea in texto.splitlines():
+        for raw in linea.split("#", 1)[0].replace(",", " ").split():
+            yield raw
+
+
+class IPMatcher:
+    def __init__(self, redes=(), lru=LRU_DECISIONES):
+        por_familia = {4: [], 6: []}
+        for raw in redes:
+            try:
+                red = ipaddress.ip_network(raw.strip(), strict=False)
+            except ValueError:
+                logger.warning("IP/red inválida ignorada: %r", raw)
+                continue
+            por_familia[red.version].append(red)
+
+        # familia -> (inicios, fines) de rangos disjuntos y ordenados
+        self.rangos = {}
+        for version, redes_familia in por_familia.items():
+            inicios, fines = [], []
+            for red in ipaddress.collapse_addresses(redes_familia):
+                desde, hasta = int(red.network_address), int(red.broadcast_address)
+                if fines and desde == fines[-1] + 1:
+                    fines[-1] = hasta  # contiguas que collapse no fusiona (p.ej. /24 + /23)
+                else:
+                    inicios.append(desde)
+                    fines.append(hasta)
+            self.rangos[version] = (inicios, fines)
+        self.total = sum(len(i) for i, _ in self.rangos.values())
+        self.contiene = lru_cache(maxsize=lru)(self._contiene) if lru else self._contiene
+
+    def __bool__(self):
+        return self.total > 0
+
+    def __len__(self):
+        return self.total
+
+    def __contains__(self, ip):
+        return bool(ip) and self.contiene(ip)
+
+    def _contiene(self, ip):
+        try:
+            direccion = ipaddress.ip_address(ip.strip())
+        except ValueError:
+            return False
+        if direccion.version == 6 and direccion.ipv4_mapped:
+            direccion = direccion.ipv4_mapped  # ::ffff:1.2.3.4 (sockets dual-stack)
+        inicios, fines = self.rangos[direccion.version]
+        n = int(direccion)
+        i = bisect_right(inicios, n) - 1
+        return i >= 0 and n <= fines[i]
+
+
+@lru_cache(maxsize=8)
+def _compilar(redes, archivo=""):
+    # La clave incluye los valores de settings: override_settings recompila
+    texto = redes
+    if archivo:
+        try:
+            texto += "\n" + Path(archivo).read_text(encoding="utf-8")
+        except OSError as e:
+            # Sin el archivo valen solo las redes de settings (no un 500 por request)
+            logger.error("No se pudo leer ALLOWED_IPS_FILE %s: %s", archivo, e)
+    return IPMatcher(leer_redes(texto))
+
+
+def allowlist():
+    return _compilar(getattr(settings, "ALLOWED_IPS", "") or "", getattr(settings, "ALLOWED_IPS_FILE", "") or "")
+
+
+def proxies():
+    return _compilar(getattr(settings, "TRUSTED_PROXIES", ",".join(PROXIES_POR_DEFECTO)) or "")
+
+
+def cloudflare():
+    return _compilar(getattr(settings, "CLOUDFLARE_IPS", "") or ",".join(CLOUDFLARE_RANGOS))
+
+
+def ip_cliente(meta):
+    """IP real del cliente según REMOTE_ADDR, X-Forwarded-For y CF-Connecting-IP."""
+    confiables, cf = proxies(), cloudflare()
+    cadena = [h.strip() for h in meta.get("HTTP_X_FORWARDED_FOR", "").split(",") if h.strip()]
+    cadena.append((meta.get("REMOTE_ADDR") or "").strip())
+    for hop in reversed(cadena):
+        if hop in confiables:
+            continue
+        if hop in cf:
+            # Cloudflare pisa el header que mande el cliente
+            return (meta.get("HTTP_CF_CONNECTING_IP") or "").strip() or hop
+        return hop
+    return cadena[0]  # todos de confianza: el más lejano
@@ -0,0 +1,278 @@
+# django_inmobiliaria/metricas.py
+"""
+Registro de métricas en proceso, expuesto en formato Prometheus en /metrics.
+
+Con gunicorn hay N procesos y cada uno cuenta lo suyo: cada proceso vuelca su
+registro a un archivo propio en settings.METRICAS_DIR (como mucho una vez
+cada METRICAS_FLUSH_SEGUNDOS, y al salir) y /metrics suma los archivos de
+todos. Los archivos de procesos que ya no existen se fusionan en
+acumulado.json y se borran (los contadores siguen siendo acumulados, pero la
+carpeta no crece con cada worker que recicla gunicorn).
+
+Métricas (DEFINICIONES): requests y latencia por vista (nombre de URL
+resuelto, nunca el path), queries/tiempo de DB, hits/misses de cache y
+duración de la conversión de imágenes y de las galerías.
+"""
+import atexit
+import contextlib
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows (solo desarrollo): sin compactar
+    fcntl = None
+
+from django.conf import settings
+
+ACUMULADO = "acumulado.json"
+
+BUCKETS_REQUEST = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_IMAGEN = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# nombre -> (tipo, help, buckets)
+DEFINICIONES = {
+    "inmo_http_requests_total": ("counter", "Requests atendidos por vista, método y status.", None),
+    "inmo_http_request_duration_seconds": ("histogram", "Latencia de los requests por vista.", BUCKETS_REQUEST),
+    "inmo_db_queries_total": ("counter", "Queries SQL ejecutadas, por vista.", None),
+    "inmo_db_duration_seconds_total": ("counter", "Tiempo en la base, por vista.", None),
+    "inmo_cache_hits_total": ("counter", "Lecturas de cache que encontraron la clave.", None),
+    "inmo_cache_misses_total": ("counter", "Lecturas de cache que no encontraron la clave.", None),
+    "inmo_imagen_conversion_seconds": ("histogram", "Duración de la conversión de imágenes a WEBP.", BUCKETS_IMAGEN),
+    "inmo_galeria_guardado_seconds": ("histogram", "Duración de la adquisición en lote de una galería.", BUCKETS_IMAGEN),
+}
+
+
+def activo():
+    return getattr(settings, "METRICAS_ENABLED", False)
+
+
+def directorio():
+    return Path(getattr(settings, "METRICAS_DIR", Path(settings.BASE_DIR) / "var" / "metricas"))
+
+
+def _clave(labels):
+    return tuple(sorted(labels.items()))
+
+
+class Registro:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reiniciar()
+
+    def _reiniciar(self):
+        self.pid = os.getpid()
+        self.archivo = f"{self.pid}-{uuid.uuid4().hex[:8]}.json"
+        self.contadores = {}   # (nombre, labels) -> valor
+        self.histogramas = {}  # (nombre, labels) -> [cuentas por bucket..., suma, total]
+        self.ultimo_flush = 0.0
+        self.sucio = False
+
+    def _fork(self):
+        # Después de un fork (gunicorn --preload) el hijo arranca de cero
+        if os.getpid() != self.pid:
+            self._reiniciar()
+
+    def inc(self, nombre, valor=1, **labels):
+        with self._lock:
+            self._fork()
+            k = (nombre, _clave(labels))
+            self.contadores[k] = self.contadores.get(k, 0) + valor
+            self.sucio = True
+
+    def observar(self, nombre, valor, **labels):
+        buckets = DEFINICIONES[nombre][2]
+        with self._lock:
+            self._fork()
+            k = (nombre, _clave(labels))
+            h = self.histogramas.get(k)
+            if h is None:
+                h = self.histogramas[k] = [0] * len(buckets) + [0.0, 0]
+            for i, limite in enumerate(buckets):
+                if valor <= limite:
+                    h[i] += 1
+            h[-2] += valor
+            h[-1] += 1
+            self.sucio = True
+
+    def datos(self):
+        with self._lock:
+            return {
+                "c": [[n, dict(l), v] for (n, l), v in self.contadores.items()],
+                "h": [[n, dict(l), list(h)] for (n, l), h in self.histogramas.items()],
+            }
+
+    def flush(self, forzar=False):
+        """Vuelca el registro a su archivo (atómico) si pasó el intervalo."""
+        ahora = time.monotonic()
+        intervalo = getattr(settings, "METRICAS_FLUSH_SEGUNDOS", 1.0)
+        if not self.sucio or (not forzar and ahora - self.ultimo_flush < intervalo):
+            return
+        self._fork()
+        carpeta = directorio()
+        carpeta.mkdir(parents=True, exist_ok=True)
+        tmp = carpeta / f".{self.archivo}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(self.datos(), fh)
+        os.replace(tmp, carpeta / self.archivo)
+        self.ultimo_flush = ahora
+        self.sucio = False
+
+
+registro = Registro()
+
+
+def inc(nombre, valor=1, **labels):
+    if activo():
+        registro.inc(nombre, valor, **labels)
+
+
+def observar(nombre, valor, **labels):
+    if activo():
+        registro.observar(nombre, valor, **labels)
+
+
+def flush(forzar=False):
+    if activo():
+        registro.flush(forzar)
+
+
+@atexit.register
+def _al_salir():
+    try:
+        flush(forzar=True)
+    except Exception:
+        pass
+
+
+# ----------------- Exposición -----------------
+def _pid(ruta):
+    """El pid del nombre del archivo ('1234-abcd1234.json'), o None si no es de un proceso."""
+    pid = ruta.name.lstrip(".").split("-", 1)[0]
+    return int(pid) if pid.isdigit() else None
+
+
+def _vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:  # existe pero es de otro usuario
+        return True
+    return True
+
+
+def _leer(ruta):
+    try:
+        with open(ruta, encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _sumar(contadores, histogramas, datos):
+    for nombre, labels, valor in datos.get("c", []):
+        k = (nombre, _clave(labels))
+        contadores[k] = contadores.get(k, 0) + valor
+    for nombre, labels, h in datos.get("h", []):
+        k = (nombre, _clave(labels))
+        actual = histogramas.get(k)
+        histogramas[k] = list(h) if actual is None else [a + b for a, b in zip(actual, h)]
+
+
+@contextlib.contextmanager
+def _exclusivo(carpeta):
+    """Un solo proceso por vez agrega/compacta la carpeta."""
+    with open(carpeta / ".compactar.lock", "a") as candado:
+        fcntl.flock(candado, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(candado, fcntl.LOCK_UN)
+
+
+def _compactar(carpeta):
+    """
+    Fusiona en ACUMULADO los archivos de procesos muertos y los borra. El
+    acumulado anota qué archivos ya tiene ("fusionados"): si algo se corta
+    entre escribirlo y borrarlos, la próxima pasada los borra sin sumarlos
+    de nuevo.
+    """
+    acumulado = _leer(carpeta / ACUMULADO) or {}
+    for nombre in acumulado.get("fusionados", []):
+        (carpeta / nombre).unlink(missing_ok=True)
+    for tmp in carpeta.glob(".*.tmp"):  # flush cortado por la muerte del proceso
+        if _pid(tmp) is not None and not _vivo(_pid(tmp)):
+            tmp.unlink(missing_ok=True)
+
+    muertos = [r for r in carpeta.glob("*.json") if _pid(r) is not None and not _vivo(_pid(r))]
+    if not muertos:
+        return
+    contadores, histogramas = {}, {}
+    _sumar(contadores, histogramas, acumulado)
+    for ruta in muertos:
+        _sumar(contadores, histogramas, _leer(ruta) or {})
+    tmp = carpeta / f".{ACUMULADO}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump({
+            "c": [[n, dict(l), v] for (n, l), v in contadores.items()],
+            "h": [[n, dict(l), h] for (n, l), h in histogramas.items()],
+            "fusionados": [r.name for r in muertos],
+        }, fh)
+    os.replace(tmp, carpeta / ACUMULADO)
+    for ruta in muertos:
+        ruta.unlink(missing_ok=True)
+
+
+def agregar():
+    """Suma los archivos de todos los procesos (incluido este, recién volcado)."""
+    flush(forzar=True)
+    carpeta = directorio()
+    contadores, histogramas = {}, {}
+    if not carpeta.is_dir():
+        return contadores, histogramas
+    with _exclusivo(carpeta) if fcntl else contextlib.nullcontext():
+        if fcntl:
+            _compactar(carpeta)
+        for ruta in carpeta.glob("*.json"):
+            _sumar(contadores, histogramas, _leer(ruta) or {})
+    return contadores, histogramas
+
+
+def _etiquetas(labels, extra=()):
+    pares = list(labels) + list(extra)
+    if not pares:
+        return ""
+    escapar = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{escapar(v)}"' for k, v in pares) + "}"
+
+
+def _num(v):
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+def exponer():
+    """Texto en formato de exposición de Prometheus (text/plain; version=0.0.4)."""
+    contadores, histogramas = agregar()
+    lineas = []
+    for nombre, (tipo, ayuda, buckets) in DEFINICIONES.items():
+        lineas.append(f"# HELP {nombre} {ayuda}")
+        lineas.append(f"# TYPE {nombre} {tipo}")
+        if tipo == "counter":
+            for (n, labels), valor in sorted(contadores.items()):
+                if n == nombre:
+                    lineas.append(f"{nombre}{_etiquetas(labels)} {_num(valor)}")
+            continue
+        for (n, labels), h in sorted(histogramas.items()):
+            if n != nombre:
+                continue
+            for limite, cuenta in zip(buckets, h):
+                lineas.append(f"{nombre}_bucket{_etiquetas(labels, [('le', limite)])} {cuenta}")
+            lineas.append(f"{nombre}_bucket{_etiquetas(labels, [('le', '+Inf')])} {h[-1]}")
+            lineas.append(f"{nombre}_sum{_etiquetas(labels)} {_num(h[-2])}")
+            lineas.append(f"{nombre}_count{_etiquetas(labels)} {h[-1]}")
+    return "\n".join(lineas) + "\n"
@@ -1,7 +1,17 @@
 # django_inmobiliaria/middleware.py
+from django.core.exceptions import MiddlewareNotUsed
 from django.http import HttpResponseForbidden
 from django.conf import settings
-import ipaddress
+from time import perf_counter
+import cProfile
+import json
+import logging
+import random
+import time
+
+from . import instrumentacion, ipmatch, metricas, perfilador
+
+logger_instrumentacion = logging.getLogger("django_inmobiliaria.instrumentacion")
 
 class IPAllowlistMiddleware:
     """
@@ -12,9 +22,15 @@ class IPAllowlistMiddleware:
       IP_ALLOWLIST_ENABLED=1|0
       IP_ALLOWLIST_SCOPE=admin   # usar 'admin' para proteger solo prefijos configurados
       ALLOWED_IPS=186.57.154.224,2802:8010:6131:fe00:3dcf:c065:29ce:cce8
+      ALLOWED_IPS_FILE=/etc/inmobiliaria/allowlist.txt   # opcional, un CIDR por línea
+      TRUSTED_PROXIES=10.0.0.0/8,...  # proxies propios (por defecto loopback y redes privadas)
+      CLOUDFLARE_IPS=...              # por defecto los rangos publicados de Cloudflare
 
     Ajustá PROTECTED_PREFIXES para tu ruta real de admin.
-    Detrás de Cloudflare toma la IP real de HTTP_CF_CONNECTING_IP.
+    La IP del cliente y el matcher salen de ipmatch.py, que compila cada
+    lista una sola vez por proceso (y por valor de settings). La clase no
+    guarda listas propias: la única otra instancia es la que arma
+    PerfiladorMiddleware.__init__ para reusar el mismo chequeo.
     """
     # Cambiá el prefijo por el que uses realmente para tu admin oculto:
     PROTECTED_PREFIXES = ("/constructordemisitio/",)
@@ -23,40 +39,12 @@ class IPAllowlistMiddleware:
         self.get_response = get_response
         self.enabled = getattr(settings, "IP_ALLOWLIST_ENABLED", False)
         self.scope   = getattr(settings, "IP_ALLOWLIST_SCOPE", "admin")
-        # parsea ALLOWED_IPS (IPv4/IPv6, coma separada)
-        ips = getattr(settings, "ALLOWED_IPS", "") or ""
-        self.allowed = []
-        for raw in [x.strip() for x in ips.split(",") if x.strip()]:
-            try:
-                self.allowed.append(ipaddress.ip_network(raw, strict=False))
-            except ValueError:
-                # si no es red, intentá como IP individual
-                try:
-                    self.allowed.append(ipaddress.ip_network(raw + "/32", strict=False))
-                except Exception:
-                    pass
 
     def _client_ip(self, request):
-        # Si estás detrás de Cloudflare:
-        cf_ip = request.META.get("HTTP_CF_CONNECTING_IP")
-        if cf_ip:
-            return cf_ip.strip()
-        # Si hay un proxy que setea X-Forwarded-For:
-        xff = request.META.get("HTTP_X_FORWARDED_FOR")
-        if xff:
-            return xff.split(",")[0].strip()
-        return (request.META.get("REMOTE_ADDR") or "").strip()
+        return ipmatch.ip_cliente(request.META)
 
     def _is_allowed(self, ip_str):
-        if not ip_str:
-            return False
-        try:
-            ip_obj = ipaddress.ip_address(ip_str)
-        except ValueError:
-            return False
-        if not self.allowed:
-            return False
-        return any(ip_obj in net for net in self.allowed)
+        return ip_str in ipmatch.allowlist()
 
     def __call__(self, request):
         if not self.enabled:
@@ -74,3 +62,210 @@ class IPAllowlistMiddleware:
             return HttpResponseForbidden("Forbidden (IP not allowed)")
 
         return self.get_response(request)
+
+
+class SesionDeslizanteMiddleware:
+    """
+    Expiración deslizante sin reescribir la sesión en cada request (lo que
+    hacía SESSION_SAVE_EVERY_REQUEST: un UPDATE por page view).
+
+    Guarda en la sesión cuándo se escribió por última vez y solo la marca como
+    modificada (SessionMiddleware la guarda y reenvía la cookie) cuando le
+    quedan menos de SESSION_RENOVAR_SI_QUEDAN segundos de vida. Con 600 s y
+    umbral 480: como mucho una escritura cada 2 minutos por sesión activa.
+    Va debajo de SessionMiddleware en MIDDLEWARE.
+    """
+    CLAVE = "_escrita"
+
+    def __init__(self, get_response):
+        if getattr(settings, "SESSION_SAVE_EVERY_REQUEST", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.umbral = getattr(settings, "SESSION_RENOVAR_SI_QUEDAN", settings.SESSION_COOKIE_AGE * 0.8)
+        self.reloj = time.time
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        session = getattr(request, "session", None)
+        # Sin cookie de sesión no hay nada que deslizar (y no se consulta la base)
+        if session is None or session.is_empty() or response.status_code == 500:
+            return response
+        ahora = self.reloj()
+        escrita = session.get(self.CLAVE, 0)
+        if session.is_empty():  # cookie vieja o inválida
+            return response
+        if session.modified or escrita + session.get_expiry_age() - ahora < self.umbral:
+            session[self.CLAVE] = int(ahora)
+        return response
+
+
+class InstrumentacionMiddleware:
+    """
+    Mide cada request (queries + tiempo de DB, cache hits/misses, render de
+    templates, ver instrumentacion.py) y:
+      - agrega `Server-Timing` a las respuestas de usuarios staff
+        (se ve en la pestaña Network/Timing del navegador);
+      - loguea una línea JSON para una muestra de requests y para todos los lentos;
+      - con METRICAS_ENABLED, suma todo al registro de /metrics (metricas.py).
+
+    Env:
+      INSTRUMENTACION_ENABLED=1|0
+      INSTRUMENTACION_LOG_SAMPLE=0.01   # fracción de requests logueados
+      INSTRUMENTACION_LENTO_MS=1000     # estos se loguean siempre
+      METRICAS_ENABLED=1|0
+
+    Con ambos desactivados, Django lo saca de la cadena (MiddlewareNotUsed):
+    costo cero. Va después de AuthenticationMiddleware para poder mirar request.user.
+
+    En las respuestas en streaming el cuerpo se genera después de devolverlas:
+    Server-Timing lleva lo medido hasta los headers, y el log y /metrics se
+    completan cuando se termina (o se corta) de enviar el cuerpo.
+    """
+
+    def __init__(self, get_response):
+        self.instrumentar = getattr(settings, "INSTRUMENTACION_ENABLED", False)
+        self.registrar = metricas.activo()
+        if not (self.instrumentar or self.registrar):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample = float(getattr(settings, "INSTRUMENTACION_LOG_SAMPLE", 0.01))
+        self.lento_ms = float(getattr(settings, "INSTRUMENTACION_LENTO_MS", 1000))
+
+    def __call__(self, request):
+        medidas, token = instrumentacion.iniciar()
+        request.instrumentacion = medidas
+        try:
+            with instrumentacion.medir_db():
+                response = self.get_response(request)
+        finally:
+            instrumentacion.terminar(token)
+
+        user = getattr(request, "user", None)
+        if self.instrumentar and user is not None and user.is_staff:
+            response["Server-Timing"] = medidas.server_timing()
+        if response.streaming and not response.is_async:
+            response.streaming_content = self._medir_cuerpo(request, response, medidas)
+        else:
+            self._terminar(request, response, medidas)
+        return response
+
+    def _medir_cuerpo(self, request, response, medidas):
+        return _CuerpoMedido(response.streaming_content, medidas,
+                             lambda: self._terminar(request, response, medidas))
+
+    def _terminar(self, request, response, medidas):
+        match = getattr(request, "resolver_match", None)
+        vista = match.view_name if match else None
+        if self.registrar:
+            self._registrar(request, response, vista, medidas)
+        if not self.instrumentar:
+            return
+
+        total = medidas.total_ms
+        if total >= self.lento_ms or random.random() < self.sample:
+            datos = {
+                "metodo": request.method,
+                "path": request.path,
+                "vista": vista,
+                "status": response.status_code,
+                **medidas.como_dict(),
+            }
+            logger_instrumentacion.info(json.dumps(datos, ensure_ascii=False))
+
+    @staticmethod
+    def _registrar(request, response, vista, medidas):
+        # Etiqueta = nombre de la URL (nunca el path: cardinalidad acotada)
+        vista = vista or "sin_ruta"
+        metricas.inc("inmo_http_requests_total", vista=vista, metodo=request.method,
+                     status=response.status_code)
+        metricas.observar("inmo_http_request_duration_seconds", medidas.total_ms / 1000, vista=vista)
+        metricas.inc("inmo_db_queries_total", medidas.queries, vista=vista)
+        metricas.inc("inmo_db_duration_seconds_total", medidas.db_ms / 1000, vista=vista)
+        if medidas.cache_hits:
+            metricas.inc("inmo_cache_hits_total", medidas.cache_hits)
+        if medidas.cache_misses:
+            metricas.inc("inmo_cache_misses_total", medidas.cache_misses)
+        metricas.flush()
+
+
+class _CuerpoMedido:
+    """
+    Cuerpo de un streaming que sigue sumando a `medidas` mientras se genera.
+    StreamingHttpResponse llama a close() al terminar de enviarlo (o si el
+    cliente corta, aunque no se haya leído nada): ahí se cierra la medición.
+    """
+
+    def __init__(self, partes, medidas, al_terminar):
+        self.partes = iter(partes)
+        self.medidas = medidas
+        self.al_terminar = al_terminar
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        token = instrumentacion.reanudar(self.medidas)
+        try:
+            with instrumentacion.medir_db():
+                return next(self.partes)
+        finally:
+            instrumentacion.terminar(token)
+
+    def close(self):
+        if self.al_terminar:
+            al_terminar, self.al_terminar = self.al_terminar, None
+            al_terminar()
+
+
+class PerfiladorMiddleware:
+    """
+    Perfila con cProfile el request (vista + render del template) cuando trae
+    un token firmado (?_perfil=<token> o header X-Perfil) y lo pide un staff o
+    una IP permitida (misma lista que IPAllowlistMiddleware). Para el resto
+    es un no-op: sin token no se mira nada más.
+
+    El perfil queda en PERFILES_DIR y se navega desde /accounts/panel/perfiles/.
+    La respuesta trae `X-Perfil-Id` con el id guardado.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.ips = IPAllowlistMiddleware(get_response)
+
+    def _autorizado(self, request):
+        user = getattr(request, "user", None)
+        if user is not None and user.is_staff:
+            return True
+        return self.ips._is_allowed(self.ips._client_ip(request))
+
+    def __call__(self, request):
+        token = perfilador.token_de(request)
+        if not token or not perfilador.token_valido(token) or not self._autorizado(request):
+            return self.get_response(request)
+
+        profile = cProfile.Profile()
+        t0 = perf_counter()
+        profile.enable()
+        try:
+            response = self.get_response(request)
+            # TemplateResponse: que el render también quede en el perfil
+            if hasattr(response, "render") and not getattr(response, "is_rendered", True):
+                response.render()
+        finally:
+            profile.disable()
+        ms = (perf_counter() - t0) * 1000
+
+        user = getattr(request, "user", None)
+        match = getattr(request, "resolver_match", None)
+        params = request.GET.copy()
+        params.pop(perfilador.PARAMETRO, None)
+        response["X-Perfil-Id"] = perfilador.guardar(profile, {
+            "metodo": request.method,
+            "path": request.path,
+            "query": params.urlencode(),
+            "vista": match.view_name if match else None,
+            "status": response.status_code,
+            "ms": round(ms, 1),
+            "usuario": user.get_username() if user is not None and user.is_authenticated else None,
+        })
+        return response
@@ -0,0 +1,100 @@
+# django_inmobiliaria/perfilador.py
+"""
+Perfiles cProfile a pedido (ver PerfiladorMiddleware y el panel de perfiles).
+
+Un request se perfila solo si trae un token firmado vigente
+(`?_perfil=<token>` o header `X-Perfil: <token>`) y además lo hace un usuario
+staff o una IP de ALLOWED_IPS. El resultado se guarda como .prof (pstats:
+`python -m pstats`, snakeviz, etc.) + un .json con los datos del request, en
+settings.PERFILES_DIR; se conservan los últimos PERFILES_MAX.
+"""
+import io
+import json
+import pstats
+import re
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+
+SALT = "django_inmobiliaria.perfilador"
+PARAMETRO = "_perfil"
+HEADER = "X-Perfil"
+TOKEN_MAX_AGE = 3600
+MAX_ARCHIVOS = 50
+ID_RE = re.compile(r"^[0-9]{8}-[0-9]{6}-[0-9a-f]{6}$")
+ORDENES = ("cumulative", "tottime", "ncalls")
+
+
+def directorio():
+    return Path(getattr(settings, "PERFILES_DIR", Path(settings.BASE_DIR) / "var" / "perfiles"))
+
+
+# ----------------- Tokens -----------------
+def generar_token(usuario=""):
+    return signing.TimestampSigner(salt=SALT).sign(str(usuario) or "perfil")
+
+
+def token_valido(token):
+    try:
+        signing.TimestampSigner(salt=SALT).unsign(
+            token, max_age=getattr(settings, "PERFILES_TOKEN_MAX_AGE", TOKEN_MAX_AGE)
+        )
+        return True
+    except signing.BadSignature:
+        return False
+
+
+def token_de(request):
+    return request.GET.get(PARAMETRO) or request.headers.get(HEADER)
+
+
+# ----------------- Archivos -----------------
+def guardar(profile, datos):
+    """Escribe <id>.prof y <id>.json y poda los más viejos. Devuelve el id."""
+    carpeta = directorio()
+    carpeta.mkdir(parents=True, exist_ok=True)
+    ahora = timezone.now()
+    perfil_id = f"{ahora:%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+    profile.dump_stats(carpeta / f"{perfil_id}.prof")
+    with open(carpeta / f"{perfil_id}.json", "w", encoding="utf-8") as fh:
+        json.dump({"id": perfil_id, "fecha": ahora.isoformat(), **datos}, fh, ensure_ascii=False)
+
+    maximo = getattr(settings, "PERFILES_MAX", MAX_ARCHIVOS)
+    for viejo in sorted(carpeta.glob("*.json"), reverse=True)[maximo:]:
+        viejo.unlink(missing_ok=True)
+        viejo.with_suffix(".prof").unlink(missing_ok=True)
+    return perfil_id
+
+
+def listar(limite=MAX_ARCHIVOS):
+    """Metadatos de los perfiles guardados, del más nuevo al más viejo."""
+    perfiles = []
+    for ruta in sorted(directorio().glob("*.json"), reverse=True)[:limite]:
+        try:
+            with open(ruta, encoding="utf-8") as fh:
+                perfiles.append(json.load(fh))
+        except (OSError, ValueError):
+            continue
+    return perfiles
+
+
+def ruta_prof(perfil_id):
+    """Ruta del .prof, o None si el id no es válido / no existe."""
+    if not ID_RE.match(perfil_id or ""):
+        return None
+    ruta = directorio() / f"{perfil_id}.prof"
+    return ruta if ruta.exists() else None
+
+
+def resumen(perfil_id, orden="cumulative", lineas=40):
+    """Top de funciones en texto (lo mismo que `python -m pstats`)."""
+    ruta = ruta_prof(perfil_id)
+    if ruta is None:
+        return None
+    salida = io.StringIO()
+    stats = pstats.Stats(str(ruta), stream=salida)
+    stats.strip_dirs().sort_stats(orden if orden in ORDENES else "cumulative").print_stats(lineas)
+    return salida.getvalue()
@@ -1,10 +1,14 @@
 # django_inmobiliaria/settings.py
 from pathlib import Path
 from decouple import config
+from django.core.exceptions import ImproperlyConfigured
 import os
 from pathlib import Path
 import environ
 
+from django_inmobiliaria.instrumentacion import envolver_caches, envolver_templates
+from django_inmobiliaria.ipmatch import PROXIES_POR_DEFECTO
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
@@ -49,9 +53,12 @@ MIDDLEWARE = [
 
   
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'django_inmobiliaria.middleware.SesionDeslizanteMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django_inmobiliaria.middleware.InstrumentacionMiddleware',
+    'django_inmobiliaria.middleware.PerfiladorMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -121,6 +128,13 @@ if USE_PROD and USE_S3:
     AWS_STATIC_CUSTOM_DOMAIN = config('AWS_STATIC_CUSTOM_DOMAIN', default=None)
     AWS_MEDIA_CUSTOM_DOMAIN  = config('AWS_MEDIA_CUSTOM_DOMAIN', default=None)
 
+    # Transferencias (ver storages_s3.PooledS3Mixin)
+    AWS_S3_UPLOAD_WORKERS       = config('AWS_S3_UPLOAD_WORKERS', cast=int, default=8)
+    AWS_S3_MAX_CONCURRENCY      = config('AWS_S3_MAX_CONCURRENCY', cast=int, default=4)
+    AWS_S3_MAX_POOL_CONNECTIONS = config('AWS_S3_MAX_POOL_CONNECTIONS', cast=int,
+                                         default=AWS_S3_UPLOAD_WORKERS * AWS_S3_MAX_CONCURRENCY)
+    AWS_S3_MULTIPART_THRESHOLD  = config('AWS_S3_MULTIPART_THRESHOLD', cast=int, default=8 * 1024 * 1024)
+
     from .storages_s3 import MediaRootS3Boto3Storage, StaticRootS3Boto3Storage
 
     STORAGES = {
@@ -145,12 +159,18 @@ else:
 
 
 AUTH_USER_MODEL = "accounts.User"
+AUTHENTICATION_BACKENDS = ["accounts.backends.DNIoUsuarioBackend"]
 
 # Login/Logout
 LOGIN_URL = "login"
 LOGIN_REDIRECT_URL = "panel_propiedades_list"
 LOGOUT_REDIRECT_URL = "login"
 
+# Rate-limit del login, compartido entre workers (ver accounts.models.IntentoLogin)
+LOGIN_VENTANA_SEGUNDOS = 15 * 60
+LOGIN_INTENTOS_MAX = 5
+LOGIN_INTENTOS_MAX_USUARIO = 20
+
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME":"django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
     {"NAME":"django.contrib.auth.password_validation.MinimumLengthValidator","OPTIONS":{"min_length":8}},
@@ -158,20 +178,67 @@ AUTH_PASSWORD_VALIDATORS = [
     {"NAME":"django.contrib.auth.password_validation.NumericPasswordValidator"},
 ]
 
-CACHES = {"default":{"BACKEND":"django.core.cache.backends.locmem.LocMemCache"}}
-
+# Cache (CACHE_BACKEND):
+#   locmem      una por proceso: solo dev / tests (cada worker tendría la suya)
+#   archivo     FileBasedCache en var/cache, compartida por los workers del host
+#   db          DatabaseCache con incr() atómico (correr `manage.py createcachetable`)
+#   redis       RedisCache en CACHE_URL; sirve cualquier server compatible
+#               (Redis, Valkey, KeyDB...). Requiere el paquete `redis`.
+#   dos_niveles L1 en memoria por proceso + L2 compartida = CACHE_L2
+#               (redis|db: necesita incr() atómico); ver django_inmobiliaria/cache.py
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem')
+CACHE_TIMEOUT = 300
+CACHES_COMPARTIDAS = {
+    "archivo": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": config('CACHE_DIR', default=str(BASE_DIR / "var" / "cache")),
+    },
+    "db": {"BACKEND": "django_inmobiliaria.cache.DatabaseCacheAtomica", "LOCATION": "inmo_cache"},
+    "redis": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": config('CACHE_URL', default='redis://127.0.0.1:6379/1'),
+    },
+}
+if CACHE_BACKEND == "locmem":
+    CACHES = {"default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "inmo-cache",
+        "TIMEOUT": CACHE_TIMEOUT,
+    }}
+elif CACHE_BACKEND in CACHES_COMPARTIDAS:
+    CACHES = {"default": {**CACHES_COMPARTIDAS[CACHE_BACKEND], "TIMEOUT": CACHE_TIMEOUT}}
+elif CACHE_BACKEND == "dos_niveles":
+    CACHE_L2 = config('CACHE_L2', default='redis')
+    if CACHE_L2 not in ("redis", "db"):
+        raise ImproperlyConfigured(f"CACHE_L2 tiene que ser redis o db, no {CACHE_L2}")
+    CACHES = {"default": {
+        "BACKEND": "django_inmobiliaria.cache.DosNivelesCache",
+        "LOCATION": "inmo",
+        "TIMEOUT": CACHE_TIMEOUT,
+        "OPTIONS": {
+            "L2": CACHES_COMPARTIDAS[CACHE_L2],
+            "L1_TIMEOUT": config('CACHE_L1_TIMEOUT', cast=float, default=5),
+            "L1_CHEQUEO": config('CACHE_L1_CHEQUEO', cast=float, default=1),
+        },
+    }}
+else:
+    raise ImproperlyConfigured(f"CACHE_BACKEND desconocido: {CACHE_BACKEND}")
 
 SESSION_COOKIE_AGE = 600
-SESSION_SAVE_EVERY_REQUEST = True
+# Expiración deslizante sin un UPDATE por request: la sesión se reescribe solo
+# cuando le quedan menos de SESSION_RENOVAR_SI_QUEDAN segundos
+# (ver SesionDeslizanteMiddleware y `manage.py bench_sesiones`).
+SESSION_SAVE_EVERY_REQUEST = False
+SESSION_RENOVAR_SI_QUEDAN = 480
+# cached_db solo con una cache compartida entre workers (ver CACHE_BACKEND):
+# con LocMemCache un worker podría seguir viendo una sesión ya cerrada en otro.
+SESSION_ENGINE = config(
+    'SESSION_ENGINE',
+    default='django.contrib.sessions.backends.db' if CACHE_BACKEND == 'locmem'
+    else 'django.contrib.sessions.backends.cached_db',
+)
 
 
-CACHES = {
-    "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        "LOCATION": "inmo-cache",
-        "TIMEOUT": 300,
-    }
-}
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -222,9 +289,53 @@ COMPANY_X         = "https://x.com/tuinmobiliaria"
 IP_ALLOWLIST_ENABLED = os.getenv("IP_ALLOWLIST_ENABLED", "0") == "1"
 IP_ALLOWLIST_SCOPE   = os.getenv("IP_ALLOWLIST_SCOPE", "admin") 
 ALLOWED_IPS          = os.getenv("ALLOWED_IPS", "")             
+ALLOWED_IPS_FILE     = os.getenv("ALLOWED_IPS_FILE", "")
+# IP real del cliente (ver django_inmobiliaria/ipmatch.py): X-Forwarded-For solo
+# se cree desde estos proxies; CF-Connecting-IP solo desde Cloudflare (vacío =
+# rangos publicados)
+TRUSTED_PROXIES      = os.getenv("TRUSTED_PROXIES", ",".join(PROXIES_POR_DEFECTO))
+CLOUDFLARE_IPS       = os.getenv("CLOUDFLARE_IPS", "")
+
+# Métricas por request (ver django_inmobiliaria/middleware.py)
+INSTRUMENTACION_ENABLED    = os.getenv("INSTRUMENTACION_ENABLED", "0") == "1"
+INSTRUMENTACION_LOG_SAMPLE = float(os.getenv("INSTRUMENTACION_LOG_SAMPLE", "0.01"))
+INSTRUMENTACION_LENTO_MS   = float(os.getenv("INSTRUMENTACION_LENTO_MS", "1000"))
+
+# Métricas Prometheus en /metrics (ver django_inmobiliaria/metricas.py)
+METRICAS_ENABLED = os.getenv("METRICAS_ENABLED", "0") == "1"
+METRICAS_TOKEN   = os.getenv("METRICAS_TOKEN", "")
+METRICAS_DIR     = Path(os.getenv("METRICAS_DIR", str(BASE_DIR / "var" / "metricas")))
+METRICAS_FLUSH_SEGUNDOS = float(os.getenv("METRICAS_FLUSH_SEGUNDOS", "1"))
+
+# Con cualquiera de las dos, caches y templates van envueltos para medirlos
+# (ver django_inmobiliaria/instrumentacion.py); si no, quedan como están
+if INSTRUMENTACION_ENABLED or METRICAS_ENABLED:
+    CACHES = envolver_caches(CACHES)
+    TEMPLATES = envolver_templates(TEMPLATES)
+
+# Perfiles cProfile a pedido (ver django_inmobiliaria/perfilador.py)
+PERFILES_DIR = Path(os.getenv("PERFILES_DIR", str(BASE_DIR / "var" / "perfiles")))
+PERFILES_MAX = int(os.getenv("PERFILES_MAX", "50"))
+PERFILES_TOKEN_MAX_AGE = int(os.getenv("PERFILES_TOKEN_MAX_AGE", "3600"))
 
 # Inicializar env
 env = environ.Env()
 environ.Env.read_env() 
 
 AUTO_ADD_STAFF_TO_CARGADORES = env.bool("AUTO_ADD_STAFF_TO_CARGADORES", default=True)
+
+# Grupos/permisos del panel cacheados en la sesión (ver accounts/autorizacion.py)
+AUTORIZACION_TTL = config('AUTORIZACION_TTL', cast=int, default=300)
+
+# Imágenes subidas (ver propiedades/imagenes.py)
+IMAGEN_MAX_PIXELES = config('IMAGEN_MAX_PIXELES', cast=int, default=40_000_000)
+IMAGEN_MAX_LADO    = config('IMAGEN_MAX_LADO', cast=int, default=2560)
+IMAGEN_WORKERS     = config('IMAGEN_WORKERS', cast=int, default=4)
+
+# URL canónica del sitio (sin barra final): la usan los sitemaps, que son uno
+# solo para todos los hosts. Definirla en prod (p.ej. https://leods-blog.org)
+SITE_URL = config('SITE_URL', default=f"{'http' if DEBUG else 'https'}://{ALLOWED_HOSTS[0]}").rstrip('/')
+
+# Sitemaps pre-generados (ver propiedades/sitemaps.py)
+SITEMAP_DIR = Path(config('SITEMAP_DIR', default=str(BASE_DIR / 'var' / 'sitemaps')))
+SITEMAP_URLS_POR_ARCHIVO = config('SITEMAP_URLS_POR_ARCHIVO', cast=int, default=10_000)
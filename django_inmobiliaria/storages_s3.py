@@ -1,7 +1,143 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from django.conf import settings
+from django.utils.encoding import filepath_to_uri
+from django.utils.functional import cached_property
 from storages.backends.s3boto3 import S3Boto3Storage
+from storages.utils import clean_name, get_available_overwrite_name
+
+MB = 1024 * 1024
+
+# Valores pensados para gunicorn con pocos workers sync: cada worker sube
+# como mucho UPLOAD_WORKERS archivos a la vez, cada uno con MAX_CONCURRENCY
+# partes en paralelo si supera el umbral multipart.
+UPLOAD_WORKERS  = getattr(settings, "AWS_S3_UPLOAD_WORKERS", 8)
+MAX_CONCURRENCY = getattr(settings, "AWS_S3_MAX_CONCURRENCY", 4)
+MAX_POOL_CONNECTIONS = getattr(settings, "AWS_S3_MAX_POOL_CONNECTIONS", UPLOAD_WORKERS * MAX_CONCURRENCY)
+MULTIPART_THRESHOLD  = getattr(settings, "AWS_S3_MULTIPART_THRESHOLD", 8 * MB)
+MULTIPART_CHUNKSIZE  = getattr(settings, "AWS_S3_MULTIPART_CHUNKSIZE", 8 * MB)
+
+
+def guardar_lote(storage, items, max_workers=None, solo_faltantes=False):
+    """
+    Guarda [(nombre, contenido), ...] en `storage` en paralelo y devuelve los
+    nombres finales en el mismo orden. Con storages sin soporte propio (p.ej.
+    FileSystemStorage en desarrollo) usa storage.save() en un pool de threads.
+    Con `solo_faltantes` no se sube lo que ya existe (blobs direccionados por
+    contenido) y se devuelve su nombre tal cual.
+    """
+    if hasattr(storage, "guardar_lote"):
+        return storage.guardar_lote(items, max_workers=max_workers, solo_faltantes=solo_faltantes)
+    return _guardar_en_paralelo(storage, items, max_workers, solo_faltantes)
+
+
+def _guardar_en_paralelo(storage, items, max_workers=None, solo_faltantes=False):
+    def guardar(item):
+        nombre, contenido = item
+        if solo_faltantes and storage.exists(nombre):
+            return nombre
+        return storage.save(nombre, contenido)
+
+    items = list(items)
+    if len(items) <= 1:
+        return [guardar(item) for item in items]
+    with ThreadPoolExecutor(max_workers=max_workers or UPLOAD_WORKERS) as pool:
+        return list(pool.map(guardar, items))
+
+
+class PooledS3Mixin:
+    """
+    - Un único cliente boto3 por storage (los clients son thread-safe): los
+      resources por thread de django-storages se arman sobre ese cliente en
+      vez de traer cada uno su sesión y su pool de conexiones.
+    - Pool de conexiones y TransferConfig dimensionados por settings.
+    - guardar_lote(): sube una galería completa en paralelo (lo usa
+      ImagenBlob.registrar_lote para galerías y seed_propiedades --bulk).
+    - url()/urls(): con custom_domain o bucket público arma la URL a mano,
+      sin pasar por boto.
+    """
+
+    def get_default_settings(self):
+        ajustes = super().get_default_settings()
+        if ajustes["client_config"] is None:
+            ajustes["client_config"] = Config(
+                s3={"addressing_style": ajustes["addressing_style"]},
+                signature_version=ajustes["signature_version"],
+                proxies=ajustes["proxies"],
+                max_pool_connections=MAX_POOL_CONNECTIONS,
+                retries={"max_attempts": 3, "mode": "standard"},
+            )
+        if ajustes["transfer_config"] is None:
+            ajustes["transfer_config"] = TransferConfig(
+                multipart_threshold=MULTIPART_THRESHOLD,
+                multipart_chunksize=MULTIPART_CHUNKSIZE,
+                max_concurrency=MAX_CONCURRENCY,
+                use_threads=True,
+            )
+        return ajustes
+
+    _client_lock = threading.Lock()
 
-class StaticRootS3Boto3Storage(S3Boto3Storage):
+    @cached_property
+    def client(self):
+        # boto3.Session no es thread-safe: la creación va bajo lock, el uso no
+        with self._client_lock:
+            return self._create_session().client(
+                "s3",
+                region_name=self.region_name,
+                use_ssl=self.use_ssl,
+                endpoint_url=self.endpoint_url,
+                config=self.client_config,
+                verify=self.verify,
+            )
+
+    @cached_property
+    def _clase_resource(self):
+        # La clase generada del resource "s3"; se arma una sola vez por storage
+        with self._client_lock:
+            return type(self._create_session().resource("s3", region_name=self.region_name))
+
+    @property
+    def connection(self):
+        # django-storages arma un resource por thread, cada uno con su propio
+        # cliente y pool. Acá cada thread tiene su resource (no son
+        # thread-safe), pero todos sobre el mismo self.client: _save(),
+        # exists() y compañía siguen siendo los de S3Boto3Storage.
+        conexion = getattr(self._connections, "connection", None)
+        if conexion is None:
+            conexion = self._connections.connection = self._clase_resource(client=self.client)
+        return conexion
+
+    def guardar_lote(self, items, max_workers=None, solo_faltantes=False):
+        """Sube [(nombre, contenido), ...] en paralelo; devuelve los nombres finales."""
+        # Todos los threads comparten self.client (y su pool de conexiones)
+        return _guardar_en_paralelo(self, items, max_workers, solo_faltantes)
+
+    @cached_property
+    def _url_base(self):
+        """Prefijo fijo de las URLs públicas, o None si hay que firmar con boto."""
+        if self.custom_domain:
+            if self.querystring_auth and self.cloudfront_signer:
+                return None
+            return f"{self.url_protocol}//{self.custom_domain}/"
+        if self.querystring_auth or self.endpoint_url or not self.region_name:
+            return None
+        return f"https://{self.bucket_name}.s3.{self.region_name}.amazonaws.com/"
+
+    def url(self, name, parameters=None, expire=None, http_method=None):
+        if self._url_base is None or parameters or http_method:
+            return super().url(name, parameters, expire, http_method)
+        return self._url_base + filepath_to_uri(self._normalize_name(clean_name(name)))
+
+    def urls(self, nombres):
+        """url() para muchos nombres de una (listados, feeds, sitemaps)."""
+        return [self.url(nombre) for nombre in nombres]
+
+
+class StaticRootS3Boto3Storage(PooledS3Mixin, S3Boto3Storage):
     bucket_name   = getattr(settings, "AWS_STATIC_BUCKET_NAME", None)
     location      = "static"
     file_overwrite = True
@@ -10,11 +146,28 @@ class StaticRootS3Boto3Storage(S3Boto3Storage):
     def get_object_parameters(self, name):
         return {"CacheControl": "public, max-age=31536000, immutable"}
 
-class MediaRootS3Boto3Storage(S3Boto3Storage):
+class MediaRootS3Boto3Storage(PooledS3Mixin, S3Boto3Storage):
     bucket_name   = getattr(settings, "AWS_MEDIA_BUCKET_NAME", None)
     location      = "media"
     file_overwrite = False
     custom_domain = getattr(settings, "AWS_MEDIA_CUSTOM_DOMAIN", None)
 
+    # Blobs direccionados por contenido (ver propiedades.models.ImagenBlob):
+    # el nombre cambia si cambian los bytes, así que se pueden cachear para siempre.
+    blob_prefix = "blobs/"
+
+    def _es_blob(self, name):
+        name = name.removeprefix(f"{self.location}/")
+        return name.startswith(self.blob_prefix)
+
+    def get_available_name(self, name, max_length=None):
+        # Mismo nombre == mismo contenido: sobrescribir es idempotente y evita
+        # el HEAD extra y los sufijos aleatorios de file_overwrite=False.
+        if self._es_blob(name):
+            return get_available_overwrite_name(clean_name(name), max_length)
+        return super().get_available_name(name, max_length)
+
     def get_object_parameters(self, name):
+        if self._es_blob(name):
+            return {"CacheControl": "public, max-age=31536000, immutable"}
         return {"CacheControl": "public, max-age=604800"}
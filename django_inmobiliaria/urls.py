@@ -3,21 +3,17 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseForbidden, Http404
+import hmac
 import os
 
+from django_inmobiliaria import ipmatch, metricas
+
 from propiedades.views import (
-    home, listado_propiedades, detalle_propiedad, buscar_propiedades, nosotros
+    home, listado_propiedades, detalle_propiedad, buscar_propiedades, nosotros,
+    feed_propiedades, feed_cambios, sitemap_indice, sitemap_seccion,
 )
 
-from django.contrib.sitemaps.views import sitemap
-from propiedades.sitemaps import PropiedadSitemap, StaticViewSitemap
-
-sitemaps = {
-    "static": StaticViewSitemap,
-    "propiedades": PropiedadSitemap,
-}
-
 def robots_txt(_request):
     content = (
         "User-agent: *\n"
@@ -27,6 +23,20 @@ def robots_txt(_request):
     return HttpResponse(content, content_type="text/plain")
 
 
+def metrics(request):
+    """
+    Métricas de todos los workers en formato Prometheus. Acceso con
+    `Authorization: Bearer <METRICAS_TOKEN>` o desde una IP de ALLOWED_IPS.
+    """
+    if not metricas.activo():
+        raise Http404
+    token = getattr(settings, "METRICAS_TOKEN", "")
+    enviado = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+    if not ((token and hmac.compare_digest(enviado, token)) or ipmatch.ip_cliente(request.META) in ipmatch.allowlist()):
+        return HttpResponseForbidden("Forbidden")
+    return HttpResponse(metricas.exponer(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 ADMIN_URL = os.environ.get("DJANGO_ADMIN_URL", "constructordemisitio/")
 
 urlpatterns = [
@@ -37,11 +47,17 @@ urlpatterns = [
     path("buscar/", buscar_propiedades, name="buscar_propiedades"),
     path("nosotros/", nosotros, name="nosotros"),
 
+    path("feeds/propiedades.xml", feed_propiedades, {"formato": "xml"}, name="feed_propiedades_xml"),
+    path("feeds/propiedades.json", feed_propiedades, {"formato": "json"}, name="feed_propiedades_json"),
+    path("feeds/cambios.json", feed_cambios, name="feed_cambios"),
+
     path("accounts/", include("accounts.urls")),
 
   
     path("robots.txt", robots_txt, name="robots_txt"),
-    path("sitemap.xml", sitemap, {"sitemaps": sitemaps}, name="sitemap"),
+    path("metrics", metrics, name="metrics"),
+    path("sitemap.xml", sitemap_indice, name="sitemap"),
+    path("sitemaps/<slug:seccion>.xml.gz", sitemap_seccion, name="sitemap_seccion"),
 
    
     path(ADMIN_URL, admin.site.urls),
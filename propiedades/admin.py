@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Propiedad, PropiedadImagen
+from .models import ImagenBlob, Propiedad, PropiedadImagen
 
 class PropiedadImagenInline(admin.TabularInline):
     model = PropiedadImagen
@@ -13,3 +13,9 @@ class PropiedadAdmin(admin.ModelAdmin):
     list_filter  = ("tipo","tipo_operacion","estado","destacada","provincia")
     search_fields= ("codigo","titulo","direccion","localidad","provincia")
     inlines = [PropiedadImagenInline]
+
+@admin.register(ImagenBlob)
+class ImagenBlobAdmin(admin.ModelAdmin):
+    list_display = ("nombre","referencias","creado")
+    search_fields= ("sha256","nombre")
+    readonly_fields = ("sha256","nombre","referencias","creado")
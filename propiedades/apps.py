@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PropiedadesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'propiedades'
+
+    def ready(self):
+        import propiedades.signals
@@ -0,0 +1,197 @@
+# propiedades/feeds.py
+"""
+Feeds de exportación para portales (XML / JSON), generados en streaming.
+
+Se recorre el queryset con iterator(chunk_size=...) + prefetch de imágenes
+por chunk, y cada propiedad se serializa y se descarta: la memoria queda
+acotada por el tamaño del chunk, no por la cantidad de avisos.
+"""
+import json
+import re
+from datetime import timedelta
+from xml.sax.saxutils import escape, quoteattr
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch, Q
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Propiedad, PropiedadBaja, PropiedadImagen
+
+CHUNK_SIZE = 500
+MAX_IMAGENES = 10
+
+CAMBIOS_LIMITE = 500
+CAMBIOS_LIMITE_MAX = 1000
+CURSOR_SALT = "propiedades.feeds.cambios"
+
+# Caracteres que XML 1.0 no admite ni escapados (llegan pegados desde Word o
+# desde otros portales); un solo aviso con uno de estos invalida el feed entero
+_NO_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+
+def propiedades_para_feed(qs=None):
+    qs = Propiedad.objects.filter(estado="activa") if qs is None else qs
+    return (
+        qs.order_by("id")
+        .defer("search_index", "imagen_placeholder", "localidad_norm", "provincia_norm", "pais_norm")
+        .prefetch_related(Prefetch(
+            "imagenes",
+            queryset=PropiedadImagen.objects.only("id", "propiedad_id", "imagen").order_by("id"),
+        ))
+    )
+
+
+def _absoluta(base_url, url):
+    return url if url.startswith(("http://", "https://")) else base_url.rstrip("/") + url
+
+
+def item_feed(p, base_url):
+    """Dict serializable de una propiedad (mismo contenido para XML y JSON)."""
+    imagenes = []
+    if p.imagen_principal:
+        imagenes.append(p.imagen_principal.name)
+    imagenes += [img.imagen.name for img in p.imagenes.all()][:MAX_IMAGENES]
+    urls = (default_storage.urls(imagenes) if hasattr(default_storage, "urls")
+            else [default_storage.url(n) for n in imagenes])
+    return {
+        "codigo": p.codigo,
+        "url": _absoluta(base_url, reverse("propiedad_detalle", args=[p.codigo])),
+        "titulo": p.titulo,
+        "descripcion": p.descripcion,
+        "tipo": p.tipo,
+        "operacion": p.tipo_operacion,
+        "precio_usd": p.precio_usd,
+        "precio_pesos": p.precio_pesos,
+        "habitaciones": p.habitaciones,
+        "banos": p.banos,
+        "cochera": p.cochera,
+        "acepta_mascotas": p.acepta_mascotas,
+        "superficie_total": p.superficie_total,
+        "superficie_cubierta": p.superficie_cubierta,
+        "direccion": p.direccion,
+        "localidad": p.localidad,
+        "provincia": p.provincia,
+        "pais": p.pais,
+        "actualizado": p.actualizado,
+        "imagenes": [_absoluta(base_url, u) for u in urls],
+    }
+
+
+def iter_json(qs, base_url):
+    yield '{"propiedades": ['
+    primero = True
+    for p in qs.iterator(chunk_size=CHUNK_SIZE):
+        item = json.dumps(item_feed(p, base_url), cls=DjangoJSONEncoder, ensure_ascii=False)
+        yield item if primero else "," + item
+        primero = False
+    yield "]}\n"
+
+
+def _xml_valor(v):
+    if v is None:
+        return ""
+    if isinstance(v, bool):
+        return "true" if v else "false"
+    if hasattr(v, "isoformat"):
+        return v.isoformat()
+    return escape(_NO_XML.sub("", str(v)))
+
+
+def iter_xml(qs, base_url):
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n<propiedades>\n'
+    for p in qs.iterator(chunk_size=CHUNK_SIZE):
+        item = item_feed(p, base_url)
+        imagenes = item.pop("imagenes")
+        partes = [f"<propiedad codigo={quoteattr(_NO_XML.sub('', item.pop('codigo')))}>"]
+        for campo, valor in item.items():
+            partes.append(f"<{campo}>{_xml_valor(valor)}</{campo}>")
+        partes.append("<imagenes>")
+        partes += [f"<imagen>{_xml_valor(u)}</imagen>" for u in imagenes]
+        partes.append("</imagenes></propiedad>\n")
+        yield "".join(partes)
+    yield "</propiedades>\n"
+
+
+FORMATOS = {
+    "xml": (iter_xml, "application/xml; charset=utf-8"),
+    "json": (iter_json, "application/json; charset=utf-8"),
+}
+
+
+# ----------------- Cambios desde un cursor -----------------
+class CursorInvalido(ValueError):
+    pass
+
+
+def _margen():
+    # Filas con `actualizado` muy reciente pueden pertenecer a transacciones
+    # que todavía no commitearon: se entregan en la próxima llamada.
+    return timedelta(seconds=getattr(settings, "FEED_CAMBIOS_MARGEN_SEGUNDOS", 5))
+
+
+def _despues_de(campo_ts, posicion):
+    """Q de (ts, id) > posicion, en orden lexicográfico."""
+    ts, pk = posicion
+    return Q(**{f"{campo_ts}__gt": ts}) | Q(**{campo_ts: ts, "id__gt": pk})
+
+
+def leer_cursor(cursor=None, desde=None):
+    """Devuelve las posiciones (ts, id) de propiedades y bajas."""
+    if cursor:
+        try:
+            datos = signing.loads(cursor, salt=CURSOR_SALT)
+            return tuple(
+                (parse_datetime(datos[k][0]), int(datos[k][1])) for k in ("p", "b")
+            )
+        except (signing.BadSignature, KeyError, TypeError, ValueError):
+            raise CursorInvalido("cursor inválido")
+    if desde:
+        ts = parse_datetime(desde)
+        if ts is None:
+            raise CursorInvalido("'desde' no es una fecha ISO 8601")
+        if timezone.is_naive(ts):
+            ts = timezone.make_aware(ts)
+        return (ts, 0), (ts, 0)
+    inicio = timezone.make_aware(timezone.datetime(2000, 1, 1))
+    return (inicio, 0), (inicio, 0)
+
+
+def cambios_desde(pos_prop, pos_baja, base_url, limite=CAMBIOS_LIMITE):
+    """
+    Página de cambios ordenada por (actualizado, id): avisos activos completos
+    y tombstones de los pausados/finalizados/borrados, más el cursor siguiente.
+    """
+    limite = max(1, min(int(limite), CAMBIOS_LIMITE_MAX))
+    hasta = timezone.now() - _margen()
+
+    qs = Propiedad.objects.filter(_despues_de("actualizado", pos_prop), actualizado__lte=hasta)
+    props = list(propiedades_para_feed(qs).order_by("actualizado", "id")[:limite + 1])
+    bajas = list(
+        PropiedadBaja.objects.filter(_despues_de("eliminada", pos_baja), eliminada__lte=hasta)
+        .order_by("eliminada", "id")[:limite + 1]
+    )
+    hay_mas = len(props) > limite or len(bajas) > limite
+    props, bajas = props[:limite], bajas[:limite]
+
+    cambios, tombstones = [], []
+    for p in props:
+        if p.estado == "activa":
+            cambios.append(item_feed(p, base_url))
+        else:
+            tombstones.append({"codigo": p.codigo, "motivo": p.estado, "fecha": p.actualizado})
+    tombstones += [{"codigo": b.codigo, "motivo": "eliminada", "fecha": b.eliminada} for b in bajas]
+
+    if props:
+        pos_prop = (props[-1].actualizado, props[-1].pk)
+    if bajas:
+        pos_baja = (bajas[-1].eliminada, bajas[-1].pk)
+    cursor = signing.dumps(
+        {"p": [pos_prop[0].isoformat(), pos_prop[1]], "b": [pos_baja[0].isoformat(), pos_baja[1]]},
+        salt=CURSOR_SALT, compress=True,
+    )
+    return {"cambios": cambios, "bajas": tombstones, "cursor": cursor, "hay_mas": hay_mas}
@@ -0,0 +1,139 @@
+# propiedades/imagenes.py
+"""
+Conversión de uploads a WEBP con memoria acotada.
+
+- Antes de decodificar se mira el tamaño declarado en el header y se rechaza
+  lo que supere IMAGEN_MAX_PIXELES (fotos enormes / decompression bombs).
+- Los JPEG se decodifican ya reducidos con draft() (escala 1/2, 1/4, 1/8 en el
+  propio decoder) y el resto se achica con reduce() vía thumbnail().
+- La salida va a un SpooledTemporaryFile: en RAM si es chica, a disco si no.
+- De la misma imagen ya decodificada sale el placeholder (LQIP): un WEBP de
+  ~20 px en base64 que las cards/galería usan de fondo mientras carga la real.
+"""
+import base64
+import hashlib
+import io
+import tempfile
+import time
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image
+
+from django_inmobiliaria import metricas
+
+MAX_PIXELES = 40_000_000   # ~40 MP: cualquier cámara/celular, ninguna bomba
+MAX_LADO = 2560            # lado mayor de la imagen publicada
+SPOOL_MAX_BYTES = 1024 * 1024
+WEBP_QUALITY = 85
+PLACEHOLDER_LADO = 20
+PLACEHOLDER_QUALITY = 30
+WORKERS = 4                # conversiones en paralelo al guardar una galería
+
+
+class ImagenDemasiadoGrande(ValueError):
+    pass
+
+
+class ImagenProcesada(NamedTuple):
+    archivo: UploadedFile
+    placeholder: str
+
+
+def max_pixeles():
+    return getattr(settings, "IMAGEN_MAX_PIXELES", MAX_PIXELES)
+
+
+def max_lado():
+    return getattr(settings, "IMAGEN_MAX_LADO", MAX_LADO)
+
+
+def imagen_workers():
+    return getattr(settings, "IMAGEN_WORKERS", WORKERS)
+
+
+def comprobar_pixeles(img, limite=None):
+    """Valida width*height del header (no decodifica nada)."""
+    limite = limite or max_pixeles()
+    w, h = img.size
+    if w * h > limite:
+        raise ImagenDemasiadoGrande(f"{w}x{h} px supera el máximo de {limite:,} píxeles")
+
+
+def abrir_reducida(archivo, *, lado=None, limite=None):
+    """
+    Abre `archivo` y devuelve una imagen RGB cuyo lado mayor no supera `lado`,
+    decodificando lo mínimo posible.
+    """
+    lado = lado or max_lado()
+    img = Image.open(archivo)
+    comprobar_pixeles(img, limite)
+    w, h = img.size
+    escala = lado / max(w, h)
+    if escala < 1:
+        destino = (max(1, round(w * escala)), max(1, round(h * escala)))
+        # JPEG: el decoder escala por DCT (1/2..1/8) -> nunca materializa el
+        # tamaño completo. Se pide el tamaño final real, no (lado, lado), para
+        # que elija la mayor reducción posible.
+        img.draft("RGB", destino)
+        # thumbnail usa reduce() (promedio por bloques) antes del resample final
+        img.thumbnail(destino, Image.Resampling.LANCZOS, reducing_gap=3.0)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    return img
+
+
+def generar_placeholder(img):
+    """Data URI de un WEBP diminuto a partir de una imagen ya decodificada."""
+    mini = img.copy()
+    mini.thumbnail((PLACEHOLDER_LADO, PLACEHOLDER_LADO), Image.Resampling.BILINEAR)
+    buf = io.BytesIO()
+    mini.save(buf, format="WEBP", quality=PLACEHOLDER_QUALITY)
+    return "data:image/webp;base64," + base64.b64encode(buf.getvalue()).decode("ascii")
+
+
+def placeholder_de(archivo):
+    """Placeholder de un archivo ya guardado (backfill): decodifica a ~64 px."""
+    with abrir_reducida(archivo, lado=64) as img:
+        return generar_placeholder(img)
+
+
+def procesar(archivo, *, lado=None, limite=None):
+    """
+    Convierte `archivo` a WEBP (UploadedFile respaldado por un
+    SpooledTemporaryFile) y calcula su placeholder. Propaga las excepciones:
+    el que llama decide el fallback.
+    """
+    t0 = time.perf_counter()
+    img = abrir_reducida(archivo, lado=lado, limite=limite)
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    try:
+        img.save(spool, format="WEBP", quality=WEBP_QUALITY, method=6)
+        placeholder = generar_placeholder(img)
+    finally:
+        img.close()
+    size = spool.tell()
+    spool.seek(0)
+    name = (archivo.name or "imagen").rsplit('.', 1)[0] + ".webp"
+    metricas.observar("inmo_imagen_conversion_seconds", time.perf_counter() - t0)
+    return ImagenProcesada(UploadedFile(spool, name, "image/webp", size), placeholder)
+
+
+def convertir_a_webp(archivo, *, lado=None, limite=None):
+    """Como procesar(), pero devuelve solo el archivo WEBP."""
+    return procesar(archivo, lado=lado, limite=limite).archivo
+
+
+def preparar_ruta(ruta, *, lado=None, limite=None):
+    """
+    Lee, hashea (SHA-256 del original, como ImagenBlob) y convierte un archivo
+    local. Devuelve (sha256, nombre.webp, bytes, placeholder): todo picklable,
+    para usar desde un pool de procesos sin tocar la base.
+    """
+    with open(ruta, "rb") as fh:
+        contenido = fh.read()
+    digest = hashlib.sha256(contenido).hexdigest()
+    fuente = UploadedFile(io.BytesIO(contenido), str(ruta).rsplit("/", 1)[-1], None, len(contenido))
+    webp, placeholder = procesar(fuente, lado=lado, limite=limite)
+    return digest, webp.name, webp.read(), placeholder
@@ -0,0 +1,354 @@
+# propiedades/importacion.py
+"""
+Importación masiva de propiedades desde un feed CSV / JSON.
+
+Flujo (ver management/commands/import_propiedades.py):
+  1. leer_filas(): itera el archivo sin cargarlo entero (CSV, JSON Lines o
+     un array JSON, decodificado de a un elemento).
+  2. validar_fila(): tipos, choices y reglas mínimas; las filas inválidas se
+     reportan y se saltean.
+  3. Importador.procesar(): por lotes reserva códigos (una query por lote),
+     normaliza en memoria y hace un único INSERT ... ON CONFLICT (codigo)
+     DO UPDATE por lote.
+  4. Importador.importar_imagenes(): descarga en paralelo y asigna las
+     imágenes en una segunda pasada (blobs deduplicados, ver models.ImagenBlob).
+     Las pendientes esperan en un temporal en disco y se bajan de a
+     LOTE_IMAGENES propiedades: la memoria no crece con el tamaño del feed.
+"""
+import csv
+import json
+import re
+import tempfile
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, InvalidOperation
+from urllib.parse import urlsplit
+from urllib.request import Request, urlopen
+
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.utils import timezone
+
+from django_inmobiliaria.cache import invalidar_grupo
+from .models import Propiedad, PropiedadImagen
+from .validators import MAX_MB, validar_imagen
+
+CODIGO_RE = re.compile(r"^[A-Z]{4}\d{4}$")
+
+OBLIGATORIOS = ("titulo", "descripcion", "tipo", "tipo_operacion", "direccion", "localidad", "provincia")
+DECIMALES = ("precio_usd", "precio_pesos")
+ENTEROS = ("habitaciones", "banos", "superficie_total", "superficie_cubierta")
+BOOLEANOS = ("cochera", "acepta_mascotas", "destacada")
+TEXTOS = ("titulo", "descripcion", "direccion", "localidad", "provincia", "pais")
+
+TIPOS = {k for k, _ in Propiedad.TIPO_PROPIEDAD_CHOICES}
+OPERACIONES = {k for k, _ in Propiedad.TIPO_OPERACION_CHOICES}
+ESTADOS = {k for k, _ in Propiedad.ESTADO_PUBLICACION}
+
+# Columnas que el upsert pisa cuando el código ya existe (nunca codigo/creado/imágenes)
+CAMPOS_UPSERT = [
+    "titulo", "descripcion", "precio_usd", "precio_pesos", "tipo", "tipo_operacion",
+    "habitaciones", "banos", "cochera", "acepta_mascotas",
+    "superficie_total", "superficie_cubierta", "estado",
+    "direccion", "localidad", "provincia", "pais",
+    "localidad_norm", "provincia_norm", "pais_norm",
+    "destacada", "search_index", "actualizado",
+]
+
+VERDADEROS = {"1", "true", "si", "sí", "s", "yes", "y", "x"}
+DESCARGA_TIMEOUT = 15
+LOTE_IMAGENES = 200
+USER_AGENT = "tu-inmobiliaria-import/1.0"
+
+
+# ----------------- Lectura -----------------
+def _iter_json_array(fh, chunk_size=64 * 1024):
+    """Elementos de un array JSON top-level, sin cargar el archivo entero."""
+    decoder = json.JSONDecoder()
+    buf = ""
+    dentro = False
+    eof = False
+    while True:
+        buf = buf.lstrip()
+        if not dentro:
+            if not buf and not eof:
+                buf = fh.read(chunk_size)
+                eof = not buf
+                continue
+            if not buf.startswith("["):
+                raise ValueError("Se esperaba un array JSON")
+            buf, dentro = buf[1:], True
+            continue
+        buf = buf.lstrip(", \n\r\t")
+        if buf.startswith("]"):
+            return
+        try:
+            obj, fin = decoder.raw_decode(buf)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            mas = fh.read(chunk_size)
+            eof = not mas
+            buf += mas
+            continue
+        yield obj
+        buf = buf[fin:]
+
+
+def leer_filas(fh, formato):
+    """Itera dicts desde un archivo de texto abierto. formato: csv | jsonl | json."""
+    if formato == "csv":
+        yield from csv.DictReader(fh)
+    elif formato == "jsonl":
+        for linea in fh:
+            if linea.strip():
+                yield json.loads(linea)
+    elif formato == "json":
+        yield from _iter_json_array(fh)
+    else:
+        raise ValueError(f"Formato desconocido: {formato}")
+
+
+def detectar_formato(ruta):
+    ruta = str(ruta).lower()
+    if ruta.endswith(".csv"):
+        return "csv"
+    if ruta.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    return "json"
+
+
+# ----------------- Validación -----------------
+def _texto(v):
+    return "" if v is None else str(v).strip()
+
+
+def _lista_urls(v):
+    if not v:
+        return []
+    if isinstance(v, (list, tuple)):
+        return [_texto(u) for u in v if _texto(u)]
+    return [u.strip() for u in str(v).split("|") if u.strip()]
+
+
+def validar_fila(fila):
+    """Devuelve (datos, errores). `datos` trae solo campos del modelo + urls de imágenes."""
+    errores = []
+    datos = {}
+
+    for campo in OBLIGATORIOS:
+        if not _texto(fila.get(campo)):
+            errores.append(f"falta '{campo}'")
+    for campo in TEXTOS:
+        if _texto(fila.get(campo)):
+            datos[campo] = _texto(fila.get(campo))
+
+    tipo = _texto(fila.get("tipo")).lower()
+    if tipo and tipo not in TIPOS:
+        errores.append(f"tipo inválido: {tipo}")
+    op = _texto(fila.get("tipo_operacion")).lower()
+    if op and op not in OPERACIONES:
+        errores.append(f"tipo_operacion inválido: {op}")
+    estado = _texto(fila.get("estado")).lower() or "activa"
+    if estado not in ESTADOS:
+        errores.append(f"estado inválido: {estado}")
+    datos.update(tipo=tipo, tipo_operacion=op, estado=estado)
+
+    for campo in DECIMALES:
+        v = _texto(fila.get(campo))
+        if not v:
+            datos[campo] = None
+            continue
+        try:
+            d = Decimal(v.replace(",", ""))
+        except InvalidOperation:
+            errores.append(f"{campo} no es un número: {v}")
+            continue
+        if d < 0:
+            errores.append(f"{campo} negativo")
+        datos[campo] = d
+    if datos.get("precio_usd") is None and datos.get("precio_pesos") is None:
+        errores.append("falta precio (USD o pesos)")
+
+    for campo in ENTEROS:
+        v = _texto(fila.get(campo))
+        if not v:
+            datos[campo] = None if campo.startswith("superficie") else 0
+            continue
+        try:
+            n = int(v)
+            if n < 0:
+                raise ValueError
+            datos[campo] = n
+        except ValueError:
+            errores.append(f"{campo} inválido: {v}")
+    st, sc = datos.get("superficie_total"), datos.get("superficie_cubierta")
+    if st is not None and sc is not None and sc > st:
+        errores.append("superficie cubierta mayor a la total")
+
+    for campo in BOOLEANOS:
+        v = fila.get(campo)
+        datos[campo] = v if isinstance(v, bool) else _texto(v).lower() in VERDADEROS
+
+    codigo = _texto(fila.get("codigo")).upper()
+    if codigo and not CODIGO_RE.match(codigo):
+        errores.append(f"codigo inválido: {codigo}")
+    datos["codigo"] = codigo
+
+    datos["imagen_url"] = _texto(fila.get("imagen_url") or fila.get("imagen_principal"))
+    datos["imagenes_urls"] = _lista_urls(fila.get("imagenes"))
+    return datos, errores
+
+
+# ----------------- Descarga de imágenes -----------------
+def descargar_imagen(url):
+    """Baja `url` respetando el límite del validador. Devuelve un SimpleUploadedFile."""
+    # urlopen también abre file://, ftp://, data:...; del feed solo aceptamos la web
+    if urlsplit(url).scheme.lower() not in ("http", "https"):
+        raise ValidationError(f"URL de imagen no permitida: {url}")
+    req = Request(url, headers={"User-Agent": USER_AGENT})
+    limite = MAX_MB * 1024 * 1024
+    with urlopen(req, timeout=DESCARGA_TIMEOUT) as resp:
+        contenido = resp.read(limite + 1)
+    if len(contenido) > limite:
+        raise ValidationError(f"Imagen > {MAX_MB} MB")
+    nombre = url.rsplit("/", 1)[-1].split("?", 1)[0] or "imagen.jpg"
+    archivo = SimpleUploadedFile(nombre, contenido)
+    validar_imagen(archivo)
+    return archivo
+
+
+# ----------------- Importador -----------------
+class Importador:
+    def __init__(self, batch_size=500, log=None):
+        self.batch_size = batch_size
+        self.log = log or (lambda msg: None)
+        self.leidas = 0
+        self.invalidas = 0
+        self.guardadas = 0
+        # Códigos de toda la corrida: los del feed no se generan y los
+        # generados no se pueden reusar como código explícito más adelante
+        self.codigos_feed = set()
+        self.codigos_generados = set()
+        # Una línea JSON [codigo, url_portada, [urls galería]] por propiedad
+        self._pendientes = tempfile.TemporaryFile("w+", encoding="utf-8")
+        self.con_imagenes = 0
+
+    def procesar(self, filas, dry_run=False):
+        lote = []
+        for n, fila in enumerate(filas, start=1):
+            self.leidas += 1
+            datos, errores = validar_fila(fila)
+            if errores:
+                self.invalidas += 1
+                self.log(f"fila {n}: " + "; ".join(errores))
+                continue
+            lote.append(datos)
+            if len(lote) >= self.batch_size:
+                self._guardar_lote(lote, dry_run)
+                lote = []
+        if lote:
+            self._guardar_lote(lote, dry_run)
+
+    def _guardar_lote(self, lote, dry_run):
+        # Códigos: los del feed se respetan (upsert); el resto se reserva en
+        # bloque, sin repetir ninguno de la corrida (con --dry-run ni siquiera
+        # están en la base)
+        chocan = [d for d in lote if d["codigo"] in self.codigos_generados]
+        for d in chocan:
+            self.invalidas += 1
+            self.log(f"codigo {d['codigo']}: ya se le asignó a una fila sin código de esta importación")
+        lote = [d for d in lote if d["codigo"] not in self.codigos_generados]
+        self.codigos_feed.update(d["codigo"] for d in lote if d["codigo"])
+        sin_codigo = [d for d in lote if not d["codigo"]]
+        generados = Propiedad.generar_codigos(len(sin_codigo), excluir=self.codigos_feed | self.codigos_generados)
+        self.codigos_generados.update(generados)
+        for d, codigo in zip(sin_codigo, generados):
+            d["codigo"] = codigo
+
+        # Si el mismo código aparece dos veces en el lote gana la última fila
+        por_codigo = {}
+        for d in lote:
+            por_codigo[d["codigo"]] = d
+
+        ahora = timezone.now()
+        objs = []
+        for d in por_codigo.values():
+            campos = {k: v for k, v in d.items() if k not in ("imagen_url", "imagenes_urls")}
+            p = Propiedad(**campos)
+            p.normalizar()
+            p.creado = p.actualizado = ahora
+            objs.append(p)
+            if d["imagen_url"] or d["imagenes_urls"]:
+                self._pendientes.write(json.dumps([d["codigo"], d["imagen_url"], d["imagenes_urls"]]) + "\n")
+                self.con_imagenes += 1
+
+        if dry_run:
+            self.guardadas += len(objs)
+            return
+        Propiedad.objects.bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=["codigo"],
+            update_fields=CAMPOS_UPSERT,
+        )
+        invalidar_grupo("propiedades")  # bulk_create no dispara post_save
+        self.guardadas += len(objs)
+
+    def pendientes_imagenes(self):
+        """(codigo, url_portada, [urls galería]) de cada propiedad con imágenes."""
+        self._pendientes.flush()
+        self._pendientes.seek(0)
+        for linea in self._pendientes:
+            yield tuple(json.loads(linea))
+
+    def importar_imagenes(self, workers=8, reemplazar=False, lote=LOTE_IMAGENES):
+        """
+        Segunda pasada, de a `lote` propiedades: descarga en paralelo (I/O) y
+        guarda en el thread principal (DB + conversión vía Propiedad.save /
+        PropiedadImagen.save).
+        """
+        asignadas = 0
+        pendientes = self.pendientes_imagenes()
+        while parte := list(islice(pendientes, lote)):
+            asignadas += self._importar_lote_imagenes(parte, workers, reemplazar)
+        return asignadas
+
+    def _importar_lote_imagenes(self, pendientes, workers, reemplazar):
+        props = Propiedad.objects.filter(codigo__in=[c for c, _, _ in pendientes]).in_bulk(field_name="codigo")
+        if not reemplazar:
+            pendientes = [t for t in pendientes if t[0] in props and not props[t[0]].imagen_principal]
+
+        urls = {u for _, portada, galeria in pendientes for u in ([portada] if portada else []) + galeria}
+
+        def bajar(url):
+            try:
+                return url, descargar_imagen(url)
+            except Exception as e:
+                self.log(f"imagen {url}: {e}")
+                return url, None
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            archivos = dict(pool.map(bajar, urls))
+
+        asignadas = 0
+        for codigo, portada, galeria in pendientes:
+            prop = props.get(codigo)
+            if prop is None:
+                continue
+            with transaction.atomic():
+                if portada and archivos.get(portada):
+                    archivos[portada].seek(0)
+                    prop.imagen_principal = archivos[portada]
+                    prop.save(update_fields=["imagen_principal", "imagen_placeholder"])
+                    asignadas += 1
+                nuevas = [archivos[u] for u in galeria if archivos.get(u)][:10]
+                if nuevas:
+                    for img in prop.imagenes.all():
+                        img.delete()
+                    for archivo in nuevas:
+                        archivo.seek(0)
+                        PropiedadImagen(propiedad=prop, imagen=archivo).save()
+                        asignadas += 1
+        return asignadas
@@ -0,0 +1,52 @@
+import gzip
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from propiedades.feeds import FORMATOS, propiedades_para_feed
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera el feed de propiedades para portales (gzip) en un archivo local "
+        "o en el storage de media, para servirlo como estático."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--formato", choices=sorted(FORMATOS), default="xml")
+        parser.add_argument("--base-url", required=True, help="Ej.: https://leods-blog.org")
+        parser.add_argument("--salida", type=str,
+                            help="Ruta local del .gz. Sin esto se guarda en el storage como feeds/propiedades.<formato>.gz")
+
+    def handle(self, *args, **opts):
+        generador, _ = FORMATOS[opts["formato"]]
+        t0 = time.perf_counter()
+
+        # Se escribe a un temporal en disco: memoria constante aunque el feed pese cientos de MB
+        with tempfile.TemporaryFile() as tmp:
+            with gzip.GzipFile(fileobj=tmp, mode="wb", compresslevel=6) as gz:
+                for parte in generador(propiedades_para_feed(), opts["base_url"]):
+                    gz.write(parte.encode("utf-8"))
+            tamano = tmp.tell()
+            tmp.seek(0)
+
+            if opts["salida"]:
+                destino = Path(opts["salida"])
+                destino.parent.mkdir(parents=True, exist_ok=True)
+                with open(destino, "wb") as fh:
+                    while chunk := tmp.read(1024 * 1024):
+                        fh.write(chunk)
+            else:
+                nombre = f"feeds/propiedades.{opts['formato']}.gz"
+                if default_storage.exists(nombre):
+                    default_storage.delete(nombre)
+                default_storage.save(nombre, File(tmp, name=nombre))
+                destino = default_storage.url(nombre)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Feed {opts['formato']} ({tamano / 1024:,.0f} KB gzip) en {time.perf_counter() - t0:.2f}s → {destino}"
+        ))
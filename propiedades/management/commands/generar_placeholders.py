@@ -0,0 +1,49 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from propiedades.imagenes import placeholder_de
+from propiedades.models import ImagenBlob, Propiedad, PropiedadImagen
+
+
+class Command(BaseCommand):
+    help = "Calcula los placeholders (LQIP) de las imágenes que todavía no lo tienen."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Recalcular aunque ya tengan placeholder")
+
+    def handle(self, *args, **opts):
+        # Un placeholder por archivo: los blobs compartidos se decodifican una sola vez
+        calculados = {}
+
+        def placeholder(nombre):
+            if nombre not in calculados:
+                try:
+                    with default_storage.open(nombre, "rb") as fh:
+                        calculados[nombre] = placeholder_de(fh)
+                except Exception as e:
+                    self.stdout.write(self.style.WARNING(f"  ✗ {nombre}: {e}"))
+                    calculados[nombre] = ""
+            return calculados[nombre]
+
+        blobs = ImagenBlob.objects.all()
+        if not opts["force"]:
+            blobs = blobs.filter(placeholder="")
+        for blob in blobs.iterator():
+            blob.placeholder = placeholder(blob.nombre)
+            blob.save(update_fields=["placeholder"])
+
+        for model, campo, campo_ph in (
+            (Propiedad, "imagen_principal", "imagen_placeholder"),
+            (PropiedadImagen, "imagen", "placeholder"),
+        ):
+            qs = model.objects.exclude(**{campo: ""})
+            if not opts["force"]:
+                qs = qs.filter(**{campo_ph: ""})
+            hechos = 0
+            for pk, nombre in qs.values_list("pk", campo).iterator():
+                ph = placeholder(nombre)
+                if ph:
+                    # update() directo: no dispara save() ni toca `actualizado`
+                    model.objects.filter(pk=pk).update(**{campo_ph: ph})
+                    hechos += 1
+            self.stdout.write(self.style.SUCCESS(f"{model.__name__}: {hechos} placeholders"))
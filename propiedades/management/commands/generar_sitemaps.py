@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from propiedades.sitemaps import directorio, generar_sitemaps
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera los sitemaps .xml.gz en SITEMAP_DIR (índice + sub-sitemaps). "
+        "Solo reescribe si cambiaron los avisos activos, salvo --force."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", help="Ej: https://leods-blog.org/ (por defecto SITE_URL)")
+        parser.add_argument("--force", action="store_true", help="Regenerar aunque no haya cambios")
+
+    def handle(self, *args, **opts):
+        estado = generar_sitemaps(opts["base_url"], forzar=opts["force"])
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(estado['archivos'])} archivos en {directorio()} "
+            f"(generados {estado['generado']:%Y-%m-%d %H:%M:%S})"
+        ))
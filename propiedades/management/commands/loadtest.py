@@ -0,0 +1,131 @@
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from propiedades.prueba_carga import correr, cookie_de_sesion, escenario_panel, escenario_publico, resumen
+
+SERVIDORES = {
+    # WSGI con workers sync (lo mismo que producción)
+    "gunicorn": lambda port, o: [
+        sys.executable, "-m", "gunicorn", "django_inmobiliaria.wsgi:application",
+        "-b", f"127.0.0.1:{port}", "-w", str(o["workers"]), "--threads", str(o["threads"]),
+        "--log-level", "warning",
+    ],
+    # ASGI (requiere uvicorn instalado)
+    "uvicorn": lambda port, o: [
+        sys.executable, "-m", "uvicorn", "django_inmobiliaria.asgi:application",
+        "--host", "127.0.0.1", "--port", str(port), "--workers", str(o["workers"]),
+        "--log-level", "warning",
+    ],
+    # Solo stdlib (wsgiref con threads)
+    "runserver": lambda port, o: [
+        sys.executable, str(Path(settings.BASE_DIR) / "manage.py"), "runserver",
+        f"127.0.0.1:{port}", "--noreload", "--insecure",
+    ],
+}
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga del sitio público (y opcionalmente del panel): levanta la "
+        "app localmente (o usa --url) y reporta req/s, percentiles y errores por patrón."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", help="Servidor ya levantado (no se arranca ninguno)")
+        parser.add_argument("--servidor", choices=sorted(SERVIDORES), default="gunicorn")
+        parser.add_argument("--workers", type=int, default=1, help="Workers del servidor")
+        parser.add_argument("--threads", type=int, default=1, help="Threads por worker (gunicorn)")
+        parser.add_argument("-c", "--concurrencia", type=int, default=10, help="Usuarios virtuales")
+        parser.add_argument("--duracion", type=float, default=20, help="Segundos de medición")
+        parser.add_argument("--requests", type=int, help="Total de requests (en vez de --duracion)")
+        parser.add_argument("--warmup", type=float, default=2, help="Segundos iniciales que no se miden")
+        parser.add_argument("--pasos", help="Solo estos patrones, separados por coma (ej: detalle,buscar)")
+        parser.add_argument("--panel-user", help="Username staff: suma el escenario del panel")
+        parser.add_argument("--json", dest="salida_json", help="Guardar el resumen en este archivo")
+
+    def handle(self, *args, **o):
+        pasos = escenario_publico()
+        if o["panel_user"]:
+            try:
+                usuario = get_user_model().objects.get(username=o["panel_user"], is_staff=True)
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"No existe el usuario staff '{o['panel_user']}'")
+            pasos += escenario_panel(cookie_de_sesion(usuario))
+        if o["pasos"]:
+            elegidos = {x.strip() for x in o["pasos"].split(",")}
+            pasos = [p for p in pasos if p.nombre in elegidos]
+        if not pasos:
+            raise CommandError("El escenario quedó vacío (¿hay propiedades activas? ¿--pasos?)")
+
+        proceso = None
+        url = o["url"]
+        if not url:
+            port = _puerto_libre()
+            proceso = self._arrancar(SERVIDORES[o["servidor"]](port, o), port)
+            url = f"http://127.0.0.1:{port}"
+        try:
+            self.stdout.write(self.style.NOTICE(
+                f"{url} · {o['concurrencia']} usuarios · "
+                + (f"{o['requests']} requests" if o["requests"] else f"{o['duracion']:.0f}s")
+                + f" · pasos: {', '.join(p.nombre for p in pasos)}"
+            ))
+            stats, segundos = asyncio.run(correr(
+                url, pasos, concurrencia=o["concurrencia"],
+                duracion=None if o["requests"] else o["duracion"],
+                total=o["requests"], warmup=0 if o["requests"] else o["warmup"],
+            ))
+        finally:
+            if proceso:
+                proceso.terminate()
+                proceso.wait(timeout=10)
+
+        filas = resumen(stats, segundos)
+        self._imprimir(filas)
+        if o["salida_json"]:
+            with open(o["salida_json"], "w", encoding="utf-8") as fh:
+                json.dump({"url": url, "segundos": segundos, "filas": filas}, fh, indent=2)
+
+    def _arrancar(self, cmd, port, timeout=30):
+        proceso = subprocess.Popen(cmd, cwd=settings.BASE_DIR, env=os.environ.copy())
+        limite = time.monotonic() + timeout
+        while time.monotonic() < limite:
+            if proceso.poll() is not None:
+                raise CommandError(f"El servidor terminó al arrancar: {' '.join(cmd)}")
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+                return proceso
+            except OSError:
+                time.sleep(0.1)
+        proceso.terminate()
+        raise CommandError(f"El servidor no respondió en {timeout}s")
+
+    def _imprimir(self, filas):
+        cab = f"{'patrón':<14}{'reqs':>8}{'req/s':>9}{'err%':>7}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}"
+        self.stdout.write(cab)
+        self.stdout.write("-" * len(cab))
+        for f in filas:
+            linea = (
+                f"{f['patron']:<14}{f['requests']:>8}{f['rps']:>9.1f}{f['error_pct']:>7.1f}"
+                f"{f['p50_ms']:>9.1f}{f['p90_ms']:>9.1f}{f['p99_ms']:>9.1f}{f['max_ms']:>9.1f}"
+            )
+            estilo = self.style.ERROR if f["errores"] else (lambda x: x)
+            self.stdout.write(estilo(linea))
+            if f["errores"] and f["status"]:
+                self.stdout.write(f"{'':<14}status: {f['status']}")
+        self.stdout.write("(latencias en ms)")
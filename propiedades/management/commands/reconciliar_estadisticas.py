@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from propiedades.models import EstadisticaPanel
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula los contadores del panel (EstadisticaPanel) con un GROUP BY "
+        "y corrige los que se desviaron. Pensado para correr periódicamente (cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Solo mostrar las diferencias")
+
+    def handle(self, *args, **opts):
+        diferencias = EstadisticaPanel.reconciliar(dry_run=opts["dry_run"])
+        for (dimension, valor), (guardado, real) in sorted(diferencias.items()):
+            self.stdout.write(self.style.WARNING(f"  {dimension}={valor}: {guardado} -> {real}"))
+        if opts["dry_run"]:
+            self.stdout.write(self.style.SUCCESS(f"[DRY-RUN] {len(diferencias)} contadores desviados"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{len(diferencias)} contadores corregidos"))
@@ -2,14 +2,25 @@
 import os
 import random
 import string
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from decimal import Decimal
 from pathlib import Path
 
 from django.core.files import File
+from django.core.files.base import ContentFile
 from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
 from django.utils import timezone
 from django.apps import apps
 
+from django_inmobiliaria.cache import invalidar_grupo
+from propiedades.imagenes import preparar_ruta
+from propiedades.models import EstadisticaPanel, ImagenBlob, Propiedad, PropiedadImagen
+
 # ---------- Helpers de introspección ----------
 def has_field(model, name: str) -> bool:
     try:
@@ -34,6 +45,17 @@ def pick_existing_file(base_dir: Path, idx: int):
             return p
     return None
 
+def listar_imagenes(base_dir: Path):
+    """Todas las 'foto (n).<ext>' de base_dir, en orden."""
+    rutas = []
+    for idx in range(1, 1000):
+        p = pick_existing_file(base_dir, idx)
+        if p is None and idx > 20:
+            break
+        if p:
+            rutas.append(p)
+    return rutas
+
 def generate_code(existing_codes: set) -> str:
     # Formato tipo UVBP6491: 4 letras + 4 dígitos
     while True:
@@ -47,12 +69,25 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument("--count", type=int, default=50, help="Cantidad de propiedades a crear")
-        parser.add_argument("--img-dir", type=str, required=True, help=r'Carpeta con "foto (1..20).jpg|png|jpeg|webp"')
+        parser.add_argument("--img-dir", type=str, help=r'Carpeta con "foto (1..20).jpg|png|jpeg|webp"')
         parser.add_argument("--images-per", type=int, default=3, help="Cantidad de fotos por propiedad (si hay modelo de imágenes)")
         parser.add_argument("--dry-run", action="store_true", help="No guarda nada; solo muestra qué haría")
+        parser.add_argument("--bulk", action="store_true",
+                            help="Carga masiva (100k+): bulk_create por lotes e imágenes compartidas")
+        parser.add_argument("--batch-size", type=int, default=2000, help="[--bulk] Propiedades por INSERT")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                            help="[--bulk] Procesos para convertir las imágenes de --img-dir")
+        parser.add_argument("--seed", type=int, help="Semilla del random (datasets reproducibles)")
 
     def handle(self, *args, **opts):
+        if opts["seed"] is not None:
+            random.seed(opts["seed"])
+        if opts["bulk"]:
+            return self.handle_bulk(**opts)
+
         count = int(opts["count"])
+        if not opts["img_dir"]:
+            raise CommandError("--img-dir es obligatorio (salvo con --bulk)")
         img_dir = Path(opts["img_dir"])
         images_per = int(opts["images_per"])
         dry = bool(opts["dry_run"])
@@ -238,3 +273,129 @@ class Command(BaseCommand):
             creadas += 1
 
         self.stdout.write(self.style.SUCCESS(f"Listo. Propiedades procesadas: {creadas}"))
+
+    # ----------------- Modo --bulk -----------------
+    def handle_bulk(self, **opts):
+        """
+        Genera `count` propiedades con bulk_create por lotes: códigos reservados
+        en bloque, normalizados/search_index en memoria y las fotos de --img-dir
+        convertidas una sola vez (pool de procesos) y compartidas como blobs.
+        """
+        count, batch_size = opts["count"], max(1, opts["batch_size"])
+        images_per = max(0, min(opts["images_per"], 10))
+        dry = opts["dry_run"]
+
+        blobs = []
+        if opts["img_dir"]:
+            img_dir = Path(opts["img_dir"])
+            if not img_dir.exists():
+                raise CommandError(f"La carpeta de imágenes no existe: {img_dir}")
+            t0 = time.perf_counter()
+            blobs = self._preparar_blobs(listar_imagenes(img_dir), opts["workers"], dry)
+            self.stdout.write(self.style.NOTICE(
+                f"{len(blobs)} imágenes listas en {time.perf_counter() - t0:.2f}s"
+            ))
+
+        t0 = time.perf_counter()
+        creadas = 0
+        while creadas < count:
+            n = min(batch_size, count - creadas)
+            if not dry:
+                self._crear_lote(n, blobs, images_per)
+            creadas += n
+            seg = time.perf_counter() - t0
+            self.stdout.write(f"  {creadas}/{count} ({creadas / seg if seg else 0:,.0f} filas/s)")
+
+        if not dry:
+            invalidar_grupo("propiedades")  # bulk_create no dispara post_save
+        prefijo = "[DRY-RUN] " if dry else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefijo}Listo. {creadas} propiedades en {time.perf_counter() - t0:.2f}s"
+        ))
+
+    def _preparar_blobs(self, rutas, workers, dry):
+        if workers > 1 and len(rutas) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                preparadas = list(pool.map(preparar_ruta, rutas))
+        else:
+            preparadas = [preparar_ruta(r) for r in rutas]
+        if dry:
+            return []
+        # Se suben juntas, en paralelo (storages_s3.guardar_lote)
+        return ImagenBlob.registrar_lote(
+            (digest, ContentFile(contenido, name=nombre), placeholder)
+            for digest, nombre, contenido, placeholder in preparadas
+        )
+
+    def _crear_lote(self, n, blobs, images_per):
+        usos = Counter()
+        objs = []
+        for codigo in Propiedad.generar_codigos(n):
+            p = Propiedad(codigo=codigo, **datos_aleatorios())
+            if blobs:
+                portada = random.choice(blobs)
+                p.imagen_principal, p.imagen_placeholder = portada.nombre, portada.placeholder
+                usos[portada.pk] += 1
+            p.normalizar()
+            objs.append(p)
+
+        with transaction.atomic():
+            Propiedad.objects.bulk_create(objs)
+            EstadisticaPanel.aplicar(EstadisticaPanel.deltas(objs))  # bulk_create no dispara post_save
+            galeria = []
+            if blobs and images_per:
+                for p in objs:
+                    for blob in random.sample(blobs, k=min(images_per, len(blobs))):
+                        galeria.append(PropiedadImagen(propiedad_id=p.pk, imagen=blob.nombre,
+                                                       placeholder=blob.placeholder))
+                        usos[blob.pk] += 1
+                PropiedadImagen.objects.bulk_create(galeria)
+            for pk, veces in usos.items():
+                ImagenBlob.objects.filter(pk=pk).update(referencias=F("referencias") + veces)
+
+
+LOCALIDADES = [
+    ("Quilmes", "Buenos Aires"), ("Bernal", "Buenos Aires"), ("Wilde", "Buenos Aires"),
+    ("Avellaneda", "Buenos Aires"), ("Lanús", "Buenos Aires"), ("Banfield", "Buenos Aires"),
+    ("Lomas de Zamora", "Buenos Aires"), ("Palermo", "CABA"), ("Caballito", "CABA"),
+    ("Recoleta", "CABA"),
+]
+CALLES = [
+    "Av. Mitre", "Rivadavia", "Sarmiento", "Belgrano", "San Martín", "Corrientes",
+    "Lavalle", "Urquiza", "Alsina", "Moreno", "Laprida", "Callao", "Pueyrredón",
+]
+TIPOS = ["casa", "departamento", "ph", "local", "terreno", "otro"]
+
+
+def datos_aleatorios():
+    """Campos de una Propiedad válida (choices reales del modelo) al azar."""
+    tipo = random.choice(TIPOS)
+    operacion = random.choices(["venta", "alquiler", "temporario"], weights=[6, 3, 1])[0]
+    localidad, provincia = random.choice(LOCALIDADES)
+    habitaciones = random.randint(0 if tipo in ("local", "terreno") else 1, 5)
+    cubierta = random.randint(28, 250)
+    cochera = random.random() < 0.4
+    datos = dict(
+        titulo=f"{tipo.capitalize()} {habitaciones} dorm. en {localidad}",
+        descripcion=(
+            f"{tipo.capitalize()} en {localidad}, {habitaciones} dormitorio(s), "
+            f"{'con' if cochera else 'sin'} cochera. Sup. cubierta {cubierta} m²."
+        ),
+        tipo=tipo,
+        tipo_operacion=operacion,
+        habitaciones=habitaciones,
+        banos=random.randint(1, 3),
+        cochera=cochera,
+        acepta_mascotas=random.random() < 0.5,
+        superficie_cubierta=cubierta,
+        superficie_total=cubierta + random.choice([0, 10, 20, 50, 150]),
+        estado=random.choices(["activa", "pausada", "finalizada"], weights=[85, 10, 5])[0],
+        direccion=f"{random.choice(CALLES)} {random.randint(100, 4900)}",
+        localidad=localidad,
+        provincia=provincia,
+    )
+    if operacion == "venta":
+        datos["precio_usd"] = Decimal(random.randint(35, 350) * 1000)
+    else:
+        datos["precio_pesos"] = Decimal(random.randint(220, 2200) * 1000)
+    return datos
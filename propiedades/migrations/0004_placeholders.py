@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('propiedades', '0003_imagenblob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imagenblob',
+            name='placeholder',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='propiedad',
+            name='imagen_placeholder',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='propiedadimagen',
+            name='placeholder',
+            field=models.TextField(blank=True, editable=False),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('propiedades', '0004_placeholders'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PropiedadBaja',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('propiedad_id', models.BigIntegerField()),
+                ('codigo', models.CharField(max_length=8)),
+                ('eliminada', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='propiedad',
+            index=models.Index(fields=['actualizado', 'id'], name='propiedades_actuali_ee7fa5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propiedadbaja',
+            index=models.Index(fields=['eliminada', 'id'], name='propiedades_elimina_4b7223_idx'),
+        ),
+    ]
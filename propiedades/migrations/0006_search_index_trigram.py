@@ -0,0 +1,59 @@
+from django.db import migrations
+
+from propiedades.utils import normalizar_texto
+
+INDICE = "propiedades_search_index_trgm"
+
+
+def recalcular_search_index(apps, schema_editor):
+    """search_index ahora incluye el código: se recalcula en lotes."""
+    Propiedad = apps.get_model("propiedades", "Propiedad")
+    lote = []
+    for p in Propiedad.objects.only(
+        "codigo", "titulo", "descripcion", "direccion", "localidad", "provincia",
+        "pais", "tipo", "tipo_operacion", "cochera", "acepta_mascotas", "search_index",
+    ).iterator(chunk_size=2000):
+        partes = [
+            p.codigo, p.titulo, p.descripcion, p.direccion,
+            p.localidad, p.provincia, p.pais,
+            p.tipo, p.tipo_operacion,
+            ("cochera" if p.cochera else "no cochera"),
+            ("acepta mascotas" if p.acepta_mascotas else "no mascotas"),
+        ]
+        p.search_index = normalizar_texto(" ".join([x for x in partes if x]))
+        lote.append(p)
+        if len(lote) >= 2000:
+            Propiedad.objects.bulk_update(lote, ["search_index"])
+            lote = []
+    if lote:
+        Propiedad.objects.bulk_update(lote, ["search_index"])
+
+
+def crear_indice_trigram(apps, schema_editor):
+    # Solo Postgres: LIKE '%término%' sobre search_index pasa a usar el índice.
+    # En SQLite (dev) no hay equivalente y se sigue escaneando.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS {INDICE} ON propiedades_propiedad "
+        "USING gin (search_index gin_trgm_ops)"
+    )
+
+
+def borrar_indice_trigram(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f"DROP INDEX IF EXISTS {INDICE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('propiedades', '0005_cambios'),
+    ]
+
+    operations = [
+        migrations.RunPython(recalcular_search_index, migrations.RunPython.noop),
+        migrations.RunPython(crear_indice_trigram, borrar_indice_trigram),
+    ]
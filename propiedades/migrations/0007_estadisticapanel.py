@@ -0,0 +1,40 @@
+# Generated by Django 5.2.5 on 2026-10-19 17:01
+
+from django.db import migrations, models
+from django.db.models import Count
+
+DIMENSIONES = ("estado", "tipo", "tipo_operacion", "localidad")
+
+
+def contar_existentes(apps, schema_editor):
+    Propiedad = apps.get_model("propiedades", "Propiedad")
+    EstadisticaPanel = apps.get_model("propiedades", "EstadisticaPanel")
+    EstadisticaPanel.objects.bulk_create([
+        EstadisticaPanel(dimension=dimension, valor=valor, cantidad=n)
+        for dimension in DIMENSIONES
+        for valor, n in (Propiedad.objects.order_by().values_list(dimension)
+                         .annotate(n=Count("pk")).values_list(dimension, "n"))
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('propiedades', '0006_search_index_trigram'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadisticaPanel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(max_length=20)),
+                ('valor', models.CharField(max_length=120)),
+                ('cantidad', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('dimension', 'valor'), name='estadistica_dimension_valor')],
+            },
+        ),
+        migrations.RunPython(contar_existentes, migrations.RunPython.noop),
+    ]
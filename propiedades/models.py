@@ -1,14 +1,32 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F
 from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.dispatch import Signal
+from django.utils import timezone
 from django.utils.html import format_html
 
 from .validators import validar_imagen
-from .utils import normalizar_texto
-
-from PIL import Image  # usado por _to_webp
-import io
+from .utils import normalizar_corto, normalizar_texto
+from .imagenes import ImagenProcesada, imagen_workers, procesar
+from django_inmobiliaria import metricas
+from django_inmobiliaria.storages_s3 import guardar_lote
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import logging
 import random
 import string
+import time
+
+BLOB_PREFIX = "blobs"
+
+logger = logging.getLogger(__name__)
+
+# Cambios hechos con UPDATE masivo (no pasan por save()/post_save): se envía
+# una vez por lote con sender=Propiedad, ids=[...] y campos=[...].
+propiedades_actualizadas = Signal()
 
 
 def _generar_codigo():
@@ -19,24 +37,208 @@ def _generar_codigo():
 
 def _to_webp(file_field):
     """
-    Convierte la imagen a WEBP (quality=85). Si algo falla, devuelve el original.
+    Convierte la imagen a WEBP (quality=85) con memoria acotada y calcula su
+    placeholder, ver imagenes.py. Si algo falla, devuelve el original sin placeholder.
     """
     if not file_field or not hasattr(file_field, 'file'):
-        return file_field
+        return ImagenProcesada(file_field, "")
     try:
-        img = Image.open(file_field).convert("RGB")
-        buf = io.BytesIO()
-        img.save(buf, format="WEBP", quality=85, method=6)
-        buf.seek(0)
-        name = file_field.name.rsplit('.', 1)[0] + ".webp"
-
-        from django.core.files.uploadedfile import InMemoryUploadedFile
-        webp = InMemoryUploadedFile(
-            buf, None, name, "image/webp", buf.getbuffer().nbytes, None
-        )
-        return webp
+        return procesar(file_field)
     except Exception:
-        return file_field
+        file_field.seek(0)
+        return ImagenProcesada(file_field, "")
+
+
+def _sha256(archivo):
+    """SHA-256 del contenido subido, leído por chunks para no cargarlo entero."""
+    h = hashlib.sha256()
+    for chunk in archivo.chunks():
+        h.update(chunk)
+    archivo.seek(0)
+    return h.hexdigest()
+
+
+def _ruta_blob(digest, ext):
+    # blobs/ab/cd/abcd....webp -> evita directorios/prefijos con miles de archivos
+    return f"{BLOB_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}.{ext}"
+
+
+def _ruta_webp(digest, webp):
+    return _ruta_blob(digest, webp.name.rsplit('.', 1)[-1].lower())
+
+
+
+class ImagenBlob(models.Model):
+    """
+    Archivo de imagen direccionado por contenido (SHA-256 del upload original).
+    Varias propiedades/galerías pueden apuntar al mismo blob: se convierte y
+    se sube una sola vez, y se borra cuando ya nadie lo referencia.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    nombre = models.CharField(max_length=255, unique=True)
+    referencias = models.PositiveIntegerField(default=0)
+    placeholder = models.TextField(blank=True)
+    creado = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.nombre} ({self.referencias} refs)"
+
+    @classmethod
+    def adquirir(cls, archivo):
+        """
+        Devuelve el blob de `archivo` y le suma una referencia. Si ya existe uno
+        con el mismo contenido no se convierte ni se sube nada.
+        """
+        digest = _sha256(archivo)
+        while True:
+            blob = cls.objects.filter(sha256=digest).first()
+            if blob is None:
+                webp, placeholder = _to_webp(archivo)
+                blob = cls.registrar(digest, webp, placeholder)
+            # Si otro proceso lo liberó entre el SELECT y el UPDATE, reintentamos
+            if cls.objects.filter(pk=blob.pk).update(referencias=F("referencias") + 1):
+                return blob
+
+    @classmethod
+    def adquirir_lote(cls, archivos, max_workers=None):
+        """
+        adquirir() para varios uploads (una galería), en el mismo orden. Hash y
+        conversión van en un pool de threads (Pillow suelta el GIL al
+        codificar) y la subida, en paralelo por registrar_lote(); la base se
+        toca solo en el thread que llama, dentro de su transacción. Si esta se
+        revierte, los archivos ya subidos quedan sin fila, igual que con adquirir().
+        """
+        archivos = list(archivos)
+        if len(archivos) <= 1:
+            return [cls.adquirir(archivo) for archivo in archivos]
+        t0 = time.perf_counter()
+        default_storage.exists  # el LazyObject se inicializa acá, no en los threads
+        with ThreadPoolExecutor(max_workers=max_workers or imagen_workers()) as pool:
+            digests = list(pool.map(_sha256, archivos))
+            blobs = {b.sha256: b for b in cls.objects.filter(sha256__in=digests)}
+            faltan = {}
+            for digest, archivo in zip(digests, archivos):
+                if digest not in blobs:
+                    faltan.setdefault(digest, archivo)
+            convertidas = list(pool.map(_to_webp, faltan.values()))
+        nuevos = cls.registrar_lote(
+            (digest, webp, placeholder) for digest, (webp, placeholder) in zip(faltan, convertidas)
+        )
+        blobs.update((blob.sha256, blob) for blob in nuevos)
+        segundos = time.perf_counter() - t0
+
+        resultado = {}
+        for digest, usos in Counter(digests).items():
+            blob = blobs[digest]
+            if cls.objects.filter(pk=blob.pk).update(referencias=F("referencias") + usos):
+                resultado[digest] = blob
+        # Los que otro proceso liberó en el medio van por el camino normal
+        lote = [resultado.get(d) or cls.adquirir(a) for d, a in zip(digests, archivos)]
+
+        total = time.perf_counter() - t0
+        metricas.observar("inmo_galeria_guardado_seconds", total)
+        logger.info(
+            "galería: %d imágenes (%d convertidas) en %.2fs, %.2fs en el pool",
+            len(archivos), len(faltan), total, segundos,
+        )
+        return lote
+
+    @classmethod
+    def registrar(cls, digest, webp, placeholder=""):
+        """
+        Sube `webp` (ya convertido) a su ruta de blob si hace falta y devuelve
+        la fila, sin sumar referencias. Para varias imágenes, registrar_lote().
+        """
+        return cls.registrar_lote([(digest, webp, placeholder)])[0]
+
+    @classmethod
+    def registrar_lote(cls, convertidas, max_workers=None):
+        """
+        registrar() para [(digest, webp, placeholder), ...], en el mismo orden.
+        Los archivos que falten se suben juntos con storages_s3.guardar_lote(),
+        el mismo camino en paralelo para S3 y para el disco local. La fila
+        guarda el nombre que devuelve save(): un storage que no pisa (p.ej.
+        FileSystemStorage, si otro proceso subió el mismo blob entre exists()
+        y save()) le agrega un sufijo.
+        """
+        convertidas = list(convertidas)
+        items = [(_ruta_webp(digest, webp), webp) for digest, webp, _ in convertidas]
+        nombres = guardar_lote(default_storage, items, max_workers, solo_faltantes=True)
+        return [
+            cls.objects.get_or_create(
+                sha256=digest, defaults={"nombre": nombre, "placeholder": placeholder}
+            )[0]
+            for (digest, _, placeholder), nombre in zip(convertidas, nombres)
+        ]
+
+    @classmethod
+    def liberar(cls, nombre):
+        """
+        Resta una referencia. Al llegar a cero la fila queda con 0 y, ya
+        commiteado, purgar() borra archivo y fila si nadie la volvió a adquirir.
+        """
+        if not nombre or not nombre.startswith(BLOB_PREFIX + "/"):
+            return  # archivos previos a los blobs: no se tocan
+        with transaction.atomic():
+            blob = cls.objects.select_for_update().filter(nombre=nombre).first()
+            if blob is None or not blob.referencias:
+                return
+            cls.objects.filter(pk=blob.pk).update(referencias=F("referencias") - 1)
+            if blob.referencias == 1:
+                transaction.on_commit(lambda: cls.purgar(blob.pk))
+
+    @classmethod
+    def purgar(cls, pk):
+        """
+        Borra el archivo y la fila de un blob sin referencias. Todo bajo el
+        lock de la fila: un adquirir() concurrente o suma su referencia antes
+        (y el blob se salva) o espera a que se borre y, al no encontrar la
+        fila, vuelve a convertir y subir. Borrar la fila en liberar() y el
+        archivo recién en on_commit dejaba una ventana en la que otro proceso
+        registraba el blob de nuevo y se quedaba sin archivo.
+        """
+        with transaction.atomic():
+            blob = cls.objects.select_for_update().filter(pk=pk, referencias=0).first()
+            if blob is None:
+                return  # lo volvieron a adquirir
+            default_storage.delete(blob.nombre)
+            blob.delete()
+
+
+def _almacenar_imagen(instancia, campo, campo_placeholder):
+    """
+    Si `campo` trae un upload nuevo, lo reemplaza por el nombre del blob
+    correspondiente (copiando su placeholder) y libera la imagen anterior.
+    """
+    fieldfile = getattr(instancia, campo)
+    if not fieldfile or getattr(fieldfile, '_committed', True):
+        return
+    anterior = None
+    if instancia.pk:
+        anterior = (type(instancia).objects.filter(pk=instancia.pk)
+                    .values_list(campo, flat=True).first())
+    # Ya adquirido en lote por preparar_imagenes()
+    blob = instancia.__dict__.pop(f"_blob_{campo}", None) or ImagenBlob.adquirir(fieldfile)
+    setattr(instancia, campo, blob.nombre)
+    setattr(instancia, campo_placeholder, blob.placeholder)
+    if anterior and anterior != blob.nombre:
+        transaction.on_commit(lambda: ImagenBlob.liberar(anterior))
+
+
+def preparar_imagenes(instancias, campo, max_workers=None):
+    """
+    Adquiere en paralelo (ImagenBlob.adquirir_lote) los uploads nuevos de
+    `campo` en `instancias`, que después se guardan con save() como siempre.
+    Solo para instancias que se van a guardar: cada una queda con su
+    referencia ya sumada.
+    """
+    pendientes = [
+        i for i in instancias
+        if getattr(i, campo) and not getattr(getattr(i, campo), '_committed', True)
+    ]
+    blobs = ImagenBlob.adquirir_lote([getattr(i, campo) for i in pendientes], max_workers)
+    for instancia, blob in zip(pendientes, blobs):
+        setattr(instancia, f"_blob_{campo}", blob)
 
 
 class Propiedad(models.Model):
@@ -92,6 +294,7 @@ class Propiedad(models.Model):
     destacada = models.BooleanField(default=False, help_text="Mostrar en el home (máx. 10).")
 
     imagen_principal = models.ImageField(upload_to='propiedades/portadas/', validators=[validar_imagen])
+    imagen_placeholder = models.TextField(editable=False, blank=True)
 
     search_index = models.TextField(editable=False, blank=True)
 
@@ -103,6 +306,8 @@ class Propiedad(models.Model):
         indexes = [
             models.Index(fields=["localidad_norm"]),
             models.Index(fields=["provincia_norm"]),
+            # cursor estable del feed de cambios (feeds.cambios_desde)
+            models.Index(fields=["actualizado", "id"]),
         ]
 
     # ----------------- Validaciones -----------------
@@ -111,37 +316,153 @@ class Propiedad(models.Model):
             raise ValidationError("Completá localidad, provincia y país.")
 
     # ----------------- Guardado -----------------
+    # Lo que entra en search_index (ver normalizar)
+    CAMPOS_BUSQUEDA = frozenset({
+        "codigo", "titulo", "descripcion", "direccion", "localidad", "provincia", "pais",
+        "tipo", "tipo_operacion", "cochera", "acepta_mascotas",
+    })
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        instancia._recordar(field_names)
+        return instancia
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using, fields, from_queryset)
+        self._recordar(fields)
+
+    def _valor(self, campo):
+        valor = getattr(self, campo.attname)
+        return valor.name if isinstance(campo, models.FileField) else valor
+
+    def _recordar(self, attnames=None):
+        """Toma los valores actuales como los de la base (ver campos_modificados)."""
+        originales = dict(getattr(self, "_originales", {}))  # copy() comparte el dict
+        for campo in self._meta.concrete_fields:
+            if campo.attname in self.__dict__ and (attnames is None or campo.attname in attnames):
+                originales[campo.attname] = self._valor(campo)
+        self._originales = originales
+
+    def campos_modificados(self):
+        """
+        attnames que cambiaron desde que se leyó de la base o se guardó; None
+        si no hay con qué comparar (instancia nueva o armada a mano).
+        """
+        originales = getattr(self, "_originales", None)
+        if originales is None or self._state.adding:
+            return None
+        cambios = set()
+        for campo in self._meta.concrete_fields:
+            if campo.attname not in self.__dict__:
+                continue  # diferido y nunca cargado: no se toca
+            if (campo.attname not in originales or self._valor(campo) != originales[campo.attname]
+                    or not getattr(getattr(self, campo.attname), "_committed", True)):
+                cambios.add(campo.attname)
+        return cambios
+
     def save(self, *args, **kwargs):
         # Generar código único si no está
         if not self.codigo:
-            nuevo = _generar_codigo()
-            while Propiedad.objects.filter(codigo=nuevo).exists():
-                nuevo = _generar_codigo()
-            self.codigo = nuevo
-
-        # Convertir portada a webp si corresponde
-        if self.imagen_principal and hasattr(self.imagen_principal, 'file'):
-            self.imagen_principal = _to_webp(self.imagen_principal)
-
-        # Presentación y normalizados
-        self.localidad = (self.localidad or "").strip().title()
-        self.provincia = (self.provincia or "").strip().title()
-        self.pais = (self.pais or "").strip().title() or "Argentina"
-
-        self.localidad_norm = normalizar_texto(self.localidad)
-        self.provincia_norm = normalizar_texto(self.provincia)
-        self.pais_norm = normalizar_texto(self.pais)
-
-        partes = [
-            self.titulo, self.descripcion, self.direccion,
-            self.localidad, self.provincia, self.pais,
-            self.tipo, self.tipo_operacion,
-            ("cochera" if self.cochera else "no cochera"),
-            ("acepta mascotas" if self.acepta_mascotas else "no mascotas"),
-        ]
-        self.search_index = normalizar_texto(" ".join([p for p in partes if p]))
-
+            self.codigo = Propiedad.generar_codigos(1)[0]
+
+        # Con update_fields explícito se respeta (y se le suman los derivados);
+        # si no, en una instancia leída de la base se guarda solo lo que cambió.
+        # Sin nada que comparar se recalcula y se guarda todo, como siempre.
+        update_fields = kwargs.get("update_fields")
+        cambios = set(update_fields) if update_fields is not None else self.campos_modificados()
+        if cambios is not None and self._meta.pk.attname in cambios:
+            cambios = None
+
+        # Portada: convertir a webp y guardar como blob (dedup por contenido),
+        # solo si llegó un upload nuevo
+        if cambios is None or "imagen_principal" in cambios:
+            _almacenar_imagen(self, 'imagen_principal', 'imagen_placeholder')
+            if cambios is not None:
+                cambios.add("imagen_placeholder")
+
+        derivados = self.normalizar(cambios)
+        if cambios is not None:
+            if update_fields is None:
+                cambios.add("actualizado")  # auto_now: el feed de cambios lo necesita
+            kwargs["update_fields"] = cambios | derivados
         super().save(*args, **kwargs)
+        self._recordar(kwargs.get("update_fields"))
+
+    def normalizar(self, campos=None):
+        """
+        Presentación y normalizados. Separado de save() para poder aplicarlo
+        en lote (importador, seed) antes de un bulk_create. Con `campos` solo
+        recalcula lo que depende de ellos. Devuelve los campos que tocó.
+        """
+        tocados = set()
+        for campo in ("localidad", "provincia", "pais"):
+            if campos is None or campo in campos:
+                valor = (getattr(self, campo) or "").strip().title()
+                if campo == "pais":
+                    valor = valor or "Argentina"
+                setattr(self, campo, valor)
+                setattr(self, f"{campo}_norm", normalizar_corto(valor))
+                tocados.update((campo, f"{campo}_norm"))
+
+        if campos is None or not self.CAMPOS_BUSQUEDA.isdisjoint(campos):
+            partes = [
+                self.codigo, self.titulo, self.descripcion, self.direccion,
+                self.localidad, self.provincia, self.pais,
+                self.tipo, self.tipo_operacion,
+                ("cochera" if self.cochera else "no cochera"),
+                ("acepta mascotas" if self.acepta_mascotas else "no mascotas"),
+            ]
+            self.search_index = normalizar_texto(" ".join([p for p in partes if p]))
+            tocados.add("search_index")
+        return tocados
+
+    @classmethod
+    def generar_codigos(cls, n, excluir=()):
+        """
+        `n` códigos nuevos y únicos con una query por ronda (no una por código).
+        `excluir`: códigos ya reservados en memoria que tampoco se pueden usar.
+        """
+        reservados = set(excluir)
+        nuevos = set()
+        while len(nuevos) < n:
+            candidatos = set()
+            while len(candidatos) < n - len(nuevos):
+                c = _generar_codigo()
+                if c not in reservados and c not in nuevos:
+                    candidatos.add(c)
+            candidatos = list(candidatos)
+            usados = set()
+            for i in range(0, len(candidatos), 900):  # límite de parámetros de SQLite
+                usados.update(cls.objects.filter(codigo__in=candidatos[i:i + 900])
+                              .values_list("codigo", flat=True))
+            nuevos.update(c for c in candidatos if c not in usados)
+        return list(nuevos)
+
+    @classmethod
+    def cambiar_estado(cls, qs, estado):
+        """
+        Pasa a `estado` las propiedades de `qs` que no lo tengan, con un UPDATE
+        (uno por cada 900 ids, límite de parámetros de SQLite) que también
+        avanza `actualizado` para el feed de cambios y los sitemaps, y mueve
+        los contadores de EstadisticaPanel. Devuelve los ids afectados.
+        """
+        with transaction.atomic():
+            filas = list(qs.exclude(estado=estado).select_for_update()
+                         .order_by().values_list("pk", "estado"))
+            ids = [pk for pk, _ in filas]
+            ahora = timezone.now()
+            for i in range(0, len(ids), 900):
+                cls.objects.filter(pk__in=ids[i:i + 900]).update(estado=estado, actualizado=ahora)
+            # update() no pasa por los signals de EstadisticaPanel
+            deltas = EstadisticaPanel.deltas([{"estado": anterior} for _, anterior in filas], -1)
+            deltas[("estado", estado)] += len(filas)
+            EstadisticaPanel.aplicar(deltas)
+        if ids:
+            # Después del commit: si no, un request podría volver a cachear lo viejo
+            transaction.on_commit(lambda: propiedades_actualizadas.send(
+                sender=cls, ids=ids, campos=["estado", "actualizado"]))
+        return ids
 
     # ----------------- Presentación -----------------
     @property
@@ -159,6 +480,7 @@ class Propiedad(models.Model):
 class PropiedadImagen(models.Model):
     propiedad = models.ForeignKey(Propiedad, on_delete=models.CASCADE, related_name='imagenes')
     imagen = models.ImageField(upload_to='propiedades/galeria/', validators=[validar_imagen])
+    placeholder = models.TextField(editable=False, blank=True)
 
     def clean(self):
         if not self.propiedad_id:
@@ -167,8 +489,7 @@ class PropiedadImagen(models.Model):
             raise ValidationError("Solo se permiten hasta 10 imágenes secundarias por propiedad.")
 
     def save(self, *args, **kwargs):
-        if self.imagen and hasattr(self.imagen, 'file'):
-            self.imagen = _to_webp(self.imagen)
+        _almacenar_imagen(self, 'imagen', 'placeholder')
         super().save(*args, **kwargs)
 
     def miniatura_admin(self):
@@ -180,3 +501,137 @@ class PropiedadImagen(models.Model):
 
     def __str__(self):
         return f"Imagen de {self.propiedad.codigo}"
+
+
+class PropiedadBaja(models.Model):
+    """Tombstone de una propiedad borrada, para el feed de cambios."""
+    propiedad_id = models.BigIntegerField()
+    codigo = models.CharField(max_length=8)
+    eliminada = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["eliminada", "id"])]
+
+    def __str__(self):
+        return f"{self.codigo} (baja {self.eliminada:%Y-%m-%d})"
+
+
+class EstadisticaPanel(models.Model):
+    """
+    Cantidad de propiedades por estado, tipo, operación y localidad, para el
+    home del panel. Se mantiene con deltas (signals.py, cambiar_estado, seed)
+    en vez de un GROUP BY por visita; reconciliar() la recalcula entera y
+    corrige lo que se haya desviado (comando reconciliar_estadisticas).
+    """
+    DIMENSIONES = ("estado", "tipo", "tipo_operacion", "localidad")
+
+    dimension = models.CharField(max_length=20)
+    valor = models.CharField(max_length=120)
+    cantidad = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["dimension", "valor"], name="estadistica_dimension_valor"),
+        ]
+
+    def __str__(self):
+        return f"{self.dimension}={self.valor}: {self.cantidad}"
+
+    @classmethod
+    def deltas(cls, filas, signo=1):
+        """
+        Counter {(dimensión, valor): n} que suma `signo` por cada fila
+        (instancia o dict; en un dict solo cuentan las dimensiones que trae).
+        """
+        deltas = Counter()
+        for fila in filas:
+            if isinstance(fila, dict):
+                valores = fila.items()
+            else:
+                valores = ((d, getattr(fila, d)) for d in cls.DIMENSIONES)
+            for dimension, valor in valores:
+                deltas[(dimension, valor)] += signo
+        return deltas
+
+    @classmethod
+    def aplicar(cls, deltas):
+        """
+        Suma `deltas` con un UPDATE ... SET cantidad = cantidad + n por fila
+        tocada, siempre en el mismo orden: dos transacciones que tocan las
+        mismas filas se esperan en vez de trabarse (deadlock).
+        """
+        deltas = {k: n for k, n in sorted(deltas.items()) if n}
+        if not deltas:
+            return
+        with transaction.atomic():
+            faltan = [
+                (dimension, valor) for (dimension, valor), n in deltas.items()
+                if not cls.objects.filter(dimension=dimension, valor=valor)
+                                  .update(cantidad=F("cantidad") + n)
+            ]
+            if faltan:
+                # Primera propiedad con ese valor (o carrera con otro proceso)
+                cls.objects.bulk_create([cls(dimension=d, valor=v) for d, v in faltan], ignore_conflicts=True)
+                for dimension, valor in faltan:
+                    cls.objects.filter(dimension=dimension, valor=valor).update(
+                        cantidad=F("cantidad") + deltas[(dimension, valor)])
+
+    @classmethod
+    def contar(cls):
+        """Los valores reales: un GROUP BY por dimensión."""
+        reales = {}
+        for dimension in cls.DIMENSIONES:
+            for valor, n in (Propiedad.objects.order_by().values_list(dimension)
+                             .annotate(n=Count("pk")).values_list(dimension, "n")):
+                reales[(dimension, valor)] = n
+        return reales
+
+    @classmethod
+    def reconciliar(cls, dry_run=False):
+        """
+        Recalcula todo y corrige las filas desviadas; las que quedan en cero se
+        borran. Devuelve {(dimensión, valor): (guardado, real)} de lo corregido.
+        """
+        with transaction.atomic():
+            # Lock primero: los deltas que lleguen mientras tanto esperan
+            guardadas = {(e.dimension, e.valor): e for e in cls.objects.select_for_update()}
+            reales = cls.contar()
+            diferencias = {}
+            for clave in guardadas.keys() | reales.keys():
+                antes = guardadas[clave].cantidad if clave in guardadas else 0
+                if antes != reales.get(clave, 0) or (clave in guardadas and not antes):
+                    diferencias[clave] = (antes, reales.get(clave, 0))
+            if dry_run or not diferencias:
+                return diferencias
+
+            actualizar, crear, borrar = [], [], []
+            for clave, (_, real) in diferencias.items():
+                if not real:
+                    borrar.append(guardadas[clave].pk)
+                elif clave in guardadas:
+                    guardadas[clave].cantidad = real
+                    actualizar.append(guardadas[clave])
+                else:
+                    crear.append(cls(dimension=clave[0], valor=clave[1], cantidad=real))
+            cls.objects.filter(pk__in=borrar).delete()
+            cls.objects.bulk_update(actualizar, ["cantidad"], batch_size=500)
+            # select_for_update no bloquea filas que todavía no existen: si un
+            # aplicar() la insertó recién, se pisa con el valor real
+            cls.objects.bulk_create(crear, batch_size=500, update_conflicts=True,
+                                    unique_fields=["dimension", "valor"], update_fields=["cantidad"])
+        return diferencias
+
+    @classmethod
+    def resumen(cls, localidades=10):
+        """
+        {dimensión: [(valor, cantidad), ...]} de mayor a menor, con una sola
+        query; de localidad solo las `localidades` con más propiedades.
+        """
+        resumen = {d: [] for d in cls.DIMENSIONES}
+        for dimension, valor, cantidad in (cls.objects.filter(cantidad__gt=0)
+                                           .order_by("-cantidad", "valor")
+                                           .values_list("dimension", "valor", "cantidad")):
+            if dimension in resumen:
+                resumen[dimension].append((valor, cantidad))
+        resumen["localidad"] = resumen["localidad"][:localidades]
+        return resumen
@@ -0,0 +1,269 @@
+# propiedades/prueba_carga.py
+"""
+Prueba de carga sin servicios externos (ver management/commands/loadtest.py).
+
+- Un cliente HTTP/1.1 mínimo sobre asyncio (keep-alive, Content-Length y
+  chunked): cada "usuario virtual" mantiene su conexión y pide URLs según un
+  escenario con pesos.
+- Se mide latencia por request y se agrupa por patrón de URL (home, listado,
+  buscar, detalle, panel) para reportar throughput, percentiles y errores.
+"""
+import asyncio
+import math
+import random
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Callable
+from urllib.parse import urlencode, urlsplit
+
+from django.urls import reverse
+
+from .models import Propiedad
+
+TIMEOUT = 30
+
+
+# ----------------- Escenario -----------------
+@dataclass
+class Paso:
+    nombre: str
+    peso: int
+    generar: Callable[[], str]  # path con querystring
+    cookie: str = ""
+
+
+def escenario_publico(muestras=200):
+    """
+    Pesos aproximados al tráfico real: mucho detalle y listado, algo de
+    búsqueda y home. Los códigos/localidades salen de la base.
+    """
+    codigos = list(Propiedad.objects.filter(estado="activa")
+                   .order_by("?").values_list("codigo", flat=True)[:muestras])
+    localidades = list(Propiedad.objects.filter(estado="activa")
+                       .values_list("localidad", flat=True).distinct()[:50]) or ["Quilmes"]
+    tipos = [k for k, _ in Propiedad.TIPO_PROPIEDAD_CHOICES]
+
+    def listado():
+        params = random.choice([
+            {}, {"page": random.randint(1, 5)},
+            {"tipo": random.choice(tipos)},
+            {"localidad": random.choice(localidades), "operacion": "venta"},
+        ])
+        return reverse("propiedades_listado") + ("?" + urlencode(params) if params else "")
+
+    def buscar():
+        return reverse("buscar_propiedades") + "?" + urlencode({"q": random.choice(localidades)})
+
+    pasos = [
+        Paso("home", 15, lambda: reverse("home")),
+        Paso("listado", 30, listado),
+        Paso("buscar", 20, buscar),
+    ]
+    if codigos:
+        pasos.append(Paso("detalle", 35, lambda: reverse("propiedad_detalle", args=[random.choice(codigos)])))
+    return pasos
+
+
+def escenario_panel(cookie):
+    """Listado del panel con y sin búsqueda, con la sesión de un usuario staff."""
+    def listado():
+        params = random.choice([{}, {"page": 2}, {"q": "casa"}])
+        return reverse("panel_propiedades_list") + ("?" + urlencode(params) if params else "")
+
+    return [
+        Paso("panel_home", 5, lambda: reverse("panel_home"), cookie),
+        Paso("panel_listado", 10, listado, cookie),
+    ]
+
+
+def cookie_de_sesion(usuario):
+    """Crea una sesión autenticada para `usuario` y devuelve el header Cookie."""
+    from django.conf import settings
+    from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+    from importlib import import_module
+
+    store = import_module(settings.SESSION_ENGINE).SessionStore()
+    store[SESSION_KEY] = str(usuario.pk)
+    store[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    store[HASH_SESSION_KEY] = usuario.get_session_auth_hash()
+    store.create()
+    return f"{settings.SESSION_COOKIE_NAME}={store.session_key}"
+
+
+# ----------------- Cliente HTTP -----------------
+class ErrorHTTP(Exception):
+    pass
+
+
+class Conexion:
+    """Una conexión keep-alive. Se reabre sola si el servidor la cierra."""
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def _abrir(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def cerrar(self):
+        if self.writer:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = self.writer = None
+
+    async def get(self, path, cookie=""):
+        """Devuelve (status, bytes del body)."""
+        for intento in (1, 2):
+            if self.writer is None:
+                await self._abrir()
+            pedido = [f"GET {path} HTTP/1.1", f"Host: {self.host}:{self.port}",
+                      "Accept-Encoding: identity", "User-Agent: loadtest/1.0"]
+            if cookie:
+                pedido.append(f"Cookie: {cookie}")
+            try:
+                self.writer.write(("\r\n".join(pedido) + "\r\n\r\n").encode("latin-1"))
+                await self.writer.drain()
+                return await self._leer_respuesta()
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # keep-alive vencido del lado del servidor: un reintento
+                await self.cerrar()
+                if intento == 2:
+                    raise
+
+    async def _leer_respuesta(self):
+        linea = await self.reader.readuntil(b"\r\n")
+        partes = linea.split(None, 2)
+        if len(partes) < 2 or not partes[0].startswith(b"HTTP/"):
+            raise ErrorHTTP(f"respuesta inválida: {linea[:80]!r}")
+        status = int(partes[1])
+        headers = {}
+        while True:
+            linea = await self.reader.readuntil(b"\r\n")
+            if linea == b"\r\n":
+                break
+            k, _, v = linea.decode("latin-1").partition(":")
+            headers[k.strip().lower()] = v.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            body = bytearray()
+            while True:
+                tam = int((await self.reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                if tam == 0:
+                    await self.reader.readuntil(b"\r\n")
+                    break
+                body += await self.reader.readexactly(tam)
+                await self.reader.readexactly(2)
+        elif "content-length" in headers:
+            body = await self.reader.readexactly(int(headers["content-length"]))
+        elif status in (204, 304) or status < 200:
+            body = b""
+        else:
+            body = await self.reader.read()
+            headers["connection"] = "close"
+
+        if headers.get("connection", "").lower() == "close":
+            await self.cerrar()
+        return status, body
+
+
+# ----------------- Corrida -----------------
+@dataclass
+class Estadistica:
+    latencias: list = field(default_factory=list)
+    errores: int = 0
+    bytes: int = 0
+    status: dict = field(default_factory=lambda: defaultdict(int))
+
+
+def percentil(valores, p):
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not valores:
+        return 0.0
+    k = math.ceil(p / 100 * len(valores)) - 1
+    return valores[max(0, min(len(valores) - 1, k))]
+
+
+async def correr(base_url, pasos, *, concurrencia=10, duracion=None, total=None, warmup=0.0):
+    """
+    Ejecuta el escenario con `concurrencia` usuarios virtuales hasta cumplir
+    `duracion` segundos o `total` requests. Devuelve (stats por paso, segundos).
+    """
+    url = urlsplit(base_url)
+    host, port = url.hostname, url.port or 80
+    prefijo = url.path.rstrip("/")
+    nombres = [p.nombre for p in pasos]
+    pesos = [p.peso for p in pasos]
+    por_nombre = {p.nombre: p for p in pasos}
+    stats = defaultdict(Estadistica)
+    restantes = [total] if total else None
+    inicio = time.perf_counter()
+    fin_warmup = inicio + warmup
+    limite = fin_warmup + duracion if duracion else None
+
+    async def usuario():
+        con = Conexion(host, port)
+        try:
+            while True:
+                ahora = time.perf_counter()
+                if limite and ahora >= limite:
+                    return
+                if restantes is not None:
+                    if restantes[0] <= 0:
+                        return
+                    restantes[0] -= 1
+                paso = por_nombre[random.choices(nombres, weights=pesos)[0]]
+                t0 = time.perf_counter()
+                try:
+                    status, body = await asyncio.wait_for(con.get(prefijo + paso.generar(), paso.cookie), TIMEOUT)
+                    error = status >= 400
+                except Exception:
+                    await con.cerrar()
+                    status, body, error = 0, b"", True
+                t1 = time.perf_counter()
+                if t0 < fin_warmup:
+                    continue
+                st = stats[paso.nombre]
+                st.latencias.append(t1 - t0)
+                st.status[status] += 1
+                st.bytes += len(body)
+                st.errores += error
+        finally:
+            await con.cerrar()
+
+    await asyncio.gather(*(usuario() for _ in range(concurrencia)))
+    return dict(stats), max(time.perf_counter() - fin_warmup, 1e-9)
+
+
+def resumen(stats, segundos):
+    """Filas del reporte (una por patrón + TOTAL), con latencias en ms."""
+    filas = []
+    todas, errores = [], 0
+    for nombre in sorted(stats):
+        st = stats[nombre]
+        lat = sorted(st.latencias)
+        todas += lat
+        errores += st.errores
+        filas.append(_fila(nombre, lat, st.errores, segundos, dict(st.status)))
+    todas.sort()
+    filas.append(_fila("TOTAL", todas, errores, segundos, {}))
+    return filas
+
+
+def _fila(nombre, lat, errores, segundos, status):
+    n = len(lat)
+    return {
+        "patron": nombre,
+        "requests": n,
+        "rps": n / segundos if segundos else 0.0,
+        "errores": errores,
+        "error_pct": 100 * errores / n if n else 0.0,
+        "p50_ms": percentil(lat, 50) * 1000,
+        "p90_ms": percentil(lat, 90) * 1000,
+        "p99_ms": percentil(lat, 99) * 1000,
+        "max_ms": (lat[-1] if lat else 0) * 1000,
+        "status": status,
+    }
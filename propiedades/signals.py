@@ -0,0 +1,76 @@
+# propiedades/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from django_inmobiliaria.cache import invalidar_grupo
+from .models import (
+    EstadisticaPanel, ImagenBlob, Propiedad, PropiedadBaja, PropiedadImagen, propiedades_actualizadas,
+)
+
+
+@receiver(post_delete, sender=Propiedad)
+def liberar_portada(sender, instance, **kwargs):
+    nombre = instance.imagen_principal.name
+    transaction.on_commit(lambda: ImagenBlob.liberar(nombre))
+
+
+@receiver(post_delete, sender=Propiedad)
+def registrar_baja(sender, instance, **kwargs):
+    PropiedadBaja.objects.create(propiedad_id=instance.pk, codigo=instance.codigo)
+
+
+@receiver(post_delete, sender=PropiedadImagen)
+def liberar_imagen_galeria(sender, instance, **kwargs):
+    nombre = instance.imagen.name
+    transaction.on_commit(lambda: ImagenBlob.liberar(nombre))
+
+
+@receiver(post_save, sender=Propiedad)
+@receiver(post_delete, sender=Propiedad)
+@receiver(propiedades_actualizadas, sender=Propiedad)
+def invalidar_calculos(sender, **kwargs):
+    # Home, facetas y sitemaps (ver cached_compute en views.py). Ya y de nuevo
+    # al commit: un recálculo en el medio podría haber visto lo anterior.
+    invalidar_grupo("propiedades")
+    transaction.on_commit(lambda: invalidar_grupo("propiedades"))
+
+
+# ----------------- EstadisticaPanel -----------------
+@receiver(pre_save, sender=Propiedad)
+def recordar_dimensiones(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Valores de las dimensiones en la base antes del save (None si es alta)."""
+    dimensiones = EstadisticaPanel.DIMENSIONES
+    if raw or (update_fields is not None and set(update_fields).isdisjoint(dimensiones)):
+        instance._dimensiones_antes = False  # no cambia ninguna
+        return
+    originales = getattr(instance, "_originales", {})
+    if instance._state.adding and instance.pk is None:
+        antes = None
+    elif not instance._state.adding and all(d in originales for d in dimensiones):
+        antes = {d: originales[d] for d in dimensiones}  # sin query (ver Propiedad.from_db)
+    else:
+        antes = Propiedad.objects.filter(pk=instance.pk).values(*dimensiones).first()
+    instance._dimensiones_antes = antes
+
+
+@receiver(post_save, sender=Propiedad)
+def contar_guardado(sender, instance, raw=False, update_fields=None, **kwargs):
+    antes = instance.__dict__.pop("_dimensiones_antes", False)
+    if raw or antes is False:
+        return
+    despues = {
+        d: getattr(instance, d) if antes is None or update_fields is None or d in update_fields else antes[d]
+        for d in EstadisticaPanel.DIMENSIONES
+    }
+    deltas = EstadisticaPanel.deltas([despues])
+    if antes:
+        deltas.subtract(EstadisticaPanel.deltas([antes]))
+    EstadisticaPanel.aplicar(deltas)
+
+
+@receiver(post_delete, sender=Propiedad)
+def contar_baja(sender, instance, **kwargs):
+    originales = getattr(instance, "_originales", {})
+    fila = {d: originales.get(d, getattr(instance, d)) for d in EstadisticaPanel.DIMENSIONES}
+    EstadisticaPanel.aplicar(EstadisticaPanel.deltas([fila], -1))
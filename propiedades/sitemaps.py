@@ -1,35 +1,57 @@
 # propiedades/sitemaps.py
+"""
+Sitemaps pre-generados.
+
+En vez de armar el XML en cada crawl, se escriben archivos .xml.gz en
+settings.SITEMAP_DIR (un índice + sub-sitemaps de hasta
+SITEMAP_URLS_POR_ARCHIVO URLs) y solo se regeneran cuando cambia la firma de
+los avisos activos (cantidad + último `actualizado`). Las vistas sirven esos
+archivos con Last-Modified / 304.
+
+Las URLs salen de settings.SITE_URL, nunca del Host del request: la carpeta
+es una sola, y con el Host un request a otro dominio (o con un Host
+inventado) reescribía los sitemaps de todos.
+"""
+import gzip
+import json
+import os
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from django.conf import settings
 from django.contrib.sitemaps import Sitemap
+from django.db.models import Count, Max
 from django.urls import reverse
-from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
 from .models import Propiedad
 
+URLS_POR_ARCHIVO = 10_000  # el protocolo admite hasta 50.000 por archivo
+ESTADO = "estado.json"
+INDICE = "sitemap.xml.gz"
+
+
 class PropiedadSitemap(Sitemap):
     changefreq = "daily"
     priority = 0.8
     protocol = "https" if not settings.DEBUG else "http"
-    # Django pagina por defecto en 50 items; con 40 te entran todas en /sitemap.xml
-    # (Si algún día tenés miles, Django sirve /sitemap.xml?p=2, etc.)
-    limit = 1000
 
     def items(self):
-        # Si tenés un flag tipo `publicada`, podrías usar:
-        # return Propiedad.objects.filter(publicada=True).order_by("-id")[:5000]
-        return Propiedad.objects.all().order_by("-id")[:5000]
-
-    def lastmod(self, obj):
-        for attr in ("updated_at", "modified", "fecha_publicacion", "created_at"):
-            val = getattr(obj, attr, None)
-            if val:
-                return val
-        return None
+        # Solo lo que hace falta para <loc> y <lastmod>; nada de filas completas
+        return (
+            Propiedad.objects.filter(estado="activa")
+            .order_by("id")
+            .values_list("codigo", "actualizado")
+        )
+
+    def lastmod(self, item):
+        return item[1]
 
-    def location(self, obj):
-        if hasattr(obj, "get_absolute_url"):
-            return obj.get_absolute_url()
-        if hasattr(obj, "codigo"):
-            return reverse("propiedad_detalle", args=[obj.codigo])
-        return reverse("propiedad_detalle", args=[obj.pk])
+    def location(self, item):
+        return reverse("propiedad_detalle", args=[item[0]])
 
 
 class StaticViewSitemap(Sitemap):
@@ -42,3 +64,136 @@ class StaticViewSitemap(Sitemap):
 
     def location(self, name):
         return reverse(name)
+
+
+# ----------------- Generación -----------------
+def directorio():
+    return Path(getattr(settings, "SITEMAP_DIR", Path(settings.BASE_DIR) / "var" / "sitemaps"))
+
+
+def base_url():
+    return settings.SITE_URL.rstrip("/") + "/"
+
+
+def urls_por_archivo():
+    return getattr(settings, "SITEMAP_URLS_POR_ARCHIVO", URLS_POR_ARCHIVO)
+
+
+def firma(base_url):
+    """Cambia si se agrega, borra, pausa o edita un aviso activo."""
+    agg = Propiedad.objects.filter(estado="activa").aggregate(n=Count("id"), ultimo=Max("actualizado"))
+    ultimo = agg["ultimo"].isoformat() if agg["ultimo"] else ""
+    return f"{base_url}|{agg['n']}|{ultimo}|{urls_por_archivo()}"
+
+
+def _url_xml(loc, lastmod=None, changefreq=None, priority=None):
+    partes = [f"<url><loc>{escape(loc)}</loc>"]
+    if lastmod:
+        partes.append(f"<lastmod>{lastmod.isoformat(timespec='seconds')}</lastmod>")
+    if changefreq:
+        partes.append(f"<changefreq>{changefreq}</changefreq>")
+    if priority is not None:
+        partes.append(f"<priority>{priority}</priority>")
+    partes.append("</url>\n")
+    return "".join(partes)
+
+
+class _ArchivoGzip:
+    """Un sub-sitemap (o el índice) escrito en streaming a un .xml.gz."""
+
+    def __init__(self, carpeta, nombre, raiz):
+        self.nombre = nombre
+        self.raiz = raiz
+        self.fh = gzip.open(Path(carpeta) / nombre, "wt", encoding="utf-8", compresslevel=6)
+        self.fh.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        self.fh.write(f'<{raiz} xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+        self.n = 0
+        self.lastmod = None
+
+    def escribir(self, texto, lastmod=None):
+        self.fh.write(texto)
+        self.n += 1
+        if lastmod and (self.lastmod is None or lastmod > self.lastmod):
+            self.lastmod = lastmod
+
+    def cerrar(self):
+        self.fh.write(f"</{self.raiz}>\n")
+        self.fh.close()
+
+
+def _escribir(carpeta, base_url):
+    base = base_url.rstrip("/")
+    archivos = []
+
+    est = StaticViewSitemap()
+    static = _ArchivoGzip(carpeta, "static.xml.gz", "urlset")
+    for item in est.items():
+        static.escribir(_url_xml(base + est.location(item), None, est.changefreq, est.priority))
+    static.cerrar()
+    archivos.append(static)
+
+    prop = PropiedadSitemap()
+    limite = urls_por_archivo()
+    actual = None
+    for item in prop.items().iterator(chunk_size=2000):
+        if actual is None or actual.n >= limite:
+            if actual:
+                actual.cerrar()
+            actual = _ArchivoGzip(carpeta, f"propiedades-{len(archivos)}.xml.gz", "urlset")
+            archivos.append(actual)
+        lastmod = prop.lastmod(item)
+        actual.escribir(_url_xml(base + prop.location(item), lastmod, prop.changefreq, prop.priority), lastmod)
+    if actual:
+        actual.cerrar()
+
+    indice = _ArchivoGzip(carpeta, INDICE, "sitemapindex")
+    for a in archivos:
+        loc = base + reverse("sitemap_seccion", args=[a.nombre[:-len(".xml.gz")]])
+        lastmod = f"<lastmod>{a.lastmod.isoformat(timespec='seconds')}</lastmod>" if a.lastmod else ""
+        indice.escribir(f"<sitemap><loc>{escape(loc)}</loc>{lastmod}</sitemap>\n")
+    indice.cerrar()
+    return [a.nombre for a in archivos] + [INDICE]
+
+
+def leer_estado():
+    try:
+        with open(directorio() / ESTADO, encoding="utf-8") as fh:
+            estado = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    estado["generado"] = parse_datetime(estado["generado"])
+    return estado
+
+
+def generar_sitemaps(url=None, forzar=False):
+    """
+    Regenera los archivos si cambió la firma (o si `forzar`). Devuelve el
+    estado: {"firma", "generado", "archivos"}. `url` reemplaza a SITE_URL.
+    """
+    url = url or base_url()
+    carpeta = directorio()
+    actual = firma(url)
+    estado = leer_estado()
+    if not forzar and estado and estado["firma"] == actual:
+        return estado
+
+    carpeta.mkdir(parents=True, exist_ok=True)
+    # Se escribe todo en un directorio temporal y se reemplaza archivo por
+    # archivo (os.replace es atómico): quien esté leyendo nunca ve uno a medias.
+    with tempfile.TemporaryDirectory(dir=carpeta) as tmp:
+        nombres = _escribir(tmp, url)
+        for nombre in nombres:
+            os.replace(Path(tmp) / nombre, carpeta / nombre)
+        generado = timezone.now().replace(microsecond=0)
+        if estado and estado["generado"] >= generado:
+            # Last-Modified tiene resolución de segundos: tiene que avanzar
+            generado = estado["generado"] + timedelta(seconds=1)
+        with open(Path(tmp) / ESTADO, "w", encoding="utf-8") as fh:
+            json.dump({"firma": actual, "generado": generado.isoformat(), "archivos": nombres}, fh)
+        os.replace(Path(tmp) / ESTADO, carpeta / ESTADO)
+
+    # Sub-sitemaps que sobraron de una generación con más avisos
+    for viejo in carpeta.glob("propiedades-*.xml.gz"):
+        if viejo.name not in nombres:
+            viejo.unlink(missing_ok=True)
+    return {"firma": actual, "generado": generado, "archivos": nombres}
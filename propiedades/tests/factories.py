@@ -0,0 +1,11 @@
+from propiedades.models import Propiedad
+
+
+def crear_propiedad(titulo="Casa", **extra):
+    """Propiedad activa válida con lo mínimo; `extra` pisa cualquier campo."""
+    datos = dict(
+        titulo=titulo, descripcion="d", precio_usd=1000, tipo="casa", tipo_operacion="venta",
+        direccion="Mitre 1", localidad="Quilmes", provincia="Buenos Aires",
+    )
+    datos.update(extra)
+    return Propiedad.objects.create(**datos)
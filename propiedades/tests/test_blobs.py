@@ -0,0 +1,160 @@
+import io
+import shutil
+import tempfile
+import threading
+from unittest import mock
+
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from accounts.forms import PropiedadImagenFormSet
+from django_inmobiliaria.storages_s3 import guardar_lote
+from propiedades import imagenes
+from propiedades.models import ImagenBlob, Propiedad, PropiedadImagen
+from propiedades.tests.factories import crear_propiedad
+
+MEDIA_TMP = tempfile.mkdtemp()
+
+
+def imagen_jpg(nombre="foto.jpg", color=(200, 30, 30)):
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 48), color).save(buf, format="JPEG")
+    return SimpleUploadedFile(nombre, buf.getvalue(), content_type="image/jpeg")
+
+
+@override_settings(
+    MEDIA_ROOT=MEDIA_TMP,
+    STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    },
+)
+class ImagenBlobTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_TMP, ignore_errors=True)
+
+    def test_mismo_contenido_se_guarda_una_vez(self):
+        p1 = crear_propiedad(imagen_principal=imagen_jpg("a.jpg"))
+        p2 = crear_propiedad(imagen_principal=imagen_jpg("otro_nombre.jpg"))
+
+        self.assertEqual(p1.imagen_principal.name, p2.imagen_principal.name)
+        self.assertTrue(p1.imagen_principal.name.startswith("blobs/"))
+        self.assertTrue(p1.imagen_principal.name.endswith(".webp"))
+        blob = ImagenBlob.objects.get()
+        self.assertEqual(blob.referencias, 2)
+        # el placeholder se calcula una vez por blob y se copia a cada fila
+        self.assertTrue(blob.placeholder.startswith("data:image/webp;base64,"))
+        self.assertEqual(p2.imagen_placeholder, blob.placeholder)
+
+    def test_guardar_sin_upload_nuevo_no_suma_referencias(self):
+        p = crear_propiedad(imagen_principal=imagen_jpg())
+        p = Propiedad.objects.get(pk=p.pk)
+        p.titulo = "Otro título"
+        p.save()
+        self.assertEqual(ImagenBlob.objects.get().referencias, 1)
+
+    def test_borrar_ultima_referencia_elimina_archivo(self):
+        p = crear_propiedad(imagen_principal=imagen_jpg())
+        img = PropiedadImagen.objects.create(propiedad=p, imagen=imagen_jpg("g.jpg"))
+        nombre = img.imagen.name
+        self.assertEqual(ImagenBlob.objects.get(nombre=nombre).referencias, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            img.delete()
+        self.assertEqual(ImagenBlob.objects.get(nombre=nombre).referencias, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            p.delete()
+        self.assertFalse(ImagenBlob.objects.exists())
+        self.assertFalse(default_storage.exists(nombre))
+
+    def test_readquirido_antes_de_purgar_conserva_el_archivo(self):
+        p = crear_propiedad(imagen_principal=imagen_jpg())
+        nombre = p.imagen_principal.name
+        with self.captureOnCommitCallbacks() as callbacks:
+            ImagenBlob.liberar(nombre)
+        self.assertEqual(ImagenBlob.objects.get(nombre=nombre).referencias, 0)
+        # Otro proceso sube el mismo contenido antes de que corra la purga
+        self.assertEqual(ImagenBlob.adquirir(imagen_jpg()).nombre, nombre)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(ImagenBlob.objects.get(nombre=nombre).referencias, 1)
+        self.assertTrue(default_storage.exists(nombre))
+
+    def test_reemplazar_portada_libera_la_anterior(self):
+        p = crear_propiedad(imagen_principal=imagen_jpg())
+        anterior = p.imagen_principal.name
+        with self.captureOnCommitCallbacks(execute=True):
+            p.imagen_principal = imagen_jpg("nueva.jpg", color=(10, 200, 10))
+            p.save()
+        self.assertNotEqual(p.imagen_principal.name, anterior)
+        self.assertFalse(ImagenBlob.objects.filter(nombre=anterior).exists())
+
+    def test_lote_convierte_en_threads_una_vez_por_contenido(self):
+        existente = crear_propiedad(imagen_principal=imagen_jpg("ya.jpg", color=(1, 2, 3)))
+        threads = []
+
+        def procesar(archivo, **kw):
+            threads.append(threading.get_ident())
+            return imagenes.procesar(archivo, **kw)
+
+        archivos = [
+            imagen_jpg("a.jpg"), imagen_jpg("b.jpg", color=(0, 0, 200)),
+            imagen_jpg("a-otra-vez.jpg"), imagen_jpg("ya-otra-vez.jpg", color=(1, 2, 3)),
+        ]
+        with mock.patch("propiedades.models.procesar", side_effect=procesar):
+            blobs = ImagenBlob.adquirir_lote(archivos)
+
+        self.assertEqual(len(threads), 2)  # a y b; el de la portada ya existía
+        self.assertNotIn(threading.get_ident(), threads)
+        self.assertEqual(blobs[0], blobs[2])
+        self.assertEqual(blobs[3].nombre, existente.imagen_principal.name)
+        self.assertEqual(ImagenBlob.objects.get(pk=blobs[0].pk).referencias, 2)
+        self.assertEqual(ImagenBlob.objects.get(pk=blobs[1].pk).referencias, 1)
+        self.assertEqual(ImagenBlob.objects.get(pk=blobs[3].pk).referencias, 2)
+        self.assertTrue(default_storage.exists(blobs[1].nombre))
+
+    def test_lote_sube_con_guardar_lote(self):
+        archivos = [imagen_jpg("a.jpg"), imagen_jpg("b.jpg", color=(0, 0, 200))]
+        with mock.patch("propiedades.models.guardar_lote", wraps=guardar_lote) as subir:
+            blobs = ImagenBlob.adquirir_lote(archivos)
+
+        subir.assert_called_once()
+        self.assertEqual([nombre for nombre, _ in subir.call_args.args[1]], [b.nombre for b in blobs])
+        self.assertTrue(all(default_storage.exists(b.nombre) for b in blobs))
+
+    def test_fila_guarda_el_nombre_que_devuelve_save(self):
+        def con_sufijo(storage, name, max_length=None):
+            return name.replace(".webp", "_x1.webp")
+
+        with mock.patch.object(FileSystemStorage, "get_available_name", con_sufijo):
+            blob = ImagenBlob.adquirir(imagen_jpg("a.jpg", color=(9, 9, 9)))
+        self.assertTrue(blob.nombre.endswith("_x1.webp"))
+        self.assertTrue(default_storage.exists(blob.nombre))
+
+    def test_formset_de_galeria_adquiere_en_lote(self):
+        p = crear_propiedad()
+        datos = {
+            "imagenes-TOTAL_FORMS": "3", "imagenes-INITIAL_FORMS": "0",
+            "imagenes-MIN_NUM_FORMS": "0", "imagenes-MAX_NUM_FORMS": "20",
+        }
+        archivos = {
+            "imagenes-0-imagen": imagen_jpg("a.jpg"),
+            "imagenes-1-imagen": imagen_jpg("b.jpg", color=(0, 0, 200)),
+        }
+        formset = PropiedadImagenFormSet(datos, archivos, instance=p)
+        self.assertTrue(formset.is_valid(), formset.errors)
+        with mock.patch.object(ImagenBlob, "adquirir_lote", wraps=ImagenBlob.adquirir_lote) as lote, \
+                mock.patch.object(ImagenBlob, "adquirir", wraps=ImagenBlob.adquirir) as uno:
+            formset.save()
+
+        self.assertEqual(len(lote.call_args.args[0]), 2)
+        uno.assert_not_called()
+        galeria = list(p.imagenes.order_by("pk"))
+        self.assertEqual(len(galeria), 2)
+        self.assertTrue(all(i.imagen.name.startswith("blobs/") and i.placeholder for i in galeria))
+        self.assertEqual(sorted(ImagenBlob.objects.values_list("referencias", flat=True)), [1, 1])
@@ -0,0 +1,38 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from django_inmobiliaria.cache import cached_compute
+from propiedades.tests.factories import crear_propiedad
+
+
+@override_settings(STORAGES={
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+})
+class LocalidadesDisponiblesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        crear_propiedad("Casa en Quilmes")
+        crear_propiedad("Depto en Bernal", tipo="departamento", localidad="Bernal")
+
+    def claves(self, *consultas):
+        with mock.patch("propiedades.views.cached_compute", wraps=cached_compute) as calculo:
+            for consulta in consultas:
+                self.assertEqual(self.client.get(reverse("buscar_propiedades") + consulta).status_code, 200)
+        return {c.args[0] for c in calculo.call_args_list if c.args[0].startswith("buscar:localidades:")}
+
+    def test_clave_solo_de_los_filtros_normalizados(self):
+        claves = self.claves(
+            "?tipo=casa&q=Quilmes",
+            "?q=quilmes&tipo=casa&utm_source=x&page=3",
+            "?tipo=casa&q=++QUILMES+&localidad=Bernal&fbclid=abc",
+        )
+        self.assertEqual(len(claves), 1)
+        self.assertEqual(len(self.claves("?tipo=castillo", "?tipo=yurta", "?tipo=casa")), 2)
+
+    def test_localidades_respetan_los_filtros(self):
+        r = self.client.get(reverse("buscar_propiedades") + "?tipo=departamento&localidad=Quilmes")
+        self.assertEqual(r.context["localidades"], ["Bernal"])
@@ -0,0 +1,147 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from django_inmobiliaria.cache import SECUENCIA, DosNivelesCache
+
+try:
+    import fakeredis  # requirements-dev.txt
+except ImportError:
+    fakeredis = None
+
+REDIS_URL = os.environ.get("CACHE_TEST_REDIS_URL")  # p.ej. un Valkey/Redis local en un contenedor
+
+
+def _redis_disponible():
+    try:
+        import redis  # noqa: F401
+    except ImportError:
+        return False
+    return bool(REDIS_URL)
+
+
+class DosNivelesMixin:
+    """Dos instancias con L1 propia y la misma L2 = dos workers."""
+
+    def l2(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.conf_l2 = self.l2()
+        self.a, self.b = self.crear("a"), self.crear("b")
+        self.a.clear()
+
+    def crear(self, nombre, chequeo=0):
+        return DosNivelesCache(f"{self.id()}-{nombre}", {
+            "TIMEOUT": 60, "OPTIONS": {"L2": self.conf_l2, "L1_TIMEOUT": 30, "L1_CHEQUEO": chequeo},
+        })
+
+    def test_escritura_se_ve_en_el_otro_worker(self):
+        self.a.set("k", 1)
+        self.assertEqual(self.b.get("k"), 1)  # ahora también en la L1 de b
+        self.a.set("k", 2)
+        self.assertEqual(self.b.get("k"), 2)
+        self.a.delete("k")
+        self.assertIsNone(self.b.get("k"))
+
+    def test_incr_y_get_many(self):
+        self.a.set_many({"x": 1, "y": 2})
+        self.assertEqual(self.b.get_many(["x", "y", "z"]), {"x": 1, "y": 2})
+        self.assertEqual(self.a.incr("x", 10), 11)
+        self.assertEqual(self.b.get_many(["x", "y"]), {"x": 11, "y": 2})
+
+    def test_hit_de_l1_no_va_a_l2(self):
+        self.a.set("k", "v")
+        self.a.get("k")
+        with mock.patch.object(self.a.l2, "get", wraps=self.a.l2.get) as get_l2:
+            for _ in range(5):
+                self.assertEqual(self.a.get("k"), "v")
+        # solo la lectura del contador (L1_CHEQUEO=0 lo relee siempre)
+        self.assertTrue(all(c.args[0] == SECUENCIA for c in get_l2.call_args_list))
+
+    def test_escribir_una_clave_no_vacia_la_l1_de_los_demas(self):
+        self.a.set("k", 1)
+        self.assertEqual(self.b.get("k"), 1)
+        self.a.set("otra", 2)
+        self.a.incr("otra")
+        with mock.patch.object(self.b.l2, "get", wraps=self.b.l2.get) as get_l2:
+            self.assertEqual(self.b.get("k"), 1)
+        self.assertNotIn("k", [c.args[0] for c in get_l2.call_args_list])
+
+    def test_invalidacion_acotada_por_l1_chequeo(self):
+        b = self.crear("b-lento", chequeo=3600)
+        self.a.set("k", 1)
+        self.assertEqual(b.get("k"), 1)
+        self.a.set("k", 2)
+        self.assertEqual(b.get("k"), 1)  # todavía no releyó el registro
+        b._proximo_chequeo = 0
+        self.assertEqual(b.get("k"), 2)
+
+    def test_registro_vencido_vacia_la_l1(self):
+        self.a.set("k", 1)
+        self.assertEqual(self.b.get("k"), 1)
+        self.a.set("k", 2)
+        self.a.l2.delete_many([f"__l1_cambio__:{n}" for n in range(self.a.l2.get(SECUENCIA) + 1)])
+        self.assertEqual(self.b.get("k"), 2)
+
+    def test_clear_vacia_todas_las_l1(self):
+        self.a.set("k", 1)
+        self.assertEqual(self.b.get("k"), 1)
+        self.a.clear()
+        self.assertIsNone(self.b.get("k"))
+
+    def test_add_no_invalida(self):
+        self.a.set("k", 1)
+        self.b.get("k")
+        secuencia = self.a.l2.get(SECUENCIA)
+        self.assertTrue(self.a.add("nueva", 1))
+        self.assertFalse(self.a.add("nueva", 2))
+        self.assertEqual(self.a.l2.get(SECUENCIA), secuencia)
+
+
+@override_settings(CACHES={
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "l2": {"BACKEND": "django_inmobiliaria.cache.DatabaseCacheAtomica", "LOCATION": "test_cache_l2"},
+})
+class DosNivelesDBTests(DosNivelesMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command("createcachetable", verbosity=0)
+
+    def l2(self):
+        return {"BACKEND": "django_inmobiliaria.cache.DatabaseCacheAtomica", "LOCATION": "test_cache_l2"}
+
+
+@unittest.skipUnless(fakeredis, "pip install -r requirements-dev.txt")
+class DosNivelesFakeRedisTests(DosNivelesMixin, SimpleTestCase):
+    def l2(self):
+        return {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": "redis://fake",
+            # Todos los pools hablan con el mismo server en memoria
+            "OPTIONS": {"connection_class": fakeredis.FakeConnection, "server": fakeredis.FakeServer()},
+        }
+
+
+@unittest.skipUnless(_redis_disponible(), "definí CACHE_TEST_REDIS_URL (y pip install redis)")
+class DosNivelesRedisTests(DosNivelesMixin, SimpleTestCase):
+    # Ojo: clear() vacía la base entera de CACHE_TEST_REDIS_URL
+    def l2(self):
+        return {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": REDIS_URL}
+
+
+class DosNivelesConfigTests(SimpleTestCase):
+    def test_l2_sin_incr_atomico_no_se_acepta(self):
+        carpeta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, carpeta, True)
+        with self.assertRaises(ImproperlyConfigured):
+            DosNivelesCache("x", {"OPTIONS": {"L2": {
+                "BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": carpeta,
+            }}})
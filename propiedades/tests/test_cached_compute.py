@@ -0,0 +1,158 @@
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+try:
+    import fakeredis  # requirements-dev.txt
+    import lupa  # noqa: F401  (fakeredis lo necesita para EVAL)
+except ImportError:
+    fakeredis = None
+
+from django_inmobiliaria.cache import _candado, _soltar_candado, _tomar_candado, cached_compute, invalidar_grupo
+
+
+class CachedComputeTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.llamadas = 0
+
+    def calcular(self, valor="nuevo"):
+        def fn():
+            self.llamadas += 1
+            return valor
+        return fn
+
+    def test_miss_calcula_una_vez_y_despues_es_hit(self):
+        self.assertEqual(cached_compute("k", self.calcular(), 60), "nuevo")
+        self.assertEqual(cached_compute("k", self.calcular("otro"), 60), "nuevo")
+        self.assertEqual(self.llamadas, 1)
+        self.assertIsNone(cache.get(_candado("k")))
+
+    def test_vencido_con_candado_ajeno_sirve_lo_viejo(self):
+        cache.set("k", ("viejo", 0, 0), 600)  # (valor, fresco_hasta, generación): ya vencido
+        cache.add(_candado("k"), 1)  # otro proceso recalculando
+        self.assertEqual(cached_compute("k", self.calcular(), 60, stale_ttl=600), "viejo")
+        self.assertEqual(self.llamadas, 0)
+
+    def test_vencido_sin_candado_recalcula(self):
+        cache.set("k", ("viejo", 0, 0), 600)
+        self.assertEqual(cached_compute("k", self.calcular(), 60, stale_ttl=600), "nuevo")
+        self.assertEqual(self.llamadas, 1)
+
+    def test_invalidar_grupo_recalcula(self):
+        cached_compute("k", self.calcular("viejo"), 60, grupo="g")
+        invalidar_grupo("g")
+        self.assertEqual(cached_compute("k", self.calcular(), 60, grupo="g"), "nuevo")
+        self.assertEqual(cached_compute("k", self.calcular("otro"), 60, grupo="g"), "nuevo")
+        self.assertEqual(self.llamadas, 2)
+
+    def test_invalidado_con_candado_ajeno_sirve_lo_viejo(self):
+        cached_compute("k", self.calcular("viejo"), 60, grupo="g")
+        invalidar_grupo("g")
+        cache.add(_candado("k"), 1)
+        self.assertEqual(cached_compute("k", self.calcular(), 60, grupo="g"), "viejo")
+
+    def test_si_falla_el_recalculo_sirve_lo_viejo(self):
+        cached_compute("k", self.calcular("viejo"), 60, grupo="g")
+        invalidar_grupo("g")
+
+        def falla():
+            raise RuntimeError("base caída")
+
+        with self.assertLogs("django_inmobiliaria.cache", "ERROR"):
+            self.assertEqual(cached_compute("k", falla, 60, grupo="g"), "viejo")
+        self.assertIsNone(cache.get(_candado("k")))
+        with self.assertRaises(RuntimeError):
+            cached_compute("sin-nada", falla, 60)
+
+    def test_sin_valor_y_candado_ajeno_espera_y_despues_calcula(self):
+        cache.add(_candado("k"), 1)
+        with mock.patch("django_inmobiliaria.cache.time.sleep"):
+            self.assertEqual(cached_compute("k", self.calcular(), 60, espera=0), "nuevo")
+        self.assertEqual(self.llamadas, 1)
+
+    def test_no_borra_el_candado_de_otro_worker(self):
+        def lento():
+            cache.set(_candado("k"), "otro-worker")  # el nuestro venció y lo tomó otro
+            return "nuevo"
+
+        self.assertEqual(cached_compute("k", lento, 60, candado_ttl=1), "nuevo")
+        self.assertEqual(cache.get(_candado("k")), "otro-worker")
+
+
+class CandadoArchivoTests(SimpleTestCase):
+    def setUp(self):
+        carpeta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, carpeta, True)
+        ajustes = override_settings(CACHES={"default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": carpeta,
+        }})
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def test_flock_exclusivo_aunque_add_no_sea_atomico(self):
+        candado = _tomar_candado("k", 60)
+        self.assertEqual(candado[0], "archivo")
+        self.assertIsNone(_tomar_candado("k", 60))  # otro fd = otro worker
+
+        cache.set("k", ("viejo", 0, 0), 600)
+        self.assertEqual(cached_compute("k", lambda: "nuevo", 60, stale_ttl=600), "viejo")
+
+        _soltar_candado("k", candado)
+        self.assertEqual(cached_compute("k", lambda: "nuevo", 60, stale_ttl=600), "nuevo")
+        cache.clear()  # no toca los archivos de candado
+        candado = _tomar_candado("k", 60)
+        self.assertIsNotNone(candado)
+        _soltar_candado("k", candado)
+
+
+class CandadoCompararYBorrarMixin:
+    def test_suelta_solo_su_candado(self):
+        candado = _tomar_candado("k", 60)
+        self.assertEqual(candado[0], "cache")
+        cache.set(_candado("k"), "otro-worker")  # el nuestro venció y lo tomó otro
+        _soltar_candado("k", candado)
+        self.assertEqual(cache.get(_candado("k")), "otro-worker")
+
+        cache.delete(_candado("k"))
+        candado = _tomar_candado("k", 60)
+        with mock.patch.object(type(caches["default"]), "get") as get:
+            _soltar_candado("k", candado)
+        get.assert_not_called()  # sin la ventana de get() + delete()
+        self.assertIsNone(cache.get(_candado("k")))
+
+
+@override_settings(CACHES={"default": {
+    "BACKEND": "django_inmobiliaria.cache.DatabaseCacheAtomica", "LOCATION": "test_cache_candados",
+}})
+class CandadoBaseTests(CandadoCompararYBorrarMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command("createcachetable", verbosity=0)
+
+    def test_un_solo_delete_condicional(self):
+        candado = _tomar_candado("k", 60)
+        with CaptureQueriesContext(connection) as ctx:
+            _soltar_candado("k", candado)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertTrue(ctx.captured_queries[0]["sql"].startswith("DELETE"))
+
+
+@unittest.skipUnless(fakeredis, "pip install -r requirements-dev.txt")
+class CandadoRedisTests(CandadoCompararYBorrarMixin, SimpleTestCase):
+    def setUp(self):
+        ajustes = override_settings(CACHES={"default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": "redis://fake",
+            "OPTIONS": {"connection_class": fakeredis.FakeConnection, "server": fakeredis.FakeServer()},
+        }})
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
@@ -0,0 +1,56 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from propiedades.models import Propiedad
+from propiedades.tests.factories import crear_propiedad
+
+
+@override_settings(FEED_CAMBIOS_MARGEN_SEGUNDOS=0)
+class FeedCambiosTests(TestCase):
+    url = reverse("feed_cambios")
+
+    def _pagina(self, **params):
+        r = self.client.get(self.url, params)
+        self.assertEqual(r.status_code, 200)
+        return r.json()
+
+    def test_cursor_recorre_sin_repetir_ni_saltear(self):
+        props = [crear_propiedad(f"Casa {i}") for i in range(5)]
+        # mismo `actualizado` en todas: el desempate por id evita perder filas
+        Propiedad.objects.update(actualizado=timezone.now() - timedelta(minutes=1))
+
+        vistos, params = [], {"desde": "2000-01-01T00:00:00Z", "limite": 2}
+        while True:
+            data = self._pagina(**params)
+            vistos += [c["codigo"] for c in data["cambios"]]
+            params = {"cursor": data["cursor"], "limite": 2}
+            if not data["hay_mas"]:
+                break
+        self.assertEqual(vistos, [p.codigo for p in props])
+
+        # sin cambios nuevos: página vacía con el mismo punto de partida
+        self.assertEqual(self._pagina(**params)["cambios"], [])
+
+    def test_tombstones_de_finalizadas_y_borradas(self):
+        activa, finalizada, borrada = crear_propiedad("A"), crear_propiedad("B"), crear_propiedad("C")
+        cursor = self._pagina(desde="2000-01-01T00:00:00Z")["cursor"]
+
+        finalizada.estado = "finalizada"
+        finalizada.save()
+        codigo_borrada = borrada.codigo
+        borrada.delete()
+
+        data = self._pagina(cursor=cursor)
+        self.assertEqual(data["cambios"], [])
+        self.assertEqual(
+            {(b["codigo"], b["motivo"]) for b in data["bajas"]},
+            {(finalizada.codigo, "finalizada"), (codigo_borrada, "eliminada")},
+        )
+        self.assertNotIn(activa.codigo, [b["codigo"] for b in data["bajas"]])
+
+    def test_cursor_adulterado(self):
+        r = self.client.get(self.url, {"cursor": "x:y"})
+        self.assertEqual(r.status_code, 400)
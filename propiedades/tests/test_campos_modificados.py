@@ -0,0 +1,65 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from propiedades.models import Propiedad
+from propiedades.tests.factories import crear_propiedad
+
+
+def update_sql(ctx):
+    return [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("UPDATE")]
+
+
+class CamposModificadosTests(TestCase):
+    def setUp(self):
+        self.p = Propiedad.objects.get(pk=crear_propiedad().pk)
+
+    def test_solo_se_guarda_lo_que_cambio(self):
+        antes = self.p.actualizado
+        self.p.precio_usd = 2000
+        with mock.patch("propiedades.models.normalizar_texto") as normalizar, \
+                CaptureQueriesContext(connection) as ctx:
+            self.p.save()
+        normalizar.assert_not_called()
+        [sql] = update_sql(ctx)
+        self.assertIn('"precio_usd"', sql)
+        self.assertIn('"actualizado"', sql)
+        self.assertNotIn('"search_index"', sql)
+        self.assertNotIn('"descripcion"', sql)
+        self.assertGreater(Propiedad.objects.get(pk=self.p.pk).actualizado, antes)
+
+    def test_cambio_de_texto_recalcula_sus_derivados(self):
+        self.p.localidad = "  bernal "
+        self.p.save()
+        self.assertEqual(self.p.campos_modificados(), set())
+        guardada = Propiedad.objects.get(pk=self.p.pk)
+        self.assertEqual((guardada.localidad, guardada.localidad_norm), ("Bernal", "bernal"))
+        self.assertIn("bernal", guardada.search_index)
+        self.assertEqual(guardada.provincia_norm, "buenos aires")
+
+    def test_update_fields_explicito_suma_los_derivados(self):
+        Propiedad.objects.filter(pk=self.p.pk).update(precio_usd=5)
+        self.p.titulo = "Chalet"
+        self.p.precio_usd = 9
+        self.p.save(update_fields=["titulo"])
+        guardada = Propiedad.objects.get(pk=self.p.pk)
+        self.assertIn("chalet", guardada.search_index)
+        self.assertEqual(guardada.precio_usd, 5)  # no estaba en update_fields
+        self.assertEqual(self.p.campos_modificados(), {"precio_usd"})
+
+    def test_sin_cambios_solo_avanza_actualizado(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.p.save()
+        [sql] = update_sql(ctx)
+        self.assertIn('SET "actualizado"', sql)
+        self.assertNotIn(",", sql.split("WHERE")[0])
+
+    def test_instancia_armada_a_mano_guarda_todo(self):
+        copia = Propiedad(pk=self.p.pk, codigo=self.p.codigo, titulo="Otra", descripcion="d",
+                          tipo="casa", tipo_operacion="venta", direccion="x", localidad="wilde",
+                          provincia="buenos aires", creado=self.p.creado)
+        self.assertIsNone(copia.campos_modificados())
+        copia.save()
+        self.assertEqual(Propiedad.objects.get(pk=self.p.pk).localidad_norm, "wilde")
@@ -0,0 +1,130 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from propiedades.models import EstadisticaPanel, Propiedad
+from propiedades.tests.factories import crear_propiedad
+
+
+def guardadas():
+    return {(e.dimension, e.valor): e.cantidad for e in EstadisticaPanel.objects.filter(cantidad__gt=0)}
+
+
+class EstadisticaPanelTests(TestCase):
+    def assertAlDia(self):
+        self.assertEqual(guardadas(), EstadisticaPanel.contar())
+
+    def test_altas_ediciones_y_bajas_por_delta(self):
+        a = crear_propiedad()
+        b = crear_propiedad(tipo="ph", localidad="bernal")
+        self.assertEqual(guardadas()[("tipo", "casa")], 1)
+        self.assertEqual(guardadas()[("localidad", "Bernal")], 1)
+
+        a = Propiedad.objects.get(pk=a.pk)
+        a.localidad = "Bernal"
+        a.estado = "pausada"
+        a.save()
+        self.assertAlDia()
+        self.assertEqual(guardadas()[("localidad", "Bernal")], 2)
+        self.assertNotIn(("localidad", "Quilmes"), guardadas())
+
+        b.delete()
+        Propiedad.objects.filter(pk=a.pk).delete()
+        self.assertAlDia()
+        self.assertEqual(guardadas(), {})
+
+    def test_edicion_sin_dimensiones_no_toca_contadores(self):
+        p = Propiedad.objects.get(pk=crear_propiedad().pk)
+        p.precio_usd = 5
+        with CaptureQueriesContext(connection) as ctx:
+            p.save()
+        self.assertFalse([q for q in ctx.captured_queries if "estadisticapanel" in q["sql"]])
+
+    def test_update_fields_parcial_no_cuenta_lo_que_no_se_guarda(self):
+        p = Propiedad.objects.get(pk=crear_propiedad().pk)
+        p.tipo = "ph"
+        p.estado = "pausada"
+        p.save(update_fields=["estado"])
+        self.assertAlDia()
+        self.assertEqual(guardadas()[("tipo", "casa")], 1)
+
+    def test_instancia_armada_a_mano(self):
+        p = crear_propiedad()
+        Propiedad(pk=p.pk, codigo=p.codigo, titulo="x", descripcion="d", tipo="local",
+                  tipo_operacion="alquiler", direccion="x", localidad="Wilde",
+                  provincia="Buenos Aires", creado=p.creado).save()
+        self.assertAlDia()
+
+    def test_cambio_de_estado_masivo(self):
+        for _ in range(3):
+            crear_propiedad()
+        crear_propiedad(estado="pausada")
+        Propiedad.cambiar_estado(Propiedad.objects.all(), "finalizada")
+        self.assertAlDia()
+        self.assertEqual(guardadas()[("estado", "finalizada")], 4)
+
+    def test_reconciliar_corrige_desvios(self):
+        crear_propiedad()
+        EstadisticaPanel.objects.filter(dimension="tipo").update(cantidad=7)
+        EstadisticaPanel.objects.create(dimension="localidad", valor="Fantasma", cantidad=2)
+        Propiedad.objects.filter(tipo="casa").update(tipo_operacion="alquiler")  # sin signals
+
+        salida = StringIO()
+        call_command("reconciliar_estadisticas", "--dry-run", stdout=salida)
+        self.assertIn("4 contadores desviados", salida.getvalue())
+        self.assertEqual(guardadas()[("tipo", "casa")], 7)
+
+        call_command("reconciliar_estadisticas", stdout=StringIO())
+        self.assertAlDia()
+        self.assertFalse(EstadisticaPanel.objects.filter(valor__in=["Fantasma", "venta"]).exists())
+        self.assertEqual(EstadisticaPanel.reconciliar(), {})
+
+    def test_aplicar_toca_las_filas_en_orden(self):
+        crear_propiedad()
+        deltas = {("tipo", "casa"): 1, ("estado", "activa"): 1, ("localidad", "Quilmes"): 1}
+        with CaptureQueriesContext(connection) as ctx:
+            EstadisticaPanel.aplicar(deltas)
+        tocadas = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("UPDATE")]
+        orden = [next(v for _, v in sorted(deltas) if f"'{v}'" in sql) for sql in tocadas]
+        self.assertEqual(orden, ["activa", "Quilmes", "casa"])
+
+    def test_reconciliar_con_fila_insertada_mientras_cuenta(self):
+        crear_propiedad()
+        EstadisticaPanel.objects.filter(dimension="localidad").delete()
+        contar = EstadisticaPanel.contar
+
+        def contar_y_competir():
+            reales = contar()
+            # Otro proceso inserta la fila que reconciliar() va a crear
+            EstadisticaPanel.objects.create(dimension="localidad", valor="Quilmes", cantidad=1)
+            return reales
+
+        with mock.patch.object(EstadisticaPanel, "contar", side_effect=contar_y_competir):
+            EstadisticaPanel.reconciliar()
+        self.assertAlDia()
+
+
+@override_settings(STORAGES={
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+})
+class PanelHomeTests(TestCase):
+    def test_muestra_contadores_y_recientes(self):
+        crear_propiedad(titulo="Casa en Bernal", localidad="Bernal")
+        crear_propiedad(estado="pausada")
+        staff = get_user_model().objects.create_user(username="s", dni="1", password="x", is_staff=True)
+        self.client.force_login(staff)
+
+        r = self.client.get(reverse("panel_home"))
+        self.assertEqual(r.status_code, 200)
+        estados = {s["titulo"]: s["filas"] for s in r.context["secciones"]}["Por estado"]
+        self.assertEqual({f["etiqueta"]: f["cantidad"] for f in estados}, {"Activa": 1, "Pausada": 1})
+        self.assertEqual(r.context["total"], 2)
+        self.assertContains(r, "Casa en Bernal")
+        self.assertContains(r, "?estado=pausada")
@@ -0,0 +1,77 @@
+import gzip
+import json
+import shutil
+import tempfile
+from io import StringIO
+from pathlib import Path
+from xml.etree import ElementTree
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from propiedades.models import Propiedad
+from propiedades.tests.factories import crear_propiedad
+
+
+class FeedsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.casa = crear_propiedad("Casa <grande> & linda", descripcion="Pegado de Word:\x0b\x02 fin\ttab\nlínea")
+        cls.depto = crear_propiedad("Depto", tipo="departamento", precio_usd=None)
+        cls.pausada = crear_propiedad("Pausada", estado="pausada")
+
+    def _contenido(self, nombre):
+        r = self.client.get(reverse(nombre))
+        self.assertEqual(r.status_code, 200)
+        return b"".join(r.streaming_content).decode("utf-8")
+
+    def test_xml_bien_formado_solo_activas(self):
+        raiz = ElementTree.fromstring(self._contenido("feed_propiedades_xml"))
+        avisos = {p.get("codigo"): p for p in raiz.iter("propiedad")}
+        self.assertEqual(set(avisos), {self.casa.codigo, self.depto.codigo})
+
+        casa = avisos[self.casa.codigo]
+        self.assertEqual(casa.findtext("titulo"), "Casa <grande> & linda")
+        # los caracteres de control inválidos en XML se descartan; tab y salto de línea no
+        self.assertEqual(casa.findtext("descripcion"), "Pegado de Word: fin\ttab\nlínea")
+        self.assertTrue(casa.findtext("url").endswith(reverse("propiedad_detalle", args=[self.casa.codigo])))
+        self.assertEqual(avisos[self.depto.codigo].findtext("precio_usd"), "")
+
+    def test_json_solo_activas(self):
+        datos = json.loads(self._contenido("feed_propiedades_json"))
+        avisos = {p["codigo"]: p for p in datos["propiedades"]}
+        self.assertEqual(set(avisos), {self.casa.codigo, self.depto.codigo})
+        self.assertEqual(avisos[self.casa.codigo]["descripcion"], "Pegado de Word:\x0b\x02 fin\ttab\nlínea")
+        self.assertIsNone(avisos[self.depto.codigo]["precio_usd"])
+
+    def test_json_vacio(self):
+        Propiedad.objects.update(estado="finalizada")
+        self.assertEqual(json.loads(self._contenido("feed_propiedades_json")), {"propiedades": []})
+
+
+class ExportFeedTests(TestCase):
+    def setUp(self):
+        self.carpeta = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.carpeta, ignore_errors=True)
+        self.casa = crear_propiedad("Casa", descripcion="a\x01b")
+
+    def _exportar(self, formato):
+        destino = self.carpeta / "sub" / f"feed.{formato}.gz"
+        salida = StringIO()
+        call_command("export_feed", "--formato", formato, "--base-url", "https://ejemplo.com",
+                     "--salida", str(destino), stdout=salida)
+        self.assertIn(str(destino), salida.getvalue())
+        with gzip.open(destino, "rt", encoding="utf-8") as fh:
+            return fh.read()
+
+    def test_xml_gzip(self):
+        raiz = ElementTree.fromstring(self._exportar("xml"))
+        propiedad = raiz.find("propiedad")
+        self.assertEqual(propiedad.get("codigo"), self.casa.codigo)
+        self.assertEqual(propiedad.findtext("descripcion"), "ab")
+        self.assertTrue(propiedad.findtext("url").startswith("https://ejemplo.com/"))
+
+    def test_json_gzip(self):
+        datos = json.loads(self._exportar("json"))
+        self.assertEqual([p["codigo"] for p in datos["propiedades"]], [self.casa.codigo])
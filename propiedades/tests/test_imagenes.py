@@ -0,0 +1,104 @@
+import io
+import multiprocessing
+import os
+import tempfile
+import unittest
+
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase
+from PIL import Image
+
+from propiedades.imagenes import ImagenDemasiadoGrande, convertir_a_webp
+from propiedades.validators import validar_imagen
+
+MB = 1024 * 1024
+PROC_STATUS = "/proc/self/status"
+PROC_CLEAR_REFS = "/proc/self/clear_refs"
+
+
+def _resetear_pico():
+    # "5" reinicia VmHWM (pico de RSS) del proceso actual
+    with open(PROC_CLEAR_REFS, "w") as fh:
+        fh.write("5")
+
+
+def _rss_pico():
+    with open(PROC_STATUS) as fh:
+        for linea in fh:
+            if linea.startswith("VmHWM:"):
+                return int(linea.split()[1]) * 1024
+    raise RuntimeError("VmHWM no disponible")
+
+
+def _medir_en_proceso(ruta, modo):
+    """Corre en un proceso nuevo: devuelve cuánto creció el pico de RSS."""
+    chica = io.BytesIO()
+    Image.new("RGB", (32, 32)).save(chica, format="JPEG")
+    chica.name = "warmup.jpg"
+    convertir_a_webp(chica, lado=16, limite=10_000)  # carga plugins/codecs
+
+    _resetear_pico()
+    antes = _rss_pico()
+    with open(ruta, "rb") as fh:
+        if modo == "acotado":
+            convertir_a_webp(fh, lado=1280, limite=50_000_000).close()
+        else:  # lo que hacía _to_webp antes: decode completo
+            Image.open(fh).convert("RGB")
+    return _rss_pico() - antes
+
+
+@unittest.skipUnless(os.path.exists(PROC_CLEAR_REFS), "requiere /proc/self/clear_refs (Linux)")
+class MemoriaConversionTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # 6000x4000 (24 MP): ~72 MB de píxeles RGB si se decodifica completa
+        grad = Image.linear_gradient("L").resize((6000, 4000))
+        img = Image.merge("RGB", (grad, grad.transpose(Image.Transpose.FLIP_LEFT_RIGHT), grad))
+        fd, cls.ruta = tempfile.mkstemp(suffix=".jpg")
+        with os.fdopen(fd, "wb") as fh:
+            img.save(fh, format="JPEG", quality=90)
+
+    @classmethod
+    def tearDownClass(cls):
+        os.unlink(cls.ruta)
+        super().tearDownClass()
+
+    def _medir(self, modo):
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(1) as pool:
+            return pool.apply(_medir_en_proceso, (self.ruta, modo))
+
+    def test_pico_de_memoria_acotado(self):
+        acotado = self._medir("acotado")
+        completo = self._medir("completo")
+        self.assertLess(acotado, 32 * MB, f"pico {acotado / MB:.1f} MB")
+        # sanity check: el camino ingenuo sí se pasa del límite
+        self.assertGreater(completo, 64 * MB, f"pico {completo / MB:.1f} MB")
+
+
+class LimitePixelesTests(SimpleTestCase):
+    def _png(self, w, h):
+        buf = io.BytesIO()
+        Image.new("1", (w, h)).save(buf, format="PNG")  # comprime a casi nada
+        return SimpleUploadedFile("bomba.png", buf.getvalue(), content_type="image/png")
+
+    def test_validador_rechaza_por_pixeles_antes_de_decodificar(self):
+        archivo = self._png(8000, 8000)
+        self.assertLess(archivo.size, MB)
+        with self.assertRaises(ValidationError):
+            validar_imagen(archivo)
+
+    def test_conversion_rechaza_por_pixeles(self):
+        with self.assertRaises(ImagenDemasiadoGrande):
+            convertir_a_webp(self._png(5000, 5000), limite=1_000_000)
+
+    def test_salida_reducida_a_webp(self):
+        buf = io.BytesIO()
+        Image.new("RGB", (3000, 1500), (10, 120, 200)).save(buf, format="JPEG")
+        out = convertir_a_webp(SimpleUploadedFile("f.jpg", buf.getvalue()), lado=1000)
+        self.assertEqual(out.name, "f.webp")
+        with Image.open(out) as img:
+            self.assertEqual(img.format, "WEBP")
+            self.assertEqual(max(img.size), 1000)
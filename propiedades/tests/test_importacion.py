@@ -0,0 +1,118 @@
+import io
+import json
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from propiedades.importacion import Importador, _iter_json_array, descargar_imagen, leer_filas
+from propiedades.models import Propiedad
+
+CSV = """codigo,titulo,descripcion,precio_usd,tipo,tipo_operacion,habitaciones,cochera,direccion,localidad,provincia
+,Casa con parque,Linda casa,120000,casa,venta,3,si,Mitre 100,  quilmes ,buenos aires
+ABCD1234,Depto céntrico,Luminoso,85000,departamento,venta,2,,Rivadavia 200,Bernal,Buenos Aires
+,Sin precio,desc,,casa,venta,1,,Alsina 1,Wilde,Buenos Aires
+,Tipo raro,desc,1000,castillo,venta,1,,Alsina 2,Wilde,Buenos Aires
+"""
+
+
+class ImportadorTests(TestCase):
+    def _importar(self, texto, formato="csv", **kw):
+        imp = Importador(batch_size=kw.pop("batch_size", 2))
+        imp.procesar(leer_filas(io.StringIO(texto), formato), **kw)
+        return imp
+
+    def test_csv_valida_normaliza_e_inserta(self):
+        imp = self._importar(CSV)
+        self.assertEqual((imp.leidas, imp.guardadas, imp.invalidas), (4, 2, 2))
+
+        casa = Propiedad.objects.get(titulo="Casa con parque")
+        self.assertRegex(casa.codigo, r"^[A-Z]{4}\d{4}$")
+        self.assertEqual(casa.localidad, "Quilmes")
+        self.assertEqual(casa.localidad_norm, "quilmes")
+        self.assertTrue(casa.cochera)
+        self.assertIn("casa con parque", casa.search_index)
+        self.assertIsNotNone(casa.creado)
+
+    def test_upsert_por_codigo(self):
+        self._importar(CSV)
+        creado = Propiedad.objects.get(codigo="ABCD1234").creado
+        self._importar(
+            "codigo,titulo,descripcion,precio_usd,tipo,tipo_operacion,direccion,localidad,provincia,estado\n"
+            "abcd1234,Depto reciclado,Nuevo,90000,departamento,venta,Rivadavia 200,Bernal,Buenos Aires,pausada\n"
+        )
+        p = Propiedad.objects.get(codigo="ABCD1234")
+        self.assertEqual(p.titulo, "Depto reciclado")
+        self.assertEqual(p.estado, "pausada")
+        self.assertEqual(p.creado, creado)
+        self.assertEqual(Propiedad.objects.count(), 2)
+
+    def test_una_query_de_escritura_por_lote(self):
+        filas = [
+            {"titulo": f"Prop {i}", "descripcion": "d", "precio_pesos": "1000", "tipo": "ph",
+             "tipo_operacion": "alquiler", "direccion": f"Calle {i}", "localidad": "Lanús",
+             "provincia": "Buenos Aires"}
+            for i in range(10)
+        ]
+        texto = "\n".join(json.dumps(f) for f in filas)
+        # por lote: 1 SELECT de códigos + 1 INSERT ... ON CONFLICT
+        with self.assertNumQueries(2 * 2):
+            imp = self._importar(texto, "jsonl", batch_size=5)
+        self.assertEqual(imp.guardadas, 10)
+
+    def test_json_array_en_streaming(self):
+        datos = [{"n": i, "texto": "x" * 50} for i in range(20)]
+        fh = io.StringIO(json.dumps(datos, indent=2))
+        self.assertEqual(list(_iter_json_array(fh, chunk_size=16)), datos)
+
+    def _fila(self, **extra):
+        fila = {"titulo": "Casa", "descripcion": "d", "precio_usd": "1000", "tipo": "casa",
+                "tipo_operacion": "venta", "direccion": "Mitre 1", "localidad": "Quilmes",
+                "provincia": "Buenos Aires"}
+        fila.update(extra)
+        return json.dumps(fila)
+
+    def test_codigos_reservados_en_toda_la_corrida(self):
+        # El primer código generado es el que trae explícito una fila de un lote posterior
+        codigos = iter(["BBBB0002", "AAAA0001", "CCCC0003"])
+        filas = [self._fila(codigo="BBBB0002", titulo="Del feed"), self._fila(titulo="Sin código 1"),
+                 self._fila(codigo="AAAA0001", titulo="Choca"), self._fila(titulo="Sin código 2")]
+        with mock.patch("propiedades.models._generar_codigo", side_effect=lambda: next(codigos)):
+            imp = self._importar("\n".join(filas), "jsonl", batch_size=2, dry_run=True)
+        # BBBB0002 no se genera aunque con --dry-run no esté en la base
+        self.assertEqual(imp.codigos_generados, {"AAAA0001", "CCCC0003"})
+        self.assertEqual((imp.guardadas, imp.invalidas), (3, 1))
+
+    @override_settings(STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    })
+    def test_imagenes_de_a_lotes(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+
+        def descargar(url):
+            buf = io.BytesIO()
+            Image.new("RGB", (16, 16)).save(buf, format="JPEG")
+            return SimpleUploadedFile(url.rsplit("/", 1)[-1], buf.getvalue())
+
+        filas = [self._fila(codigo=f"IMGS000{i}", imagen_url=f"https://img.test/{i}.jpg") for i in range(3)]
+        imp = self._importar("\n".join(filas), "jsonl")
+        self.assertEqual(imp.con_imagenes, 3)
+        with self.settings(MEDIA_ROOT=media), \
+                mock.patch("propiedades.importacion.descargar_imagen", side_effect=descargar), \
+                mock.patch.object(imp, "_importar_lote_imagenes", wraps=imp._importar_lote_imagenes) as por_lote:
+            self.assertEqual(imp.importar_imagenes(workers=2, lote=2), 3)
+        self.assertEqual([len(c.args[0]) for c in por_lote.call_args_list], [2, 1])
+        self.assertFalse(Propiedad.objects.filter(codigo__startswith="IMGS", imagen_principal="").exists())
+
+    def test_descarga_solo_http_y_https(self):
+        for url in ("file:///etc/passwd", "ftp://img.test/a.jpg", "data:image/jpeg;base64,AAAA", "/tmp/a.jpg"):
+            with self.subTest(url=url), mock.patch("propiedades.importacion.urlopen") as abrir:
+                with self.assertRaises(ValidationError):
+                    descargar_imagen(url)
+                abrir.assert_not_called()
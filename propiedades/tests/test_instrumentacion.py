@@ -0,0 +1,102 @@
+import json
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import MiddlewareNotUsed
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from django_inmobiliaria import instrumentacion
+from django_inmobiliaria.middleware import InstrumentacionMiddleware
+from propiedades.models import Propiedad
+
+
+@override_settings(
+    INSTRUMENTACION_ENABLED=True,
+    INSTRUMENTACION_LOG_SAMPLE=1.0,
+    TEMPLATES=instrumentacion.envolver_templates(settings.TEMPLATES),
+    STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    },
+)
+class InstrumentacionMiddlewareTests(TestCase):
+    def setUp(self):
+        self.prop = Propiedad.objects.create(
+            titulo="Casa", descripcion="d", precio_usd=1000, tipo="casa", tipo_operacion="venta",
+            direccion="Mitre 1", localidad="Quilmes", provincia="Buenos Aires",
+        )
+        self.url = reverse("propiedad_detalle", args=[self.prop.codigo])
+
+    def test_server_timing_solo_para_staff(self):
+        self.assertNotIn("Server-Timing", self.client.get(self.url))
+
+        staff = get_user_model().objects.create_user(
+            username="staff", dni="12345678", password="Clave123*", is_staff=True,
+        )
+        self.client.force_login(staff)
+        r = self.client.get(self.url)
+        self.assertEqual(r.status_code, 200)
+        self.assertRegex(r["Server-Timing"], r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertIn("tpl;dur=", r["Server-Timing"])
+
+    def test_linea_json_muestreada(self):
+        with self.assertLogs("django_inmobiliaria.instrumentacion", "INFO") as logs:
+            self.client.get(self.url)
+        datos = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(datos["vista"], "propiedad_detalle")
+        self.assertEqual(datos["status"], 200)
+        self.assertGreater(datos["queries"], 0)
+        self.assertGreater(datos["tpl_ms"], 0)
+
+    def test_streaming_se_mide_al_terminar_el_cuerpo(self):
+        with self.assertLogs("django_inmobiliaria.instrumentacion", "INFO") as logs:
+            r = self.client.get(reverse("feed_propiedades_xml"))
+            self.assertEqual(logs.records, [])  # el cuerpo todavía no se generó
+            self.assertIn(self.prop.codigo.encode(), b"".join(r.streaming_content))
+            r.close()
+        self.assertEqual(len(logs.records), 1)
+        datos = json.loads(logs.records[0].getMessage())
+        self.assertEqual(datos["vista"], "feed_propiedades_xml")
+        self.assertGreater(datos["queries"], 0)  # las queries del iterator() cuentan
+
+    def test_streaming_cortado_sin_leer_igual_se_registra(self):
+        with self.assertLogs("django_inmobiliaria.instrumentacion", "INFO") as logs:
+            self.client.get(reverse("feed_propiedades_xml")).close()
+        self.assertEqual(len(logs.records), 1)
+
+
+class InstrumentacionTests(SimpleTestCase):
+    def test_desactivado_sale_de_la_cadena(self):
+        with self.settings(INSTRUMENTACION_ENABLED=False):
+            with self.assertRaises(MiddlewareNotUsed):
+                InstrumentacionMiddleware(lambda r: None)
+
+    def test_cuenta_hits_y_misses_de_cache(self):
+        conf = instrumentacion.envolver_caches({
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "instr"},
+        })["default"]
+        cache = instrumentacion.CacheInstrumentada("", conf)
+        self.assertIsInstance(cache, LocMemCache)
+        metricas, token = instrumentacion.iniciar()
+        try:
+            self.assertEqual(cache.get("instr-x", "def"), "def")
+            cache.set("instr-x", 1)
+            self.assertEqual(cache.get("instr-x"), 1)
+            cache.get_many(["instr-x", "instr-y"])
+        finally:
+            instrumentacion.terminar(token)
+            cache.delete("instr-x")
+        self.assertEqual((metricas.cache_hits, metricas.cache_misses), (2, 2))
+        # Sin parches globales: las demás instancias del backend no se tocan
+        self.assertEqual(LocMemCache.get.__module__, "django.core.cache.backends.locmem")
+
+    def test_conserva_el_tipo_del_backend(self):
+        conf = instrumentacion.envolver_caches({
+            "default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": "/tmp/x"},
+        })["default"]
+        cache = instrumentacion.CacheInstrumentada("", conf)
+        self.assertIsInstance(cache, FileBasedCache)
+        self.assertEqual(cache._dir, "/tmp/x")
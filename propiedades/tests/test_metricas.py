@@ -0,0 +1,102 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from django.test import TestCase, override_settings
+
+from django_inmobiliaria import metricas
+
+
+class MetricasTests(TestCase):
+    def setUp(self):
+        self.carpeta = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.carpeta, ignore_errors=True)
+        ajustes = override_settings(
+            METRICAS_ENABLED=True, METRICAS_DIR=self.carpeta, METRICAS_TOKEN="secreto",
+            METRICAS_FLUSH_SEGUNDOS=0,
+            STORAGES={
+                "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+                "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+            },
+        )
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        metricas.registro._reiniciar()
+        self.addCleanup(metricas.registro._reiniciar)
+
+    def _pid_muerto(self):
+        proceso = subprocess.Popen([sys.executable, "-c", "pass"])
+        proceso.wait()
+        return proceso.pid
+
+    def _archivo(self, nombre, requests):
+        (self.carpeta / nombre).write_text(json.dumps({
+            "c": [["inmo_http_requests_total", {"vista": "home", "metodo": "GET", "status": 200}, requests]],
+            "h": [],
+        }))
+
+    def _requests(self):
+        contadores, _ = metricas.agregar()
+        return contadores.get(("inmo_http_requests_total",
+                               (("metodo", "GET"), ("status", 200), ("vista", "home"))), 0)
+
+    def _metrics(self, **extra):
+        return self.client.get("/metrics", **extra)
+
+    def test_agrega_los_archivos_de_todos_los_workers(self):
+        self.client.get("/")
+        self.client.get("/")
+        # lo que dejó otro worker de gunicorn
+        (self.carpeta / "99999-otro.json").write_text(json.dumps({
+            "c": [["inmo_http_requests_total", {"vista": "home", "metodo": "GET", "status": 200}, 5]],
+            "h": [["inmo_http_request_duration_seconds", {"vista": "home"},
+                   [1] * len(metricas.BUCKETS_REQUEST) + [0.004, 1]]],
+        }))
+
+        r = self._metrics(HTTP_AUTHORIZATION="Bearer secreto")
+        self.assertEqual(r.status_code, 200)
+        texto = r.content.decode()
+        self.assertIn('inmo_http_requests_total{metodo="GET",status="200",vista="home"} 7', texto)
+        self.assertIn('inmo_http_request_duration_seconds_count{vista="home"} 3', texto)
+        self.assertIn('inmo_http_request_duration_seconds_bucket{vista="home",le="+Inf"} 3', texto)
+        self.assertRegex(texto, r'inmo_db_queries_total\{vista="home"\} [1-9]')
+        self.assertIn("# TYPE inmo_imagen_conversion_seconds histogram", texto)
+
+    def test_protegido(self):
+        self.assertEqual(self._metrics().status_code, 403)
+        self.assertEqual(self._metrics(HTTP_AUTHORIZATION="Bearer otro").status_code, 403)
+        with self.settings(ALLOWED_IPS="127.0.0.1"):
+            self.assertEqual(self._metrics().status_code, 200)
+        with self.settings(METRICAS_ENABLED=False):
+            self.assertEqual(self._metrics(HTTP_AUTHORIZATION="Bearer secreto").status_code, 404)
+
+    @unittest.skipUnless(metricas.fcntl, "la compactación usa fcntl")
+    def test_fusiona_y_borra_los_archivos_de_procesos_muertos(self):
+        muerto = self._pid_muerto()
+        self._archivo(f"{muerto}-aaaa.json", 5)
+        self._archivo(f"{muerto}-bbbb.json", 2)
+        self._archivo(f"{os.getppid()}-vivo.json", 1)
+
+        self.assertEqual(self._requests(), 8)
+        self.assertEqual(sorted(r.name for r in self.carpeta.glob("*.json")),
+                         sorted([metricas.ACUMULADO, f"{os.getppid()}-vivo.json"]))
+        # Los contadores no retroceden: lo fusionado se sigue sumando
+        self.assertEqual(self._requests(), 8)
+        self._archivo(f"{muerto}-cccc.json", 1)
+        self.assertEqual(self._requests(), 9)
+
+    @unittest.skipUnless(metricas.fcntl, "la compactación usa fcntl")
+    def test_compactacion_cortada_no_suma_dos_veces(self):
+        muerto = self._pid_muerto()
+        self._archivo(f"{muerto}-aaaa.json", 5)
+        (self.carpeta / metricas.ACUMULADO).write_text(json.dumps({
+            "c": [["inmo_http_requests_total", {"vista": "home", "metodo": "GET", "status": 200}, 5]],
+            "h": [], "fusionados": [f"{muerto}-aaaa.json"],
+        }))
+        self.assertEqual(self._requests(), 5)
+        self.assertFalse((self.carpeta / f"{muerto}-aaaa.json").exists())
@@ -0,0 +1,118 @@
+"""
+Presupuesto de queries y de bytes por vista.
+
+Cada vista pública y del panel se renderiza contra un dataset sembrado y no
+puede pasarse de su máximo de queries ni de bytes. Si se pasa, el error lista
+las huellas SQL (literales reemplazados por ?) ordenadas por repeticiones:
+un N+1 aparece arriba de todo con "×N".
+
+Las vistas del panel se miden con la sesión ya usada una vez: grupos y
+permisos se resuelven en el primer request y quedan en la sesión
+(accounts/autorizacion.py), que es el caso de todos los demás. La cache se
+vacía antes de medir: los cálculos de cached_compute cuentan como en frío.
+"""
+import re
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from propiedades.models import Propiedad, PropiedadImagen
+
+LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+NUMERO_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+LISTA_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+SAVEPOINT_RE = re.compile(r'"s\d+_x\d+"')
+ESPACIOS_RE = re.compile(r"\s+")
+
+
+def huella(sql):
+    sql = SAVEPOINT_RE.sub('"s?"', sql)
+    sql = LITERAL_RE.sub("?", sql)
+    sql = NUMERO_RE.sub("?", sql)
+    sql = LISTA_RE.sub("(?...)", sql)
+    return ESPACIOS_RE.sub(" ", sql).strip()
+
+
+def describir(queries):
+    cuenta = Counter(huella(q["sql"]) for q in queries)
+    return "\n".join(f"  ×{n} {sql[:300]}" for sql, n in cuenta.most_common())
+
+
+# nombre, url (callable con el dataset), requiere login, máx. queries, máx. KB
+PRESUPUESTOS = [
+    ("home", lambda d: reverse("home"), False, 1, 20),
+    ("listado", lambda d: reverse("propiedades_listado"), False, 2, 28),
+    ("listado_filtrado", lambda d: reverse("propiedades_listado") + "?tipo=casa&localidad=Quilmes&page=2", False, 2, 16),
+    ("buscar", lambda d: reverse("buscar_propiedades") + "?q=quilmes", False, 3, 34),
+    ("detalle", lambda d: reverse("propiedad_detalle", args=[d["con_galeria"]]), False, 2, 20),
+    ("detalle_sin_galeria", lambda d: reverse("propiedad_detalle", args=[d["sin_galeria"]]), False, 2, 16),
+    ("nosotros", lambda d: reverse("nosotros"), False, 0, 15),
+    ("panel_home", lambda d: reverse("panel_home"), True, 4, 6),
+    ("panel_listado", lambda d: reverse("panel_propiedades_list"), True, 4, 16),
+    ("panel_buscar", lambda d: reverse("panel_propiedades_list") + "?q=casa&estado=activa", True, 4, 16),
+    ("panel_crear", lambda d: reverse("panel_propiedad_crear"), True, 4, 17),
+    ("panel_editar", lambda d: reverse("panel_propiedad_editar", args=[d["pk"]]), True, 6, 21),
+]
+
+
+@override_settings(STORAGES={
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+})
+class PresupuestoPorVistaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        localidades = ["Quilmes", "Bernal", "Wilde", "Lanús"]
+        tipos = ["casa", "departamento", "ph"]
+        props = []
+        for i, codigo in enumerate(Propiedad.generar_codigos(60)):
+            p = Propiedad(
+                codigo=codigo, titulo=f"Casa luminosa {i}", descripcion="Descripción " * 20,
+                precio_usd=100_000 + i, tipo=tipos[i % 3], tipo_operacion="venta",
+                habitaciones=i % 4, direccion=f"Mitre {i}", localidad=localidades[i % 4],
+                provincia="Buenos Aires", destacada=i < 8,
+                imagen_principal=f"blobs/aa/bb/portada{i % 5}.webp",
+                imagen_placeholder="data:image/webp;base64,AAAA",
+            )
+            p.normalizar()
+            props.append(p)
+        Propiedad.objects.bulk_create(props)
+        PropiedadImagen.objects.bulk_create(
+            PropiedadImagen(propiedad=p, imagen=f"blobs/cc/dd/galeria{j}.webp", placeholder="data:,")
+            for p in props[:-1] for j in range(6)
+        )
+
+        grupo = Group.objects.create(name="AdministradorCliente")
+        grupo.permissions.set(Permission.objects.filter(
+            content_type__app_label="propiedades",
+            codename__in=["view_propiedad", "add_propiedad", "change_propiedad"],
+        ))
+        cls.staff = get_user_model().objects.create_user(
+            username="staff", dni="12345678", password="Clave123*", is_staff=True,
+        )
+        cls.staff.groups.add(grupo)
+        cls.datos = {"con_galeria": props[0].codigo, "sin_galeria": props[-1].codigo, "pk": props[0].pk}
+
+    def test_presupuestos(self):
+        for nombre, url, login, max_queries, max_kb in PRESUPUESTOS:
+            with self.subTest(vista=nombre):
+                self.client.logout()
+                if login:
+                    self.client.force_login(self.staff)
+                    self.client.get(reverse("panel_home"))
+                cache.clear()
+                with CaptureQueriesContext(connection) as ctx:
+                    r = self.client.get(url(self.datos))
+                self.assertEqual(r.status_code, 200)
+                n, kb = len(ctx.captured_queries), len(r.content) / 1024
+                self.assertLessEqual(
+                    n, max_queries,
+                    f"{nombre}: {n} queries (máximo {max_queries})\n{describir(ctx.captured_queries)}",
+                )
+                self.assertLessEqual(kb, max_kb, f"{nombre}: {kb:.1f} KB (máximo {max_kb} KB)")
@@ -0,0 +1,49 @@
+import io
+import json
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import LiveServerTestCase, SimpleTestCase, override_settings
+
+from propiedades.models import Propiedad
+from propiedades.prueba_carga import percentil
+
+
+class PercentilTests(SimpleTestCase):
+    def test_rango_mas_cercano(self):
+        valores = list(range(1, 101))
+        self.assertEqual(percentil(valores, 50), 50)
+        self.assertEqual(percentil(valores, 99), 99)
+        self.assertEqual(percentil(valores, 100), 100)
+        self.assertEqual(percentil([7], 90), 7)
+        self.assertEqual(percentil([], 90), 0.0)
+
+
+@override_settings(STORAGES={
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+})
+class LoadtestTests(LiveServerTestCase):
+    def test_escenario_publico_y_panel_sin_errores(self):
+        for i in range(3):
+            Propiedad.objects.create(
+                titulo=f"Casa {i}", descripcion="d", precio_usd=1000, tipo="casa",
+                tipo_operacion="venta", direccion="Mitre 1", localidad="Quilmes",
+                provincia="Buenos Aires",
+            )
+        get_user_model().objects.create_user(
+            username="staff", dni="12345678", password="Clave123*", is_staff=True, is_superuser=True,
+        )
+
+        with tempfile.NamedTemporaryFile(suffix=".json") as salida:
+            call_command(
+                "loadtest", url=self.live_server_url, requests=60, concurrencia=4,
+                panel_user="staff", salida_json=salida.name, stdout=io.StringIO(),
+            )
+            filas = {f["patron"]: f for f in json.load(open(salida.name))["filas"]}
+
+        self.assertEqual(filas["TOTAL"]["requests"], 60)
+        self.assertEqual(filas["TOTAL"]["errores"], 0, filas)
+        self.assertTrue({"home", "listado", "detalle"} <= set(filas))
+        self.assertGreater(filas["TOTAL"]["p99_ms"], 0)
@@ -0,0 +1,51 @@
+import io
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from propiedades.models import ImagenBlob, Propiedad, PropiedadImagen
+
+MEDIA_TMP = tempfile.mkdtemp()
+
+
+@override_settings(
+    MEDIA_ROOT=MEDIA_TMP,
+    STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    },
+)
+class SeedBulkTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_TMP, ignore_errors=True)
+
+    def setUp(self):
+        self.img_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.img_dir, ignore_errors=True)
+        for i, color in enumerate([(200, 30, 30), (30, 200, 30), (30, 30, 200)], start=1):
+            Image.new("RGB", (64, 48), color).save(self.img_dir / f"foto ({i}).jpg")
+
+    def test_bulk_crea_en_lotes_y_comparte_imagenes(self):
+        call_command(
+            "seed_propiedades", bulk=True, count=25, batch_size=10, images_per=2,
+            img_dir=str(self.img_dir), workers=1, seed=1, stdout=io.StringIO(),
+        )
+        self.assertEqual(Propiedad.objects.count(), 25)
+        self.assertEqual(PropiedadImagen.objects.count(), 50)
+        self.assertEqual(ImagenBlob.objects.count(), 3)
+
+        # una referencia por portada y por imagen de galería
+        self.assertEqual(sum(ImagenBlob.objects.values_list("referencias", flat=True)), 75)
+
+        p = Propiedad.objects.first()
+        self.assertRegex(p.codigo, r"^[A-Z]{4}\d{4}$")
+        self.assertTrue(p.imagen_principal.name.startswith("blobs/"))
+        self.assertTrue(p.imagen_placeholder.startswith("data:image/webp;base64,"))
+        self.assertEqual(p.localidad_norm, p.localidad.lower().replace("ú", "u"))
+        self.assertIn(p.tipo, p.search_index)
@@ -0,0 +1,79 @@
+import gzip
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from propiedades import sitemaps
+from propiedades.tests.factories import crear_propiedad
+
+
+class SitemapTests(TestCase):
+    def setUp(self):
+        carpeta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, carpeta, ignore_errors=True)
+        ajustes = override_settings(SITEMAP_DIR=carpeta, SITEMAP_URLS_POR_ARCHIVO=2, SITE_URL="https://ejemplo.com")
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        cache.clear()  # el estado cacheado apunta a la carpeta de otro test
+
+    def test_indice_en_partes_solo_activas_y_lastmod(self):
+        activas = [crear_propiedad(f"Casa {i}") for i in range(3)]
+        pausada = crear_propiedad("Pausada", estado="pausada")
+
+        r = self.client.get("/sitemap.xml")
+        self.assertEqual(r.status_code, 200)
+        indice = r.content.decode()
+        self.assertIn("/sitemaps/static.xml.gz", indice)
+        self.assertIn("/sitemaps/propiedades-1.xml.gz", indice)
+        self.assertIn("/sitemaps/propiedades-2.xml.gz", indice)
+
+        partes = [
+            gzip.decompress(b"".join(self.client.get(f"/sitemaps/propiedades-{n}.xml.gz").streaming_content)).decode()
+            for n in (1, 2)
+        ]
+        todo = "".join(partes)
+        for p in activas:
+            self.assertIn(f"/propiedades/{p.codigo}/", todo)
+        self.assertNotIn(pausada.codigo, todo)
+        self.assertIn(f"<lastmod>{activas[0].actualizado.isoformat(timespec='seconds')}</lastmod>", partes[0])
+
+        self.assertEqual(self.client.get("/sitemaps/../../etc.xml.gz").status_code, 404)
+
+    def test_304_y_regeneracion_solo_si_hay_cambios(self):
+        crear_propiedad("Casa")
+        r = self.client.get("/sitemap.xml", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(r["Content-Encoding"], "gzip")
+        ultima = r["Last-Modified"]
+
+        # sin cambios: el estado sale de la cache (ni la firma) y 304
+        with self.assertNumQueries(0):
+            r = self.client.get("/sitemap.xml", HTTP_IF_MODIFIED_SINCE=ultima)
+        self.assertEqual(r.status_code, 304)
+
+        nueva = crear_propiedad("Otra casa")
+        r = self.client.get("/sitemap.xml", HTTP_IF_MODIFIED_SINCE=ultima)
+        self.assertEqual(r.status_code, 200)
+        self.assertNotEqual(r["Last-Modified"], ultima)
+        contenido = b"".join(self.client.get("/sitemaps/propiedades-1.xml.gz").streaming_content)
+        self.assertIn(nueva.codigo, gzip.decompress(contenido).decode())
+
+    @override_settings(ALLOWED_HOSTS=["ejemplo.com", "otro.com"])
+    def test_urls_de_site_url_y_no_del_host(self):
+        p = crear_propiedad("Casa")
+        indice = self.client.get("/sitemap.xml", HTTP_HOST="otro.com").content.decode()
+        self.assertIn("<loc>https://ejemplo.com/sitemaps/static.xml.gz</loc>", indice)
+        self.assertNotIn("otro.com", indice)
+        contenido = b"".join(self.client.get("/sitemaps/propiedades-1.xml.gz", HTTP_HOST="otro.com").streaming_content)
+        self.assertIn(f"<loc>https://ejemplo.com/propiedades/{p.codigo}/</loc>", gzip.decompress(contenido).decode())
+
+    def test_archivo_borrado_despues_de_cachear_el_estado_da_404(self):
+        crear_propiedad("Casa")
+        self.assertEqual(self.client.get("/sitemap.xml").status_code, 200)
+        # Una regeneración de otro worker borra partes que el estado cacheado todavía lista
+        carpeta = sitemaps.directorio()
+        (carpeta / "propiedades-1.xml.gz").unlink()
+        self.assertEqual(self.client.get("/sitemaps/propiedades-1.xml.gz").status_code, 404)
+        (carpeta / sitemaps.INDICE).unlink()
+        self.assertEqual(self.client.get("/sitemap.xml").status_code, 404)
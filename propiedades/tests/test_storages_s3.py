@@ -0,0 +1,91 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import boto3
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase
+
+try:
+    from moto import mock_aws  # opcional: solo para estos tests
+except ImportError:
+    mock_aws = None
+
+from django_inmobiliaria.storages_s3 import MediaRootS3Boto3Storage, guardar_lote
+
+BUCKET = "inmo-media-test"
+REGION = "us-east-1"
+
+
+def crear_storage(**extra):
+    ajustes = dict(
+        bucket_name=BUCKET, region_name=REGION,
+        access_key="testing", secret_key="testing", custom_domain=None,
+    )
+    ajustes.update(extra)
+    return MediaRootS3Boto3Storage(**ajustes)
+
+
+@unittest.skipIf(mock_aws is None, "moto no está instalado")
+class PooledS3StorageTests(SimpleTestCase):
+    def setUp(self):
+        self.aws = mock_aws()
+        self.aws.start()
+        self.addCleanup(self.aws.stop)
+        boto3.client("s3", region_name=REGION).create_bucket(Bucket=BUCKET)
+
+    def test_guardar_lote_sube_todo_con_un_solo_cliente(self):
+        storage = crear_storage()
+        items = [(f"blobs/aa/bb/{i:02d}.webp", ContentFile(b"x" * 100)) for i in range(12)]
+
+        nombres = guardar_lote(storage, items, max_workers=4)
+        self.assertEqual(nombres, [n for n, _ in items])
+
+        # Un resource por thread, todos sobre el mismo cliente (y pool)
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            clientes = set(pool.map(lambda _: id(storage.connection.meta.client), range(8)))
+        self.assertEqual(clientes, {id(storage.client)})
+        self.assertTrue(storage.exists("blobs/aa/bb/00.webp"))
+        self.assertFalse(storage.exists("blobs/aa/bb/no.webp"))
+        head = storage.client.head_object(Bucket=BUCKET, Key="media/blobs/aa/bb/00.webp")
+        self.assertEqual(head["CacheControl"], "public, max-age=31536000, immutable")
+        self.assertEqual(head["ContentType"], "image/webp")
+        self.assertEqual(storage.client.meta.config.max_pool_connections,
+                         storage.client_config.max_pool_connections)
+
+    def test_guardar_lote_solo_faltantes_no_vuelve_a_subir(self):
+        storage = crear_storage()
+        storage.save("blobs/aa/bb/ya.webp", ContentFile(b"viejo"))
+        items = [("blobs/aa/bb/ya.webp", ContentFile(b"nuevo")), ("blobs/aa/bb/otro.webp", ContentFile(b"x"))]
+
+        with mock.patch.object(storage, "_save", wraps=storage._save) as subir:
+            nombres = guardar_lote(storage, items, solo_faltantes=True)
+        self.assertEqual(nombres, [n for n, _ in items])
+        self.assertEqual([c.args[0] for c in subir.call_args_list], ["blobs/aa/bb/otro.webp"])
+        with storage.open("blobs/aa/bb/ya.webp") as fh:
+            self.assertEqual(fh.read(), b"viejo")
+
+    def test_nombres_no_blob_no_se_pisan(self):
+        storage = crear_storage()
+        primero = storage.save("propiedades/portadas/a.webp", ContentFile(b"1"))
+        segundo = storage.save("propiedades/portadas/a.webp", ContentFile(b"2"))
+        self.assertNotEqual(primero, segundo)
+
+
+class UrlRapidaTests(SimpleTestCase):
+    def test_custom_domain_sin_boto(self):
+        storage = crear_storage(custom_domain="cdn.ejemplo.com")
+        with mock.patch.object(type(storage), "connection", new_callable=mock.PropertyMock) as conn:
+            urls = storage.urls(["blobs/aa/bb/x y.webp", "propiedades/a.webp"])
+            conn.assert_not_called()
+        self.assertEqual(urls, [
+            "https://cdn.ejemplo.com/media/blobs/aa/bb/x%20y.webp",
+            "https://cdn.ejemplo.com/media/propiedades/a.webp",
+        ])
+
+    def test_bucket_publico_sin_custom_domain(self):
+        storage = crear_storage(querystring_auth=False)
+        self.assertEqual(
+            storage.url("a.webp"),
+            f"https://{BUCKET}.s3.{REGION}.amazonaws.com/media/a.webp",
+        )
@@ -1,4 +1,10 @@
+from functools import lru_cache
+
 from unidecode import unidecode
 def normalizar_texto(txt: str) -> str:
     if not txt: return ""
     return " ".join(unidecode(txt).lower().strip().split())
+
+# Localidad/provincia/país se repiten muchísimo: cachear evita pasar por
+# unidecode en cada fila de un import o seed masivo.
+normalizar_corto = lru_cache(maxsize=4096)(normalizar_texto)
@@ -1,5 +1,8 @@
 from django.core.exceptions import ValidationError
 from django.template.defaultfilters import filesizeformat
+from PIL import Image, UnidentifiedImageError
+
+from .imagenes import ImagenDemasiadoGrande, comprobar_pixeles
 
 ALLOWED_EXTS = {"jpg","jpeg","png","webp"}
 MAX_MB = 3
@@ -10,3 +13,19 @@ def validar_imagen(file):
         raise ValidationError("Formato no permitido. Usá JPG, PNG o WEBP.")
     if file.size > MAX_MB * 1024 * 1024:
         raise ValidationError(f"Imagen > {MAX_MB} MB (actual: {filesizeformat(file.size)}).")
+
+    # Archivo ya guardado (FieldFile committed): no lo re-abrimos desde el storage
+    if getattr(file, "_committed", False):
+        return
+
+    # Solo lee el header: una imagen de 3 MB puede declarar 20000x20000 px
+    pos = file.tell()
+    try:
+        with Image.open(file) as img:
+            comprobar_pixeles(img)
+    except ImagenDemasiadoGrande as e:
+        raise ValidationError(f"Imagen demasiado grande: {e}.")
+    except (UnidentifiedImageError, Image.DecompressionBombError):
+        raise ValidationError("El archivo no es una imagen válida.")
+    finally:
+        file.seek(pos)
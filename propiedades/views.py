@@ -1,9 +1,18 @@
-from django.http import HttpResponse
+import gzip
+import hashlib
+from decimal import Decimal, InvalidOperation
+
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, render
+from django.utils.cache import patch_vary_headers
 from django.core.paginator import Paginator
 from django.views.decorators.cache import cache_page
+from django.views.decorators.http import condition
 from .models import Propiedad
 from .utils import normalizar_texto
+from . import sitemaps as sitemaps_gen
+from django_inmobiliaria.cache import cached_compute
+from .feeds import FORMATOS, CursorInvalido, cambios_desde, leer_cursor, propiedades_para_feed
 from django.db.models import Q
 
 def _aplicar_filtros(request, qs, skip: set | None = None):
@@ -55,9 +64,19 @@ def _aplicar_filtros(request, qs, skip: set | None = None):
     return qs
 
 
+# Cálculos compartidos por muchos requests (ver cached_compute): se
+# invalidan con el grupo "propiedades" (signals.py)
+TTL_COMPUTO = 60
+STALE_COMPUTO = 10 * 60
+
+
 #@cache_page(60*5)
 def home(request):
-    destacadas = Propiedad.objects.filter(destacada=True, estado='activa').order_by('-creado')[:10]
+    destacadas = cached_compute(
+        "home:destacadas",
+        lambda: list(Propiedad.objects.filter(destacada=True, estado='activa').order_by('-creado')[:10]),
+        TTL_COMPUTO, STALE_COMPUTO, grupo="propiedades",
+    )
     return render(request, "propiedades/home.html", {"destacadas": destacadas})
 
 #@cache_page(60*5)
@@ -144,6 +163,32 @@ def _expand_token(token: str):
     return expanded
 
 
+def _filtros_localidades(request, q_raw):
+    """
+    Clave de las localidades disponibles: solo los filtros que las cambian,
+    normalizados. Parámetros ajenos (utm_*, page, basura) no abren claves
+    nuevas y todo valor fuera de los choices comparte una (no trae nada).
+    """
+    g = request.GET
+    operacion, tipo = g.get("operacion") or "", g.get("tipo") or ""
+    if operacion and operacion not in dict(Propiedad.TIPO_OPERACION_CHOICES):
+        operacion = "?"
+    if tipo and tipo not in dict(Propiedad.TIPO_PROPIEDAD_CHOICES):
+        tipo = "?"
+    try:
+        mx = str(Decimal(g["max"]).normalize()) if g.get("max") else ""
+    except InvalidOperation:
+        mx = "?"
+    try:
+        hab = str(int(g["habitaciones"])) if g.get("habitaciones") else ""
+    except ValueError:
+        hab = ""  # _aplicar_filtros() lo ignora
+    return [
+        ("q", " ".join(normalizar_texto(q_raw).split())), ("operacion", operacion), ("tipo", tipo),
+        ("max", mx), ("habitaciones", hab), ("mascotas", "1" if g.get("mascotas") else ""),
+    ]
+
+
 def buscar_propiedades(request):
     q_raw = (request.GET.get("q") or "").strip()
     qs_base = Propiedad.objects.filter(estado='activa')
@@ -155,13 +200,18 @@ def buscar_propiedades(request):
         for variants in groups:
             or_q = Q()
             for term in variants:
-                or_q |= Q(search_index__icontains=term)
+                # search_index ya está normalizado: LIKE simple (indexable con trigram)
+                or_q |= Q(search_index__contains=term)
             qs = qs.filter(or_q)
 
     # --- Localidades disponibles (aplico todos los filtros menos 'localidad') ---
     qs_for_loc = _aplicar_filtros(request, qs, skip={"localidad"})
-    localidades_disponibles = (qs_for_loc.values_list("localidad", flat=True)
-                               .distinct().order_by("localidad"))
+    params_loc = _filtros_localidades(request, q_raw)
+    localidades_disponibles = cached_compute(
+        "buscar:localidades:" + hashlib.sha1(urlencode(params_loc).encode()).hexdigest(),
+        lambda: list(qs_for_loc.values_list("localidad", flat=True).distinct().order_by("localidad")),
+        TTL_COMPUTO, STALE_COMPUTO, grupo="propiedades",
+    )
 
     # --- Ahora sí, aplico todos los filtros (incluida 'localidad') ---
     qs = _aplicar_filtros(request, qs)
@@ -203,10 +253,79 @@ def buscar_propiedades(request):
     }
     return render(request, "propiedades/busqueda.html", context)
 
+def feed_propiedades(request, formato):
+    """Feed para portales, en streaming (memoria constante; ver feeds.py)."""
+    if formato not in FORMATOS:
+        raise Http404
+    generador, content_type = FORMATOS[formato]
+    base_url = request.build_absolute_uri("/")
+    return StreamingHttpResponse(generador(propiedades_para_feed(), base_url), content_type=content_type)
+
+def feed_cambios(request):
+    """
+    Cambios desde un timestamp, para sincronizar portales/espejos sin bajar todo.
+    Primera llamada: ?desde=2025-08-01T00:00:00Z. Siguientes: ?cursor=<cursor anterior>.
+    """
+    try:
+        pos_prop, pos_baja = leer_cursor(request.GET.get("cursor"), request.GET.get("desde"))
+        limite = int(request.GET.get("limite") or 500)
+    except (CursorInvalido, ValueError) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    data = cambios_desde(pos_prop, pos_baja, request.build_absolute_uri("/"), limite)
+    return JsonResponse(data, json_dumps_params={"ensure_ascii": False})
+
+def _estado_sitemaps(request, *args, **kwargs):
+    # Se calcula una sola vez por request (lo usan condition() y la vista)
+    if not hasattr(request, "_estado_sitemaps"):
+        # Un solo worker regenera; los crawlers concurrentes sirven lo anterior
+        request._estado_sitemaps = cached_compute(
+            "sitemaps", sitemaps_gen.generar_sitemaps,
+            TTL_COMPUTO, 24 * 60 * 60, grupo="propiedades",
+        )
+    return request._estado_sitemaps
+
+
+def _ultima_generacion(request, *args, **kwargs):
+    return _estado_sitemaps(request)["generado"]
+
+
+@condition(last_modified_func=_ultima_generacion)
+def sitemap_indice(request):
+    """Índice de sitemaps; se sirve comprimido si el cliente lo acepta."""
+    _estado_sitemaps(request)
+    ruta = sitemaps_gen.directorio() / sitemaps_gen.INDICE
+    try:
+        with open(ruta, "rb") as fh:
+            contenido = fh.read()
+    except FileNotFoundError:
+        # El estado cacheado puede ser anterior a una regeneración que lo borró
+        raise Http404("Sitemap inexistente")
+    if "gzip" in request.headers.get("Accept-Encoding", ""):
+        response = HttpResponse(contenido, content_type="application/xml")
+        response["Content-Encoding"] = "gzip"
+    else:
+        response = HttpResponse(gzip.decompress(contenido), content_type="application/xml")
+    patch_vary_headers(response, ["Accept-Encoding"])
+    return response
+
+
+@condition(last_modified_func=_ultima_generacion)
+def sitemap_seccion(request, seccion):
+    nombre = f"{seccion}.xml.gz"
+    if nombre not in _estado_sitemaps(request)["archivos"]:
+        raise Http404("Sitemap inexistente")
+    try:
+        archivo = open(sitemaps_gen.directorio() / nombre, "rb")
+    except FileNotFoundError:
+        # Listado en un estado cacheado, pero ya borrado por generar_sitemaps()
+        raise Http404("Sitemap inexistente")
+    return FileResponse(archivo, content_type="application/gzip")
+
 #@cache_page(60*15)
 def detalle_propiedad(request, codigo):
     p = get_object_or_404(Propiedad, codigo=codigo, estado='activa')
-    imagenes = p.imagenes.all()[:10]
+    # Lista ya evaluada: la galería y el JSON-LD la recorren sin volver a la base
+    imagenes = list(p.imagenes.all()[:10])
     return render(request, "propiedades/detalle.html", {"p": p, "imagenes": imagenes})
 
 